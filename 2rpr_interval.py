@@ -1,13 +1,28 @@
 import numpy as np
 import interval as ival
-from check_box import check_box, check_box_uni
-from plot_workspace_area import plot_workspace, uni_plotter
+import interval_array as iarr
+import instrumentation
+from check_box import check_box, check_box_uni, check_box_batch, lockstep_krav
 from box_class import BoxPoints
-from kravchik_operator import get_krav_func, get_rec_func_optim, get_krav_func_bicentered
 
 
-krav_transform = get_krav_func()
-rec_func = get_rec_func_optim()
+krav_transform = None  # Kernels of checkers, they are built by load_kernels on the first use, not on import
+rec_func = None
+bicentered_transform = None
+
+
+def load_kernels():
+    """
+    Build the kernels of checkers (or load them from the kernel cache), which are not set yet
+    """
+    global krav_transform, rec_func, bicentered_transform
+    from kravchik_operator import get_krav_func, get_rec_func_optim, get_bicentered_krav_func
+    if krav_transform is None:
+        krav_transform = get_krav_func()
+    if rec_func is None:
+        rec_func = get_rec_func_optim()
+    if bicentered_transform is None:
+        bicentered_transform = get_bicentered_krav_func()
 
 
 def classical_krav_eval(u1, u2, l1, l2, d, coef, p=10):
@@ -23,6 +38,8 @@ def classical_krav_eval(u1, u2, l1, l2, d, coef, p=10):
     :param p: the max number of iterations
     :return: the string 'inside', 'outside' or 'border'
     """
+    if krav_transform is None:
+        load_kernels()
     v1 = ival.Interval([l1, l2])  # Interval form of X-coordinate for box v
     v2 = ival.Interval([l1, l2])  # Interval form of Y-coordinate for box v
     v1mid = coef * v1.mid()
@@ -30,13 +47,14 @@ def classical_krav_eval(u1, u2, l1, l2, d, coef, p=10):
     for k in range(p):
         c1 = v1.mid()
         c2 = v2.mid()
-        v_krav = krav_transform(u1, u2, v1, v2, v1mid, v2mid, c1, c2, d)  # Calculate Kravchik evaluation for u1, u2
+        with instrumentation.timer('kernel_eval'):
+            v_krav = krav_transform(u1, u2, v1, v2, v1mid, v2mid, c1, c2, d)  # Calculate Kravchik evaluation for u1, u2
         if (v_krav[0][0].isIn(v1)) and (v_krav[1][0].isIn(v2)):  # Compare Kravchik evaluation with v
-            return 'inside'  # if it is inside previous interval, then it's inside the workspace area
+            return instrumentation.exit_cell('inside', [u1, u2], k + 1, [v1, v2])  # if it is inside previous interval, then it's inside the workspace area
         if k == p - 1:
-            return 'border'  # if we achieve max of the iterations, then it's border
+            return instrumentation.exit_cell('border', [u1, u2], k + 1, [v1, v2])  # if we achieve max of the iterations, then it's border
         if v1.isNoIntersec(v_krav[0][0]) or v2.isNoIntersec(v_krav[1][0]):
-            return 'outside'
+            return instrumentation.exit_cell('outside', [u1, u2], k + 1, [v1, v2])
         else:
             v1.intersec(v_krav[0][0])  # if our evalution not fully inside, then intersect it and repeat
             v2.intersec(v_krav[1][0])
@@ -55,18 +73,21 @@ def exact_eval(u1, u2, l1, l2, d, coef, p=10):
     :param p: the max number of iterations
     :return: the string 'inside', 'outside' or 'border'
     """
+    if rec_func is None:
+        load_kernels()
     v1 = ival.Interval([l1, l2])  # Interval form of X-coordinate for box v
     v2 = ival.Interval([l1, l2])  # Interval form of Y-coordinate for box v
     v1mid = coef * v1.mid()
     v2mid = coef * v2.mid()
     for k in range(p):
-        v_exact = rec_func(u1, u2, v1, v2, v1mid, v2mid, d) # Calculate exact_inclusion for u1, u2
+        with instrumentation.timer('kernel_eval'):
+            v_exact = rec_func(u1, u2, v1, v2, v1mid, v2mid, d) # Calculate exact_inclusion for u1, u2
         if (v_exact[0][0].isIn(v1)) and (v_exact[1][0].isIn(v2)):  # Compare Kravchik evaluation with v
-            return 'inside'  # if it is inside previous interval, then it's inside the workspace area
+            return instrumentation.exit_cell('inside', [u1, u2], k + 1, [v1, v2])  # if it is inside previous interval, then it's inside the workspace area
         if k == p - 1:
-            return 'border'  # if we achieve max of the iterations, then it's border
+            return instrumentation.exit_cell('border', [u1, u2], k + 1, [v1, v2])  # if we achieve max of the iterations, then it's border
         if v1.isNoIntersec(v_exact[0][0]) or v2.isNoIntersec(v_exact[1][0]):
-            return 'outside'
+            return instrumentation.exit_cell('outside', [u1, u2], k + 1, [v1, v2])
         else:
             v1.intersec(v_exact[0][0])  # if our evalution not fully inside, then intersect it and repeat
             v2.intersec(v_exact[1][0])
@@ -85,40 +106,143 @@ def bicentered_krav_eval(u1, u2, l1, l2, d, coef, p=10):
     :param p: the max number of iterations
     :return: the string 'inside', 'outside' or 'border'
     """
+    if bicentered_transform is None:
+        load_kernels()
     v1 = ival.Interval([l1, l2])  # Interval form of X-coordinate for box v
     v2 = ival.Interval([l1, l2])  # Interval form of Y-coordinate for box v
     v1mid = coef * v1.mid()
     v2mid = coef * v2.mid()
     for k in range(p):
-        v_min, v_max = get_krav_func_bicentered(u1, u2, v1, v2, v1mid, v2mid, d)
+        with instrumentation.timer('kernel_eval'):
+            c_min, c_max, v_min, v_max = bicentered_transform(u1, u2, v1, v2, v1mid, v2mid, d)
         v_min[0][0].intersec(v_max[0][0])  # Intersec Krav evalutaion for v_min and v_max
         v_min[1][0].intersec(v_max[1][0])
         if (v_min[0][0].isIn(v1)) and (v_min[1][0].isIn(v2)):  # Compare bicentered Kravchik evaluation with v
-            return 'inside'  # if it is inside previous interval, then it's inside the workspace area
+            return instrumentation.exit_cell('inside', [u1, u2], k + 1, [v1, v2])  # if it is inside previous interval, then it's inside the workspace area
         if k == p - 1:
-            return 'border'  # if we achieve max of the iterations, then it's border
+            return instrumentation.exit_cell('border', [u1, u2], k + 1, [v1, v2])  # if we achieve max of the iterations, then it's border
         if v1.isNoIntersec(v_min[0][0]) or v2.isNoIntersec(v_min[1][0]):
-            return 'outside'
+            return instrumentation.exit_cell('outside', [u1, u2], k + 1, [v1, v2])
         else:
             v1.intersec(v_min[0][0])  # if our evalution not fully inside, then intersect it and repeat
             v2.intersec(v_min[1][0])
-d = 6
-L1 = 3  # Lower range of row
-L2 = 15  # Upper range of row
-N = 12  # The number of nodes on uniform grid
-l1 = -L2  # Left and lower border of uniform grid
-l2 = L2  # Right and upper border of uniform grid
-X1 = np.linspace(l1, l2, N)
-Y1 = np.linspace(l1, l2, N)
-X, Y = np.meshgrid(X1, Y1)  # Build X and Y of uniform grid
-
-k = 10  # Max number of iterations
-coef = 1.0
-area_points = BoxPoints()
-border_points = BoxPoints()
-area_points, border_points = check_box(X, Y, N, L1, L2, d, exact_eval, coef, k)  # Calculate workspace area and border coordinates
-area_points_def, border_points_def = check_box(X, Y, N, L1, L2, d, classical_krav_eval, coef, k)  # Calculate workspace area and border coordinates
-area_points_bic, border_points_bic = check_box(X, Y, N, L1, L2, d, bicentered_krav_eval, coef, k)
-plot_workspace(L1, L2, d, area_points, border_points)  # Plotting
-plot_workspace(L1, L2, d, area_points_bic, border_points_bic)
-plot_workspace(L1, L2, d, area_points_def, border_points_def)
\ No newline at end of file
+
+
+def classical_krav_eval_batch(u1, u2, l1, l2, d, coef, p=10, V0=None, boxes=False):
+    """
+    Batched classical_krav_eval: check all cells u together
+    :param u1: IntervalArray of the X coordinates of cells u
+    :param u2: IntervalArray of the Y coordinates of cells u
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param coef: coeff to change lambda-matrix
+    :param p: the max number of iterations
+    :param V0: None or list of IntervalArrays of start boxes v (warm start), they are cut to the range of rods
+    :param boxes: return also the final boxes of inside cells (see lockstep_krav)
+    :return: array of labels (see box_class)
+    """
+    if krav_transform is None:
+        load_kernels()
+    v1 = iarr.IntervalArray.full(u1.size, [l1, l2])  # Interval form of X-coordinate for boxes v
+    v2 = iarr.IntervalArray.full(u1.size, [l1, l2])  # Interval form of Y-coordinate for boxes v
+    if V0 is not None:
+        v1.intersec(V0[0])
+        v2.intersec(V0[1])
+    v1mid = coef * ival.Interval([l1, l2]).mid()
+    v2mid = coef * ival.Interval([l1, l2]).mid()
+
+    def transform(active, V):
+        v_krav = krav_transform(u1[active], u2[active], V[0], V[1], v1mid, v2mid, V[0].mid(), V[1].mid(), d)
+        return [v_krav[0][0], v_krav[1][0]]
+    return lockstep_krav(transform, [v1, v2], p, boxes, [u1, u2])
+
+
+def exact_eval_batch(u1, u2, l1, l2, d, coef, p=10, V0=None, boxes=False):
+    """
+    Batched exact_eval: check all cells u together
+    :param u1: IntervalArray of the X coordinates of cells u
+    :param u2: IntervalArray of the Y coordinates of cells u
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param coef: coeff to change lambda-matrix
+    :param p: the max number of iterations
+    :param V0: None or list of IntervalArrays of start boxes v (warm start), they are cut to the range of rods
+    :param boxes: return also the final boxes of inside cells (see lockstep_krav)
+    :return: array of labels (see box_class)
+    """
+    if rec_func is None:
+        load_kernels()
+    v1 = iarr.IntervalArray.full(u1.size, [l1, l2])  # Interval form of X-coordinate for boxes v
+    v2 = iarr.IntervalArray.full(u1.size, [l1, l2])  # Interval form of Y-coordinate for boxes v
+    if V0 is not None:
+        v1.intersec(V0[0])
+        v2.intersec(V0[1])
+    v1mid = coef * ival.Interval([l1, l2]).mid()
+    v2mid = coef * ival.Interval([l1, l2]).mid()
+
+    def transform(active, V):
+        v_exact = rec_func(u1[active], u2[active], V[0], V[1], v1mid, v2mid, d)
+        return [v_exact[0][0], v_exact[1][0]]
+    return lockstep_krav(transform, [v1, v2], p, boxes, [u1, u2])
+
+
+def bicentered_krav_eval_batch(u1, u2, l1, l2, d, coef, p=10, V0=None, boxes=False):
+    """
+    Batched bicentered_krav_eval: check all cells u together
+    :param u1: IntervalArray of the X coordinates of cells u
+    :param u2: IntervalArray of the Y coordinates of cells u
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param coef: coeff to change lambda-matrix
+    :param p: the max number of iterations
+    :param V0: None or list of IntervalArrays of start boxes v (warm start), they are cut to the range of rods
+    :param boxes: return also the final boxes of inside cells (see lockstep_krav)
+    :return: array of labels (see box_class)
+    """
+    if bicentered_transform is None:
+        load_kernels()
+    v1 = iarr.IntervalArray.full(u1.size, [l1, l2])  # Interval form of X-coordinate for boxes v
+    v2 = iarr.IntervalArray.full(u1.size, [l1, l2])  # Interval form of Y-coordinate for boxes v
+    if V0 is not None:
+        v1.intersec(V0[0])
+        v2.intersec(V0[1])
+    v1mid = coef * ival.Interval([l1, l2]).mid()
+    v2mid = coef * ival.Interval([l1, l2]).mid()
+
+    def transform(active, V):
+        c_min, c_max, v_min, v_max = bicentered_transform(u1[active], u2[active], V[0], V[1], v1mid, v2mid, d)
+        v_new = []
+        for i in range(2):
+            lo = np.maximum(v_min[i][0][0], v_max[i][0][0])  # Intersec Krav evalutaion for v_min and v_max
+            hi = np.minimum(v_min[i][0][1], v_max[i][0][1])
+            empty = lo > hi  # no solutions in the cell, the interval [inf, inf] makes it outside
+            v_new.append(iarr.IntervalArray(np.where(empty, np.inf, lo), np.where(empty, np.inf, hi)))
+        return v_new
+    return lockstep_krav(transform, [v1, v2], p, boxes, [u1, u2])
+
+
+if __name__ == '__main__':
+    from plot_workspace_area import plot_workspace
+    d = 6
+    L1 = 3  # Lower range of row
+    L2 = 15  # Upper range of row
+    N = 12  # The number of nodes on uniform grid
+    l1 = -L2  # Left and lower border of uniform grid
+    l2 = L2  # Right and upper border of uniform grid
+    X1 = np.linspace(l1, l2, N)
+    Y1 = np.linspace(l1, l2, N)
+    X, Y = np.meshgrid(X1, Y1)  # Build X and Y of uniform grid
+
+    k = 10  # Max number of iterations
+    coef = 1.0
+    area_points = BoxPoints()
+    border_points = BoxPoints()
+    area_points, border_points = check_box_batch(X, Y, N, L1, L2, d, exact_eval_batch, coef, k)  # Calculate workspace area and border coordinates
+    area_points_def, border_points_def = check_box_batch(X, Y, N, L1, L2, d, classical_krav_eval_batch, coef, k)  # Calculate workspace area and border coordinates
+    area_points_bic, border_points_bic = check_box_batch(X, Y, N, L1, L2, d, bicentered_krav_eval_batch, coef, k)
+    plot_workspace(L1, L2, d, area_points, border_points)  # Plotting
+    plot_workspace(L1, L2, d, area_points_bic, border_points_bic)
+    plot_workspace(L1, L2, d, area_points_def, border_points_def)
@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import interval as ival
+import workspace
+from check_box import check_box_uni_grid
+from box_class import LABEL_NAMES, INSIDE, BORDER
+
+JOB_KEYS = ('name', 'problem', 'V', 'param', 'bounds', 'n')  # required keys of job, the others have defaults
+JOB_DEFAULTS = {'kind': 'krawczyk', 'p': 10, 'prefilter': False, 'warm_start': None}
+
+
+def load_jobs(path):
+    """
+    Read job file. It has the list 'jobs' and optional 'defaults' (merged into every job) and 'output' (directory
+    of results). Every job has 'name', 'problem' (name in workspace.PROBLEMS, e.g. 'func_dextar'), 'V' (list of
+    [lo, hi] of unknowns), 'param' (list of const parameters), 'bounds' ([xmin, xmax, ymin, ymax] of the grid),
+    'n' (number of nodes along each side) and optionally 'kind' ('krawczyk' or 'newton'), 'p', 'prefilter' (use
+    analytic prefilter of workspace.PROBLEMS) and 'warm_start' (see check_box_uni_grid)
+    :param path: .json or .toml file
+    :return: (list of job dicts with defaults filled in, output directory or None)
+    """
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:  # python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as file:
+            spec = tomllib.load(file)
+    else:
+        with open(path) as file:
+            spec = json.load(file)
+    jobs = []
+    for i, job in enumerate(spec.get('jobs', [])):
+        full = dict(JOB_DEFAULTS)
+        full.update(spec.get('defaults', {}))
+        full.update(job)
+        missing = [key for key in JOB_KEYS if key not in full]
+        if missing:
+            raise ValueError('Job %s has no %s' % (full.get('name', i), ', '.join(missing)))
+        try:
+            check_job(full)
+        except ValueError as error:
+            raise ValueError('Job %s: %s' % (full['name'], error))
+        jobs.append(full)
+    names = [job['name'] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError('Names of jobs are not unique')
+    return jobs, spec.get('output')
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and np.isfinite(value)
+
+
+def check_job(job):
+    """
+    Raise ValueError if the values of job don't fit its problem: V must be the list of [lo, hi] of every unknown,
+    param the list of all const parameters, bounds [xmin, xmax, ymin, ymax] with min < max
+    :param job: job dict with defaults filled in (see load_jobs)
+    """
+    workspace.check_problem(job['problem'], job['kind'])
+    unknowns, params = workspace.SIZES[job['problem']]
+    V = job['V']
+    if not isinstance(V, list) or len(V) != unknowns or \
+            not all(isinstance(v, list) and len(v) == 2 and all(map(_is_number, v)) and v[0] <= v[1] for v in V):
+        raise ValueError('V must be the list of %d pairs [lo, hi] of numbers with lo <= hi' % unknowns)
+    param = job['param']
+    if not isinstance(param, list) or len(param) != params or not all(map(_is_number, param)):
+        raise ValueError('param must be the list of %d numbers' % params)
+    bounds = job['bounds']
+    if not isinstance(bounds, list) or len(bounds) != 4 or not all(map(_is_number, bounds)) or \
+            not (bounds[0] < bounds[1] and bounds[2] < bounds[3]):
+        raise ValueError('bounds must be [xmin, xmax, ymin, ymax] of numbers with xmin < xmax and ymin < ymax')
+    if not isinstance(job['prefilter'], bool):
+        raise ValueError('prefilter must be true or false')
+    if job['prefilter'] and workspace.PROBLEMS[job['problem']] is None:
+        raise ValueError('Problem %s has no prefilter' % job['problem'])
+    if job['warm_start'] is not None and not (_is_number(job['warm_start']) and job['warm_start'] >= 0):
+        raise ValueError('warm_start must be null or a non-negative number')
+    if job['warm_start'] is not None and job['prefilter']:
+        raise ValueError("prefilter can't be used with warm_start")
+
+
+def run_job(job):
+    """
+    Check one job, its kernel is loaded once per process (see workspace.load_checker)
+    :param job: job dict (see load_jobs)
+    :return: (LabelGrid, dict of stats)
+    """
+    start = time.perf_counter()
+    checker = workspace.load_checker(job['problem'], job['kind'])
+    kernel_seconds = time.perf_counter() - start
+    V = [ival.Interval(v) for v in job['V']]
+    prefilter = None
+    if job['prefilter']:
+        prefilter = workspace.load_prefilter(job['problem'], V, job['param'])
+    bounds, n = job['bounds'], job['n']
+    X, Y = np.meshgrid(np.linspace(bounds[0], bounds[1], n), np.linspace(bounds[2], bounds[3], n))
+    start = time.perf_counter()
+    grid = check_box_uni_grid(X, Y, n, V, job['param'], checker, 1, job['p'], warm_start=job['warm_start'],
+                              prefilter=prefilter)
+    seconds = time.perf_counter() - start
+    stats = {'name': job['name'], 'problem': job['problem'], 'kind': job['kind'], 'n': n, 'p': job['p'],
+             'cells': (n - 1) ** 2, 'seconds': seconds, 'kernel_seconds': kernel_seconds,
+             'counts': {LABEL_NAMES[label]: grid.count(label) for label in range(len(LABEL_NAMES))},
+             'inside_area': grid.area(INSIDE), 'border_area': grid.area(BORDER)}
+    return grid, stats
+
+
+def run_batch(jobs, output):
+    """
+    Run jobs one by one in this process and write label grids <output>/<name>.npz (see LabelGrid.save) and
+    <output>/summary.json with the stats of finished jobs, which is rewritten after every job
+    :param jobs: list of job dicts (see load_jobs)
+    :param output: directory of results
+    :return: list of stats
+    """
+    os.makedirs(output, exist_ok=True)
+    summary = []
+    for job in jobs:
+        grid, stats = run_job(job)
+        stats['labels'] = job['name'] + '.npz'
+        grid.save(os.path.join(output, stats['labels']))
+        summary.append(stats)
+        with open(os.path.join(output, 'summary.json'), 'w') as file:
+            json.dump(summary, file, indent=1)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check workspaces of jobs from JSON or TOML file without plotting')
+    parser.add_argument('jobs', help='job file (.json or .toml)')
+    parser.add_argument('-o', '--output', help="directory of results, by default 'output' of job file or 'results'")
+    parser.add_argument('--only', nargs='+', help='names of jobs to run')
+    args = parser.parse_args(argv)
+    jobs, output = load_jobs(args.jobs)
+    if args.only:
+        jobs = [job for job in jobs if job['name'] in args.only]
+    summary = run_batch(jobs, args.output or output or 'results')
+    for stats in summary:
+        sys.stdout.write('%s: %d cells in %.3f s, %s\n' % (stats['name'], stats['cells'], stats['seconds'],
+                                                           stats['counts']))
+
+
+if __name__ == '__main__':
+    main()
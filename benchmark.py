@@ -0,0 +1,221 @@
+import argparse
+import importlib
+import json
+import platform
+import sys
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+import numpy as np
+import interval as ival
+from check_box import check_box, check_box_uni, check_box_grid, check_box_uni_grid
+from kravchik_operator import get_unified_krav_codegen, get_unified_newton_codegen
+
+DEFAULT_SIZES = [10, 50, 100, 200, 500, 1000]
+
+# problem name -> (function of unified_interval.py, intervals of unknowns, const parameters, half of grid side)
+PROBLEMS = {
+    '2rpr': ('func_2rpr', [[3, 15], [3, 15]], [6], 15),
+    'robot': ('func_robot', [[3, 15], [0, np.pi / 2]], [], 15),
+    'sin_cos': ('func_sin_cos', [[0, 2 * np.pi], [0, 2 * np.pi]], [], 2),
+    'dextar': ('func_dextar', [[0, 2 * np.pi]] * 4, [7.2, 2.0, 3.0], 12.2),
+}
+
+RPR_CHECKERS = ['exact_eval', 'classical_krav_eval', 'bicentered_krav_eval']  # the same names in 2rpr_interval.py
+RPR_KERNELS = {'exact_eval': 'rec_func', 'classical_krav_eval': 'krav_transform',
+               'bicentered_krav_eval': 'bicentered_transform'}
+# checker of unified_interval.py -> (its kernel global, function building the kernel)
+UNIFIED_CHECKERS = {'unified_krav_eval': ('unified_krav_func', get_unified_krav_codegen),
+                    'unified_newton_eval': ('unified_newton_func', get_unified_newton_codegen)}
+
+
+class CountingKernel(object):
+    """
+    Wrapper of Krawczyk function, which counts evaluated cells, so the average number of iterations per cell is
+    the number of evaluations divided by the number of cells
+    """
+    def __init__(self, kernel):
+        self.kernel = kernel
+        self.evaluations = 0
+
+    def __call__(self, *args):
+        u = args[0][0] if isinstance(args[0], list) else args[0]  # unified kernels take the list U
+        self.evaluations += getattr(u, 'size', 1)
+        return self.kernel(*args)
+
+
+def reference_area(problem):
+    """
+    Exact area of the workspace of the problem to compare approximations with
+    :param problem: name of problem in PROBLEMS
+    :return: area
+    """
+    from exact_workspace import rpr_workspace
+    if problem == '2rpr':
+        return rpr_workspace(3, 15, 6).area
+    if problem == 'robot':
+        return np.pi / 4 * (15 ** 2 - 3 ** 2)  # quarter of annulus
+    if problem == 'sin_cos':
+        return 4.0  # square [-1, 1]^2
+    L, l, d = PROBLEMS[problem][2]
+    return rpr_workspace(L - l, L + l, 2 * d).area  # DexTar reaches the same annuli around (-d, 0) and (d, 0)
+
+
+def box_points_area(points):
+    return float(np.sum((np.asarray(points.get_points('xright')) - np.asarray(points.get_points('xleft'))) *
+                        (np.asarray(points.get_points('yright')) - np.asarray(points.get_points('yleft')))))
+
+
+def measure(run, cells, counter, memory=False):
+    """
+    Run checking for timing. The peak RSS of the process is taken from getrusage after the run, it is the high-water
+    mark of the whole process, so it only grows from case to case. The peak memory allocated by the case itself is
+    measured by one more run under tracemalloc, which is several times slower, so it is optional
+    :param run: function without arguments returning (inner area, outer area)
+    :param cells: number of checked cells
+    :param counter: CountingKernel used by run
+    :param memory: run the case once more under tracemalloc
+    :return: dict of measurements
+    """
+    counter.evaluations = 0
+    start = time.perf_counter()
+    inner, outer = run()
+    seconds = time.perf_counter() - start
+    evaluations = counter.evaluations
+    record = {'cells': cells, 'seconds': seconds, 'cells_per_sec': cells / seconds if seconds > 0 else None,
+              'iterations_per_cell': evaluations / cells, 'inner_area': inner, 'outer_area': outer}
+    if resource is not None:
+        scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        record['max_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    if memory:
+        tracemalloc.start()
+        run()
+        record['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return record
+
+
+def bench_rpr(sizes, scalar_max_n, p=10, coef=1.0, memory=False):
+    """
+    Benchmark checkers of 2rpr_interval.py on the grid [-15, 15]^2 (rods [3, 15], d = 6)
+    :return: list of records
+    """
+    module = importlib.import_module('2rpr_interval')
+    module.load_kernels()
+    l1, l2, d, L = 3, 15, 6, 15
+    area = reference_area('2rpr')
+    records = []
+    for name in RPR_CHECKERS:
+        counter = CountingKernel(getattr(module, RPR_KERNELS[name]))
+        setattr(module, RPR_KERNELS[name], counter)
+        try:
+            for n in sizes:
+                X, Y = np.meshgrid(np.linspace(-L, L, n), np.linspace(-L, L, n))
+                variants = [(name + '_batch', False)] + ([(name, True)] if n <= scalar_max_n else [])
+                for checker_name, scalar in variants:
+                    checker = getattr(module, checker_name)
+                    if scalar:
+                        def run():
+                            area_points, border_points = check_box(X, Y, n, l1, l2, d, checker, coef, p)
+                            inner = box_points_area(area_points)
+                            return inner, inner + box_points_area(border_points)
+                    else:
+                        def run():
+                            grid = check_box_grid(X, Y, n, l1, l2, d, checker, coef, p)
+                            return grid.area(1), grid.area(1) + grid.area(2)
+                    record = {'problem': '2rpr', 'checker': checker_name, 'n': n, 'exact_area': area}
+                    record.update(measure(run, (n - 1) ** 2, counter, memory))
+                    records.append(record)
+        finally:
+            setattr(module, RPR_KERNELS[name], counter.kernel)
+    return records
+
+
+def bench_unified(sizes, scalar_max_n, problems=None, p=10, memory=False):
+    """
+    Benchmark unified checkers of unified_interval.py on the problems from PROBLEMS
+    :return: list of records
+    """
+    module = importlib.import_module('unified_interval')
+    records = []
+    for problem in problems or list(PROBLEMS):
+        func, V, param, L = PROBLEMS[problem]
+        definition = getattr(module, func)()
+        V_ival = [ival.Interval(v) for v in V]
+        area = reference_area(problem)
+        for name, (kernel_name, build) in UNIFIED_CHECKERS.items():
+            start = time.perf_counter()
+            kernel = build(*definition[:5], param=definition[5] if len(definition) > 5 else [])
+            setup = time.perf_counter() - start
+            counter = CountingKernel(kernel)
+            original = getattr(module, kernel_name)
+            setattr(module, kernel_name, counter)
+            try:
+                for n in sizes:
+                    X, Y = np.meshgrid(np.linspace(-L, L, n), np.linspace(-L, L, n))
+                    variants = [(name + '_batch', False)] + ([(name, True)] if n <= scalar_max_n else [])
+                    for checker_name, scalar in variants:
+                        checker = getattr(module, checker_name)
+                        if scalar:
+                            def run():
+                                area_points, border_points = check_box_uni(X, Y, n, V_ival, param, checker, 1, p)
+                                inner = box_points_area(area_points)
+                                return inner, inner + box_points_area(border_points)
+                        else:
+                            def run():
+                                grid = check_box_uni_grid(X, Y, n, V_ival, param, checker, 1, p)
+                                return grid.area(1), grid.area(1) + grid.area(2)
+                        record = {'problem': problem, 'checker': checker_name, 'n': n, 'exact_area': area,
+                                  'setup_seconds': setup}
+                        record.update(measure(run, (n - 1) ** 2, counter, memory))
+                        records.append(record)
+            finally:
+                setattr(module, kernel_name, original)
+    return records
+
+
+def run_benchmark(sizes=None, scalar_max_n=50, problems=None, p=10, memory=False):
+    """
+    Run all checkers on all sizes of grid
+    :param sizes: list of numbers of nodes of uniform grid
+    :param scalar_max_n: the largest grid, on which cell-by-cell checkers are run (they are slow)
+    :param problems: list of names of unified problems, all of PROBLEMS by default
+    :param p: the max number of iterations
+    :param memory: measure the peak memory of every case under tracemalloc (runs every case twice)
+    :return: dict ready for json.dump
+    """
+    sizes = sizes or DEFAULT_SIZES
+    import sympy
+    return {
+        'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'numpy': np.__version__, 'sympy': sympy.__version__,
+                 'sizes': sizes, 'p': p, 'memory': memory},
+        'results': bench_rpr(sizes, scalar_max_n, p, memory=memory) +
+                   bench_unified(sizes, scalar_max_n, problems, p, memory),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark of workspace checkers, results are written as JSON')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='numbers of nodes of grid')
+    parser.add_argument('--scalar-max-n', type=int, default=50, help='the largest grid for cell-by-cell checkers')
+    parser.add_argument('--problems', nargs='+', choices=list(PROBLEMS), help='unified problems to run')
+    parser.add_argument('-p', type=int, default=10, help='the max number of iterations')
+    parser.add_argument('--memory', action='store_true',
+                        help='measure peak memory of every case under tracemalloc, runs every case twice')
+    parser.add_argument('-o', '--output', help='JSON file, stdout by default')
+    args = parser.parse_args(argv)
+    report = run_benchmark(args.sizes, args.scalar_max_n, args.problems, args.p, args.memory)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,7 @@
+import os
+import numpy as np
+
+
 class BoxPoints(object):
     """docstring"""
     def __init__(self):
@@ -15,6 +19,18 @@ class BoxPoints(object):
             self.__y_left.append(x)
         if arg == 'yright':
             self.__y_right.append(x)
+    def add_points(self, x, arg):
+        """
+        Add many points at once, x is any iterable of floats
+        """
+        if arg == 'xleft':
+            self.__x_left.extend(x)
+        if arg == 'xright':
+            self.__x_right.extend(x)
+        if arg == 'yleft':
+            self.__y_left.extend(x)
+        if arg == 'yright':
+            self.__y_right.extend(x)
     def get_points(self, arg):
         if arg == 'xleft':
             #print(self.__x_left)
@@ -25,3 +41,192 @@ class BoxPoints(object):
             return self.__y_left
         if arg == 'yright':
             return self.__y_right
+
+
+def to_box_points(result):
+    """
+    Compatibility adapter from LabelGrid or BoxList to BoxPoints
+    :param result: object with method boxes(label)
+    :return: BoxPoints of workspace area and BoxPoints of border of workspace area
+    """
+    box_points = []
+    for label in (INSIDE, BORDER):
+        points = BoxPoints()
+        for arg, values in zip(('xleft', 'xright', 'yleft', 'yright'), result.boxes(label)):
+            points.add_points(values.tolist(), arg)
+        box_points.append(points)
+    return box_points[0], box_points[1]
+
+
+OUTSIDE = 0  # Labels of classified cells, as stored in label arrays of batched checkers
+INSIDE = 1
+BORDER = 2
+UNKNOWN = 255  # Cell is not checked yet (see LabelGridSink)
+LABEL_NAMES = ('outside', 'inside', 'border')
+
+
+
+class BoxList(object):
+    """
+    Flat list of boxes of adaptive subdivision with their labels and depths of quadtree
+    """
+    def __init__(self, xleft, xright, yleft, yright, labels, depth):
+        """Constructor"""
+        self.xleft = np.asarray(xleft, dtype=np.float64)
+        self.xright = np.asarray(xright, dtype=np.float64)
+        self.yleft = np.asarray(yleft, dtype=np.float64)
+        self.yright = np.asarray(yright, dtype=np.float64)
+        self.labels = np.asarray(labels, dtype=np.uint8)
+        self.depth = np.asarray(depth, dtype=np.int32)
+
+    def __len__(self):
+        return self.labels.size
+
+    def boxes(self, label):
+        """
+        :param label: INSIDE, BORDER or OUTSIDE
+        :return: arrays xleft, xright, yleft, yright of boxes with this label
+        """
+        mask = self.labels == label
+        return self.xleft[mask], self.xright[mask], self.yleft[mask], self.yright[mask]
+
+    def area(self, label):
+        """
+        :param label: INSIDE, BORDER or OUTSIDE
+        :return: total area of boxes with this label
+        """
+        xleft, xright, yleft, yright = self.boxes(label)
+        return float(np.sum((xright - xleft) * (yright - yleft)))
+
+    def to_box_points(self):
+        """
+        :return: BoxPoints of workspace area and BoxPoints of border of workspace area
+        """
+        return to_box_points(self)
+
+
+class LabelGrid(object):
+    """
+    Compact result of checking uniform grid: uint8 label of every cell and coordinates of the grid nodes.
+    Cell (i, j) is [x_nodes[j], x_nodes[j + 1]] x [y_nodes[i], y_nodes[i + 1]], as in check_box
+    """
+    def __init__(self, x_nodes, y_nodes, labels):
+        """Constructor"""
+        self.x_nodes = np.asarray(x_nodes, dtype=np.float64)
+        self.y_nodes = np.asarray(y_nodes, dtype=np.float64)
+        self.labels = np.asanyarray(labels, dtype=np.uint8).reshape(self.y_nodes.size - 1, self.x_nodes.size - 1)
+
+    @classmethod
+    def from_meshgrid(cls, x, y, n, labels):
+        """
+        :param x: X-coordinates of elements of uniform grid (np.meshgrid)
+        :param y: Y-coordinates of elements of uniform grid (np.meshgrid)
+        :param n: number of nodes of uniform grid
+        :param labels: labels of (n - 1)^2 cells in check_box order
+        :return: LabelGrid
+        """
+        return cls(x[0, :n], y[:n, 0], labels)
+
+    @property
+    def shape(self):
+        return self.labels.shape
+
+    def count(self, label):
+        return int(np.count_nonzero(self.labels == label))
+
+    def boxes(self, label):
+        """
+        :param label: INSIDE, BORDER or OUTSIDE
+        :return: arrays xleft, xright, yleft, yright of cells with this label
+        """
+        i, j = np.nonzero(self.labels == label)
+        return self.x_nodes[j], self.x_nodes[j + 1], self.y_nodes[i], self.y_nodes[i + 1]
+
+    def area(self, label):
+        """
+        :param label: INSIDE, BORDER or OUTSIDE
+        :return: total area of cells with this label
+        """
+        cell_area = np.outer(np.diff(self.y_nodes), np.diff(self.x_nodes))
+        return float(np.sum(cell_area[self.labels == label]))
+
+    def to_box_points(self):
+        """
+        :return: BoxPoints of workspace area and BoxPoints of border of workspace area
+        """
+        return to_box_points(self)
+
+    def save(self, path):
+        """
+        Save to .npz file, or, if path doesn't end with .npz, to the directory of .npy files, which can be
+        memory-mapped by load
+        :param path: file or directory name
+        """
+        if path.endswith('.npz'):
+            np.savez_compressed(path, x_nodes=self.x_nodes, y_nodes=self.y_nodes, labels=self.labels)
+        else:
+            os.makedirs(path, exist_ok=True)
+            np.save(os.path.join(path, 'x_nodes.npy'), self.x_nodes)
+            np.save(os.path.join(path, 'y_nodes.npy'), self.y_nodes)
+            np.save(os.path.join(path, 'labels.npy'), self.labels)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """
+        :param path: file or directory name used in save
+        :param mmap_mode: mode of np.load for labels of directory format, e.g. 'r' to memory-map them
+        :return: LabelGrid
+        """
+        if path.endswith('.npz'):
+            with np.load(path) as data:
+                return cls(data['x_nodes'], data['y_nodes'], data['labels'])
+        return cls(np.load(os.path.join(path, 'x_nodes.npy')), np.load(os.path.join(path, 'y_nodes.npy')),
+                   np.load(os.path.join(path, 'labels.npy'), mmap_mode=mmap_mode))
+
+
+class LabelGridSink(object):
+    """
+    On-disk LabelGrid filled by parts (rows of cells) as they are checked, in the directory format of
+    LabelGrid.save. Labels are memory-mapped, so memory doesn't depend on the size of the grid. Not yet checked
+    cells are UNKNOWN
+    """
+    def __init__(self, path, x_nodes, y_nodes):
+        """Constructor"""
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'x_nodes.npy'), np.asarray(x_nodes, dtype=np.float64))
+        np.save(os.path.join(path, 'y_nodes.npy'), np.asarray(y_nodes, dtype=np.float64))
+        self.labels = np.lib.format.open_memmap(os.path.join(path, 'labels.npy'), mode='w+', dtype=np.uint8,
+                                                shape=(len(y_nodes) - 1, len(x_nodes) - 1))
+        self.labels[:] = UNKNOWN
+
+    def write(self, rows, labels):
+        """
+        :param rows: (first row, last row + 1) of cells
+        :param labels: labels of these rows
+        """
+        self.labels[rows[0]:rows[1]] = labels
+
+    def consume(self, stream):
+        """
+        Write all parts of stream (see check_box.iter_check_box) and close the sink
+        :return: memory-mapped LabelGrid
+        """
+        for rows, labels in stream:
+            self.write(rows, labels)
+        return self.close()
+
+    def close(self):
+        """
+        :return: memory-mapped LabelGrid
+        """
+        self.labels.flush()
+        del self.labels
+        return LabelGrid.load(self.path, mmap_mode='r')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if hasattr(self, 'labels'):
+            self.close()
@@ -1,6 +1,12 @@
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
 import interval as ival
-from kravchik_operator import get_krav_func
-from box_class import BoxPoints
+import interval_array as iarr
+import instrumentation
+from box_class import BoxPoints, BoxList, LabelGrid, OUTSIDE, INSIDE, BORDER, UNKNOWN
 #  TODO: add more description for function check_box
 
 
@@ -19,21 +25,23 @@ def check_box(x, y, n, l1, l2, d, checker, coef, p=10):
     """
     area_points = BoxPoints()
     border_points = BoxPoints()
-    for i in range(n - 1):
-        for j in range(n - 1):
-            u1 = ival.Interval([x[i, j], x[i, j + 1]])  # Interval form of X-coordinate of rectangle of uniform grid
-            u2 = ival.Interval([y[i, j], y[i + 1, j]])  # Interval form of Y-coordinate of rectangle of uniform grid
-
-            if checker(u1, u2, l1, l2, d, coef, p) == 'inside': #or boundary_krav_eval(u1, u2, n, l1, l2, d, p) == 'inside':
-                area_points.add_point(u1[0], 'xleft')
-                area_points.add_point(u1[1], 'xright')         # inside the workspace area
-                area_points.add_point(u2[0], 'yleft')
-                area_points.add_point(u2[1], 'yright')
-            elif checker(u1, u2, l1, l2, d, coef, p) == 'border': #or boundary_krav_eval(u1, u2, n, l1, l2, d, p) == 'border':
-                border_points.add_point(u1[0], 'xleft')  # if it is inside previous interval, then it's
-                border_points.add_point(u1[1], 'xright')  # inside the workspace area
-                border_points.add_point(u2[0], 'yleft')
-                border_points.add_point(u2[1], 'yright')
+    with instrumentation.timer('cell_loop'):
+        for i in range(n - 1):
+            for j in range(n - 1):
+                u1 = ival.Interval([x[i, j], x[i, j + 1]])  # Interval form of X-coordinate of rectangle of uniform grid
+                u2 = ival.Interval([y[i, j], y[i + 1, j]])  # Interval form of Y-coordinate of rectangle of uniform grid
+
+                label = checker(u1, u2, l1, l2, d, coef, p)
+                if label == 'inside': #or boundary_krav_eval(u1, u2, n, l1, l2, d, p) == 'inside':
+                    area_points.add_point(u1[0], 'xleft')
+                    area_points.add_point(u1[1], 'xright')         # inside the workspace area
+                    area_points.add_point(u2[0], 'yleft')
+                    area_points.add_point(u2[1], 'yright')
+                elif label == 'border': #or boundary_krav_eval(u1, u2, n, l1, l2, d, p) == 'border':
+                    border_points.add_point(u1[0], 'xleft')  # if it is inside previous interval, then it's
+                    border_points.add_point(u1[1], 'xright')  # inside the workspace area
+                    border_points.add_point(u2[0], 'yleft')
+                    border_points.add_point(u2[1], 'yright')
     return area_points, border_points
 
 
@@ -52,19 +60,817 @@ def check_box_uni(x, y, n, V, param, checker, coef, p=10):
     """
     area_points = BoxPoints()
     border_points = BoxPoints()
-    for i in range(n - 1):
-        for j in range(n - 1):
-            u1 = ival.Interval([x[i, j], x[i, j + 1]])  # Interval form of X-coordinate of rectangle of uniform grid
-            u2 = ival.Interval([y[i, j], y[i + 1, j]])  # Interval form of Y-coordinate of rectangle of uniform grid
-            U = [u1, u2]
-            if checker(U, V, param, p) == 'inside': #or boundary_krav_eval(u1, u2, n, l1, l2, d, p) == 'inside':
-                area_points.add_point(u1[0], 'xleft')
-                area_points.add_point(u1[1], 'xright')         # inside the workspace area
-                area_points.add_point(u2[0], 'yleft')
-                area_points.add_point(u2[1], 'yright')
-            elif checker(U, V, param, p) == 'border': #or boundary_krav_eval(u1, u2, n, l1, l2, d, p) == 'border':
-                border_points.add_point(u1[0], 'xleft')  # if it is inside previous interval, then it's
-                border_points.add_point(u1[1], 'xright')  # inside the workspace area
-                border_points.add_point(u2[0], 'yleft')
-                border_points.add_point(u2[1], 'yright')
-    return area_points, border_points
\ No newline at end of file
+    with instrumentation.timer('cell_loop'):
+        for i in range(n - 1):
+            for j in range(n - 1):
+                u1 = ival.Interval([x[i, j], x[i, j + 1]])  # Interval form of X-coordinate of rectangle of uniform grid
+                u2 = ival.Interval([y[i, j], y[i + 1, j]])  # Interval form of Y-coordinate of rectangle of uniform grid
+                U = [u1, u2]
+                label = checker(U, V, param, p)
+                if label == 'inside': #or boundary_krav_eval(u1, u2, n, l1, l2, d, p) == 'inside':
+                    area_points.add_point(u1[0], 'xleft')
+                    area_points.add_point(u1[1], 'xright')         # inside the workspace area
+                    area_points.add_point(u2[0], 'yleft')
+                    area_points.add_point(u2[1], 'yright')
+                elif label == 'border': #or boundary_krav_eval(u1, u2, n, l1, l2, d, p) == 'border':
+                    border_points.add_point(u1[0], 'xleft')  # if it is inside previous interval, then it's
+                    border_points.add_point(u1[1], 'xright')  # inside the workspace area
+                    border_points.add_point(u2[0], 'yleft')
+                    border_points.add_point(u2[1], 'yright')
+    return area_points, border_points
+
+
+def grid_cells(x, y, n):
+    """
+    Interval form of all cells of uniform grid, in the same (i, j) order as check_box visits them
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :return: IntervalArrays u1, u2 of X- and Y-coordinates of (n - 1)^2 cells
+    """
+    return tile_cells(x[:n, :n], y[:n, :n])
+
+
+def tile_cells(x, y):
+    """
+    Interval form of all cells of (not necessarily square) part of uniform grid, row by row
+    :param x: X-coordinates of nodes of the part of uniform grid
+    :param y: Y-coordinates of nodes of the part of uniform grid
+    :return: IntervalArrays u1, u2 of X- and Y-coordinates of cells
+    """
+    u1 = iarr.IntervalArray(x[:-1, :-1].ravel(), x[:-1, 1:].ravel())
+    u2 = iarr.IntervalArray(y[:-1, :-1].ravel(), y[1:, :-1].ravel())
+    return u1, u2
+
+
+def lockstep_krav(transform, V, p=10, boxes=False, cells=None):
+    """
+    Contraction loop of Krawczyk-like checkers run for all cells together. Cells are dropped from the active set
+    as soon as they are classified inside or outside, the rest are border after p iterations.
+    Boxes of all cells are kept in one IntervalArray of shape (dim, cells), so the tests of containment and
+    intersection are single vector operations whatever the number of unknowns is
+    :param transform: function (active, V) returning the list of new IntervalArrays of V for active cells,
+                      active is the array of indices of cells which are still not classified, V is the list of
+                      IntervalArrays of their boxes (one per unknown)
+    :param V: list of IntervalArrays with start boxes of all cells (one per unknown)
+    :param p: the max number of iterations
+    :param boxes: return also the final evaluations of V of inside cells (NaN for the other cells)
+    :param cells: list of IntervalArrays of coordinates of cells, used only for instrumentation records
+    :return: array of labels of cells (and list of IntervalArrays of final V if boxes is True)
+    """
+    size = V[0].size
+    dim = len(V)
+    W = iarr.stack(V, size)
+    buffer = W.copy()  # new boxes of active cells, allocated once, the active cells are compacted to the left
+    labels = np.full(size, OUTSIDE, dtype=np.uint8)
+    active = np.arange(size)
+    final = iarr.IntervalArray.full((dim, size), [np.nan, np.nan]) if boxes else None
+    recorder = instrumentation.recorder
+    if recorder is not None:
+        iterations = np.zeros(size, dtype=np.int32)
+        width = np.zeros(size)
+    for k in range(p):
+        m = active.size
+        w = W[:, :m]
+        with instrumentation.timer('kernel_eval'):
+            v_krav = transform(active, iarr.unstack(w))
+        # v_krav is kept until the next evaluation, so its memory is reused for the temporaries of kernel
+        v_new = iarr.stack(v_krav, m, buffer)
+        inside = np.all(v_new.isIn(w), axis=0)
+        labels[active[inside]] = INSIDE  # if it is inside previous interval, then it's inside the workspace area
+        if boxes:
+            final[:, active[inside]] = v_new[:, inside]
+        if k == p - 1:
+            labels[active[~inside]] = BORDER  # if we achieve max of the iterations, then it's border
+            outside = ~inside
+        else:
+            outside = np.any(w.isNoIntersec(v_new), axis=0) & ~inside
+        if recorder is not None:
+            done = inside | outside
+            iterations[active[done]] = k + 1
+            width[active[done]] = np.max(w.width()[:, done], axis=0)
+        if k == p - 1:
+            break
+        keep = ~(inside | outside)
+        active = active[keep]
+        # if our evalution not fully inside, then intersect it and repeat
+        np.maximum(v_new.lo, w.lo, out=v_new.lo)
+        np.minimum(v_new.hi, w.hi, out=v_new.hi)
+        np.compress(keep, v_new.lo, axis=1, out=W.lo[:, :active.size])
+        np.compress(keep, v_new.hi, axis=1, out=W.hi[:, :active.size])
+        if active.size == 0:
+            break
+    if recorder is not None:
+        recorder.cells(cells or [], iterations, width, labels)
+    if boxes:
+        return labels, iarr.unstack(final)
+    return labels
+
+
+def check_box_batch(x, y, n, l1, l2, d, checker, coef, p=10):
+    """
+    Batched version of check_box: all cells of uniform grid are checked in one call of the batched checker
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param checker: batched checker, takes IntervalArrays u1, u2 and returns array of labels
+    :param p: the max number of iterations
+    :return: BoxPoints of workspace area and BoxPoints of border of workspace area
+    """
+    return check_box_grid(x, y, n, l1, l2, d, checker, coef, p).to_box_points()
+
+
+def check_box_uni_batch(x, y, n, V, param, checker, coef, p=10):
+    """
+    Batched version of check_box_uni: all cells of uniform grid are checked in one call of the batched checker
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param V: list of intervals of unknowns
+    :param param: list of const parameters
+    :param checker: batched checker, takes list of IntervalArrays U and returns array of labels
+    :param p: the max number of iterations
+    :return: BoxPoints of workspace area and BoxPoints of border of workspace area
+    """
+    return check_box_uni_grid(x, y, n, V, param, checker, coef, p).to_box_points()
+
+
+def check_box_grid(x, y, n, l1, l2, d, checker, coef, p=10, warm_start=None, prefilter=None):
+    """
+    The same as check_box_batch, but returns compact LabelGrid. With warm_start odd rows of cells start from
+    the boxes of their neighbours (see classify_grid_warm)
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param checker: batched checker, takes IntervalArrays u1, u2 and returns array of labels
+    :param p: the max number of iterations
+    :param warm_start: None or inflation factor of neighbour's box, e.g. 0.1
+    :param prefilter: None or function (u1, u2) returning labels of cells, which are decided without checker, and
+                      UNKNOWN for the others (see annuli_prefilter), it can't be used together with warm_start
+    :return: LabelGrid of all cells
+    """
+    if warm_start is not None and prefilter is not None:
+        raise ValueError("prefilter can't be used with warm_start")
+    if warm_start is not None:
+        classify = functools.partial(classify_classical_warm, checker=checker, l1=l1, l2=l2, d=d, coef=coef, p=p)
+        with instrumentation.timer('cell_loop'):
+            labels = classify_grid_warm(x, y, n, classify, warm_start)
+        return LabelGrid.from_meshgrid(x, y, n, labels)
+    u1, u2 = grid_cells(x, y, n)
+    classify = functools.partial(classify_classical, checker=checker, l1=l1, l2=l2, d=d, coef=coef, p=p)
+    if prefilter is not None:
+        classify = functools.partial(classify_prefiltered, classify=classify, prefilter=prefilter)
+    with instrumentation.timer('cell_loop'):
+        labels = classify(u1, u2)
+    return LabelGrid.from_meshgrid(x, y, n, labels)
+
+
+def check_box_uni_grid(x, y, n, V, param, checker, coef, p=10, warm_start=None, prefilter=None):
+    """
+    The same as check_box_uni_batch, but returns compact LabelGrid. With warm_start odd rows of cells start from
+    the boxes of their neighbours (see classify_grid_warm)
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param V: list of intervals of unknowns
+    :param param: list of const parameters
+    :param checker: batched checker, takes list of IntervalArrays U and returns array of labels
+    :param p: the max number of iterations
+    :param warm_start: None or inflation factor of neighbour's box, e.g. 0.1
+    :param prefilter: None or function (u1, u2) returning labels of cells, which are decided without checker, and
+                      UNKNOWN for the others (see annuli_prefilter), it can't be used together with warm_start
+    :return: LabelGrid of all cells
+    """
+    if warm_start is not None and prefilter is not None:
+        raise ValueError("prefilter can't be used with warm_start")
+    if warm_start is not None:
+        classify = functools.partial(classify_uni_warm, checker=checker, V=V, param=param, p=p)
+        with instrumentation.timer('cell_loop'):
+            labels = classify_grid_warm(x, y, n, classify, warm_start)
+        return LabelGrid.from_meshgrid(x, y, n, labels)
+    u1, u2 = grid_cells(x, y, n)
+    classify = functools.partial(classify_uni, checker=checker, V=V, param=param, p=p)
+    if prefilter is not None:
+        classify = functools.partial(classify_prefiltered, classify=classify, prefilter=prefilter)
+    with instrumentation.timer('cell_loop'):
+        labels = classify(u1, u2)
+    return LabelGrid.from_meshgrid(x, y, n, labels)
+
+
+def classify_classical(u1, u2, checker, l1, l2, d, coef, p):
+    """
+    Labels of cells u1, u2 by batched checker of 2-RPR (see check_box_batch)
+    """
+    return checker(u1, u2, l1, l2, d, coef, p)
+
+
+def classify_uni(u1, u2, checker, V, param, p):
+    """
+    Labels of cells u1, u2 by batched unified checker (see check_box_uni_batch)
+    """
+    return checker([u1, u2], V, param, p)
+
+
+def classify_prefiltered(u1, u2, classify, prefilter):
+    """
+    Labels of cells u1, u2: cells decided by prefilter keep its labels, only the rest are passed to classify
+    """
+    labels = prefilter(u1, u2)
+    rest = np.nonzero(labels == UNKNOWN)[0]
+    if rest.size:
+        labels[rest] = classify(u1[rest], u2[rest])
+    return labels
+
+
+def annuli_prefilter(u1, u2, centers, ranges):
+    """
+    Analytic test for problems, whose workspace is the intersection of annuli (2-RPR: the distances from the cell to
+    the joints of rods are the lengths of rods). Exact min and max distances from every cell to every center are
+    compared with the ranges
+    :param u1: IntervalArray of the X coordinates of cells
+    :param u2: IntervalArray of the Y coordinates of cells
+    :param centers: list of (x, y) of centers of annuli
+    :param ranges: list of (r_min, r_max) of annuli
+    :return: array of labels: INSIDE if the cell is inside all annuli, OUTSIDE if it is outside one of them,
+             UNKNOWN otherwise
+    """
+    inside = np.ones(u1.shape, dtype=bool)
+    outside = np.zeros(u1.shape, dtype=bool)
+    for (cx, cy), (r_min, r_max) in zip(centers, ranges):
+        dx_max = np.maximum(np.abs(u1.lo - cx), np.abs(u1.hi - cx))
+        dy_max = np.maximum(np.abs(u2.lo - cy), np.abs(u2.hi - cy))
+        dx_min = np.maximum(np.maximum(u1.lo - cx, cx - u1.hi), 0.0)  # zero if the center is between the bounds
+        dy_min = np.maximum(np.maximum(u2.lo - cy, cy - u2.hi), 0.0)
+        dist_min = np.hypot(dx_min, dy_min)
+        dist_max = np.hypot(dx_max, dy_max)
+        inside &= (dist_min >= r_min) & (dist_max <= r_max)
+        outside |= (dist_max < r_min) | (dist_min > r_max)
+    return np.where(outside, OUTSIDE, np.where(inside, INSIDE, UNKNOWN)).astype(np.uint8)
+
+
+def rpr_prefilter(u1, u2, l1, l2, d):
+    """
+    annuli_prefilter for 2-RPR with both rods in the range [l1, l2] and joints in (0, 0) and (d, 0)
+    """
+    return annuli_prefilter(u1, u2, [(0.0, 0.0), (d, 0.0)], [(l1, l2), (l1, l2)])
+
+
+def rpr_border_cells(u1, u2, l1, l2, d):
+    """
+    Cells, which may hold the border of 2-RPR workspace: the circles of its annuli cross them (see annuli_prefilter)
+    :return: boolean array
+    """
+    return rpr_prefilter(u1, u2, l1, l2, d) == UNKNOWN
+
+
+def classify_classical_warm(u1, u2, V0, checker, l1, l2, d, coef, p):
+    """
+    Labels and final boxes of cells u1, u2 by batched checker of 2-RPR started from boxes V0
+    """
+    return checker(u1, u2, l1, l2, d, coef, p, V0=V0, boxes=True)
+
+
+def classify_uni_warm(u1, u2, V0, checker, V, param, p):
+    """
+    Labels and final boxes of cells u1, u2 by batched unified checker started from boxes V0
+    """
+    return checker([u1, u2], V, param, p, V0=V0, boxes=True)
+
+
+def classify_grid_warm(x, y, n, classify, inflate=0.1):
+    """
+    Check uniform grid in two passes: even rows of cells are checked from the full box, then every cell of odd row,
+    whose lower and upper neighbours are inside, starts from the hull of their final boxes inflated by factor
+    1 + inflate. Inside label for any start box inside the full one is proven, so only these are taken from the warm
+    run, all the other cells are checked again from the full box and get the same labels as without warm start
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param classify: function (u1, u2, V0) returning labels and final boxes of cells, V0 is None for the full box
+    :param inflate: relative inflation of the hull of neighbours' boxes
+    :return: array of labels of shape (n - 1, n - 1)
+    """
+    u1, u2 = grid_cells(x, y, n)
+    labels = np.empty((n - 1, n - 1), dtype=np.uint8)
+    even = np.arange(0, n - 1, 2)
+    cells = (even[:, None] * (n - 1) + np.arange(n - 1)).ravel()
+    even_labels, even_boxes = classify(u1[cells], u2[cells], None)
+    labels[even] = even_labels.reshape(even.size, n - 1)
+    odd = np.arange(1, n - 1, 2)
+    if odd.size == 0:
+        return labels
+    inside = even_labels.reshape(even.size, n - 1) == INSIDE
+    lower = np.arange(odd.size)[:, None] * (n - 1) + np.arange(n - 1)  # row 2k is below row 2k + 1
+    upper = np.where(lower + n - 1 < even_labels.size, lower + n - 1, lower)  # the last odd row may be the top one
+    lower = lower.ravel()
+    upper = upper.ravel()
+    warm = inside.ravel()[lower] & inside.ravel()[upper]
+    cells = (odd[:, None] * (n - 1) + np.arange(n - 1)).ravel()
+    odd_labels = np.full(cells.size, OUTSIDE, dtype=np.uint8)
+    if np.any(warm):
+        idx = np.nonzero(warm)[0]
+        below = lower[idx]
+        above = upper[idx]
+        V0 = []
+        for v in even_boxes:
+            hull = iarr.IntervalArray(np.minimum(v.lo[below], v.lo[above]), np.maximum(v.hi[below], v.hi[above]))
+            hull.scale(1 + inflate)
+            V0.append(hull)
+        warm_labels = classify(u1[cells[idx]], u2[cells[idx]], V0)[0]
+        odd_labels[idx[warm_labels == INSIDE]] = INSIDE
+        warm[idx[warm_labels != INSIDE]] = False
+    cold = np.nonzero(~warm)[0]
+    if cold.size:
+        odd_labels[cold] = classify(u1[cells[cold]], u2[cells[cold]], None)[0]
+    labels[odd] = odd_labels.reshape(odd.size, n - 1)
+    return labels
+
+
+def symmetric_meshgrid(bounds, n, symmetries):
+    """
+    Uniform grid, which is aligned to the symmetries: the bounds are widened to be symmetric about every mirror line,
+    so mirrored cells of the grid are cells of the same grid
+    :param bounds: (xleft, xright, yleft, yright) of the region of interest
+    :param n: number of nodes of uniform grid
+    :param symmetries: list of mirror lines (axis, value): axis 0 is the line u1 = value, axis 1 is u2 = value
+    :return: X, Y of uniform grid (like np.meshgrid)
+    """
+    ranges = [list(bounds[:2]), list(bounds[2:])]
+    for axis, value in symmetries:
+        r = max(value - ranges[axis][0], ranges[axis][1] - value)
+        ranges[axis] = [value - r, value + r]
+    return np.meshgrid(np.linspace(ranges[0][0], ranges[0][1], n), np.linspace(ranges[1][0], ranges[1][1], n))
+
+
+def classify_grid_symmetric(x, y, n, classify, symmetries):
+    """
+    Check only the fundamental region of uniform grid and mirror its labels to the rest of the grid
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param classify: function (u1, u2) returning array of labels of cells
+    :param symmetries: list of mirror lines (axis, value) of the problem, the grid must be symmetric about them
+                       (see symmetric_meshgrid)
+    :return: array of labels of shape (n - 1, n - 1)
+    """
+    nodes = [x[0, :n], y[:n, 0]]
+    start = [0, 0]
+    for axis, value in symmetries:
+        if not np.allclose(2 * value - nodes[axis], nodes[axis][::-1]):
+            raise ValueError("Grid is not symmetric about u%d = %g" % (axis + 1, value))
+        start[axis] = (n - 1) // 2  # the middle cell of odd number of cells is mirrored to itself
+    u1, u2 = tile_cells(x[start[1]:n, start[0]:n], y[start[1]:n, start[0]:n])
+    labels = np.empty((n - 1, n - 1), dtype=np.uint8)
+    labels[start[1]:, start[0]:] = classify(u1, u2).reshape(n - 1 - start[1], n - 1 - start[0])
+    if start[0]:
+        labels[start[1]:, :start[0]] = labels[start[1]:, n - 1 - start[0]:][:, ::-1]
+    if start[1]:
+        labels[:start[1]] = labels[n - 1 - start[1]:][::-1]
+    return labels
+
+
+def check_box_symmetric(x, y, n, l1, l2, d, checker, coef, p=10, symmetries=None):
+    """
+    The same as check_box_grid, but only the fundamental region of the grid is checked. Both rods of 2-RPR have
+    the range [l1, l2], so it is symmetric about u2 = 0 and u1 = d / 2
+    :param x: X-coordinates of elements of uniform grid, which is symmetric (see symmetric_meshgrid)
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param checker: batched checker, e.g. classical_krav_eval_batch
+    :param p: the max number of iterations
+    :param symmetries: list of mirror lines (axis, value), by default both lines of 2-RPR
+    :return: LabelGrid of all cells
+    """
+    if symmetries is None:
+        symmetries = [(0, d / 2), (1, 0.0)]
+    classify = functools.partial(classify_classical, checker=checker, l1=l1, l2=l2, d=d, coef=coef, p=p)
+    return LabelGrid.from_meshgrid(x, y, n, classify_grid_symmetric(x, y, n, classify, symmetries))
+
+
+def check_box_uni_symmetric(x, y, n, V, param, checker, coef, p=10, symmetries=()):
+    """
+    The same as check_box_uni_grid, but only the fundamental region of the grid is checked
+    :param x: X-coordinates of elements of uniform grid, which is symmetric (see symmetric_meshgrid)
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param V: list of intervals of unknowns
+    :param param: list of const parameters
+    :param checker: batched checker, e.g. unified_krav_eval_batch
+    :param p: the max number of iterations
+    :param symmetries: list of mirror lines (axis, value) of the problem, e.g. from symmetries_2rpr
+    :return: LabelGrid of all cells
+    """
+    classify = functools.partial(classify_uni, checker=checker, V=V, param=param, p=p)
+    return LabelGrid.from_meshgrid(x, y, n, classify_grid_symmetric(x, y, n, classify, symmetries))
+
+
+INCREMENTAL_MAX_RADIUS = 0.125  # Band radius (part of the grid side), beyond which the whole grid is checked again
+
+
+def dilate(mask, radius):
+    """
+    Grow the mask of cells by radius cells in every direction (square neighbourhood)
+    :param mask: 2D boolean array
+    :param radius: number of cells
+    :return: 2D boolean array
+    """
+    for axis in (0, 1):
+        pad = [(0, 0), (0, 0)]
+        pad[axis] = (radius + 1, radius)
+        sums = np.cumsum(np.pad(mask, pad).astype(np.int32), axis=axis)
+        size = mask.shape[axis]
+        mask = (np.take(sums, np.arange(2 * radius + 1, 2 * radius + 1 + size), axis=axis) -
+                np.take(sums, np.arange(size), axis=axis)) > 0  # number of cells of the mask in the window
+    return mask
+
+
+def classify_grid_incremental(previous, classify, shift, monotone=None, candidates=None):
+    """
+    Labels of the grid of previous result after a small change of the problem. Only the cells within shift of
+    the old border, or of the cells given by candidates, are checked again, the others keep their labels. With
+    monotone the workspace is known to grow (old inside cells stay inside) or to shrink (old outside cells stay
+    outside), so only the other cells of the band are checked. If the old grid has no border cells (e.g. the old
+    workspace is empty) or shift is not small compared with the grid, all cells are checked again
+    :param previous: LabelGrid of the problem before the change
+    :param classify: function (u1, u2) returning array of labels of cells of the changed problem
+    :param shift: distance, which the border of workspace moves by, a bound or an estimate (see border_shift_2rpr)
+    :param monotone: None, 'grow' or 'shrink'
+    :param candidates: None or function (u1, u2) returning boolean array, True for cells, which may hold the border
+                       of the old or of the new workspace (e.g. from rpr_border_cells), they are checked again with
+                       the band around them
+    :return: array of labels of the same shape as previous.labels
+    """
+    if monotone not in (None, 'grow', 'shrink'):
+        raise ValueError("monotone must be None, 'grow' or 'shrink', not %r" % (monotone,))
+    step = min(np.min(np.diff(previous.x_nodes)), np.min(np.diff(previous.y_nodes)))
+    radius = int(np.ceil(shift / step)) + 1  # the border may cross to the next cell
+    band = previous.labels == BORDER
+    if not np.any(band) or radius > INCREMENTAL_MAX_RADIUS * min(previous.shape):
+        band = np.ones(previous.shape, dtype=bool)
+    else:
+        if candidates is not None:
+            rows, cols = np.indices(previous.shape).reshape(2, -1)
+            band |= np.asarray(candidates(iarr.IntervalArray(previous.x_nodes[cols], previous.x_nodes[cols + 1]),
+                                          iarr.IntervalArray(previous.y_nodes[rows], previous.y_nodes[rows + 1])),
+                               dtype=bool).reshape(previous.shape)
+        band = dilate(band, radius)
+    if monotone == 'grow':
+        band &= previous.labels != INSIDE
+    elif monotone == 'shrink':
+        band &= previous.labels != OUTSIDE
+    labels = np.array(previous.labels)
+    rows, cols = np.nonzero(band)
+    if rows.size:
+        u1 = iarr.IntervalArray(previous.x_nodes[cols], previous.x_nodes[cols + 1])
+        u2 = iarr.IntervalArray(previous.y_nodes[rows], previous.y_nodes[rows + 1])
+        labels[rows, cols] = classify(u1, u2)
+    return labels
+
+
+def check_box_incremental(previous, l1, l2, d, checker, coef, p=10, shift=0.0, monotone=None, prefilter=None,
+                          previous_params=None):
+    """
+    The same as check_box_grid on the grid of previous result, but only the cells near the old border and near
+    the circles of the old and the new annuli are checked (see classify_grid_incremental)
+    :param previous: LabelGrid of 2-RPR with the old parameters
+    :param l1: the new lowest range of 2-RPR rod
+    :param l2: the new highest range of 2-RPR rod
+    :param d: the new distance between rods
+    :param checker: batched checker, takes IntervalArrays u1, u2 and returns array of labels
+    :param p: the max number of iterations
+    :param shift: upper bound of the distance, which the border moves by, e.g. the largest change of l1, l2 and d
+    :param monotone: None, 'grow' (the new workspace contains the old one) or 'shrink'
+    :param prefilter: None or function (u1, u2) returning labels of cells, which are decided without checker, and
+                      UNKNOWN for the others (see annuli_prefilter)
+    :param previous_params: None or the old (l1, l2, d), the circles of both annuli are added to the band
+    :return: LabelGrid of all cells
+    """
+    classify = functools.partial(classify_classical, checker=checker, l1=l1, l2=l2, d=d, coef=coef, p=p)
+    if prefilter is not None:
+        classify = functools.partial(classify_prefiltered, classify=classify, prefilter=prefilter)
+    candidates = functools.partial(_either_border_cells, params=[(l1, l2, d)] + ([tuple(previous_params)]
+                                                                                   if previous_params else []))
+    with instrumentation.timer('cell_loop'):
+        labels = classify_grid_incremental(previous, classify, shift, monotone, candidates)
+    return LabelGrid(previous.x_nodes, previous.y_nodes, labels)
+
+
+def _either_border_cells(u1, u2, params):
+    """
+    Cells, which may hold the border of 2-RPR workspace with any of params (list of (l1, l2, d))
+    """
+    mask = np.zeros(u1.shape, dtype=bool)
+    for l1, l2, d in params:
+        mask |= rpr_border_cells(u1, u2, l1, l2, d)
+    return mask
+
+
+def check_box_uni_incremental(previous, V, param, checker, coef, p=10, shift=0.0, monotone=None, prefilter=None,
+                              candidates=None):
+    """
+    The same as check_box_uni_grid on the grid of previous result, but only the cells near the old border are
+    checked (see classify_grid_incremental)
+    :param previous: LabelGrid of the problem with the old parameters
+    :param V: the new list of intervals of unknowns
+    :param param: the new list of const parameters
+    :param checker: batched checker, takes list of IntervalArrays U and returns array of labels
+    :param p: the max number of iterations
+    :param shift: distance, which the border moves by, e.g. the estimate of border_shift_2rpr
+    :param monotone: None, 'grow' or 'shrink', e.g. from monotone_2rpr
+    :param prefilter: None or function (u1, u2) returning labels of cells, which are decided without checker, and
+                      UNKNOWN for the others (see annuli_prefilter)
+    :param candidates: None or function (u1, u2) returning boolean array of cells, which may hold the old or
+                       the new border, e.g. from border_cells_2rpr (see classify_grid_incremental)
+    :return: LabelGrid of all cells
+    """
+    classify = functools.partial(classify_uni, checker=checker, V=V, param=param, p=p)
+    if prefilter is not None:
+        classify = functools.partial(classify_prefiltered, classify=classify, prefilter=prefilter)
+    with instrumentation.timer('cell_loop'):
+        labels = classify_grid_incremental(previous, classify, shift, monotone, candidates)
+    return LabelGrid(previous.x_nodes, previous.y_nodes, labels)
+
+
+def split_border_boxes(bounds, classify, min_width=0.0, max_depth=8):
+    """
+    Adaptive subdivision (branch-and-prune): starting from the bounding box, inside and outside boxes are kept as
+    they are and border boxes are split into 4 equal boxes, until they are narrower than 2 * min_width or
+    max_depth is reached. Every level of quadtree is checked in one call of the batched checker
+    :param bounds: bounding box (xleft, xright, yleft, yright)
+    :param classify: function (u1, u2) returning array of labels of cells
+    :param min_width: boxes are not split into boxes narrower than min_width
+    :param max_depth: the max depth of quadtree
+    :return: BoxList of leaves of quadtree
+    """
+    u1 = iarr.IntervalArray([bounds[0]], [bounds[1]])
+    u2 = iarr.IntervalArray([bounds[2]], [bounds[3]])
+    leaves = []
+    for depth in range(max_depth + 1):
+        labels = classify(u1, u2)
+        split = labels == BORDER
+        if depth == max_depth:
+            split[:] = False
+        else:
+            split &= 0.5 * np.maximum(u1.width(), u2.width()) >= min_width
+        keep = ~split
+        leaves.append((u1[0][keep], u1[1][keep], u2[0][keep], u2[1][keep], labels[keep],
+                       np.full(np.count_nonzero(keep), depth)))
+        if not np.any(split):
+            break
+        u1 = u1[split]
+        u2 = u2[split]
+        x_mid = u1.mid()
+        y_mid = u2.mid()
+        # children in order: lower left, lower right, upper left, upper right
+        u1 = iarr.IntervalArray(np.concatenate([u1[0], x_mid, u1[0], x_mid]),
+                                np.concatenate([x_mid, u1[1], x_mid, u1[1]]))
+        u2 = iarr.IntervalArray(np.concatenate([u2[0], u2[0], y_mid, y_mid]),
+                                np.concatenate([y_mid, y_mid, u2[1], u2[1]]))
+    return BoxList(*[np.concatenate([leaf[i] for leaf in leaves]) for i in range(6)])
+
+
+def check_box_adaptive(bounds, l1, l2, d, checker, coef, p=10, min_width=0.0, max_depth=8, prefilter=None):
+    """
+    Adaptive version of check_box_batch: only border boxes are split (see split_border_boxes)
+    :param bounds: bounding box (xleft, xright, yleft, yright)
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param checker: batched checker, takes IntervalArrays u1, u2 and returns array of labels
+    :param p: the max number of iterations
+    :param min_width: boxes are not split into boxes narrower than min_width
+    :param max_depth: the max depth of quadtree
+    :param prefilter: None or analytic test of cells (see check_box_grid)
+    :return: BoxList of classified boxes
+    """
+    classify = functools.partial(classify_classical, checker=checker, l1=l1, l2=l2, d=d, coef=coef, p=p)
+    if prefilter is not None:
+        classify = functools.partial(classify_prefiltered, classify=classify, prefilter=prefilter)
+    return split_border_boxes(bounds, classify, min_width, max_depth)
+
+
+def check_box_uni_adaptive(bounds, V, param, checker, coef, p=10, min_width=0.0, max_depth=8, prefilter=None):
+    """
+    Adaptive version of check_box_uni_batch: only border boxes are split (see split_border_boxes)
+    :param bounds: bounding box (xleft, xright, yleft, yright)
+    :param V: list of intervals of unknowns
+    :param param: list of const parameters
+    :param checker: batched checker, takes list of IntervalArrays U and returns array of labels
+    :param p: the max number of iterations
+    :param min_width: boxes are not split into boxes narrower than min_width
+    :param max_depth: the max depth of quadtree
+    :param prefilter: None or analytic test of cells (see check_box_grid)
+    :return: BoxList of classified boxes
+    """
+    classify = functools.partial(classify_uni, checker=checker, V=V, param=param, p=p)
+    if prefilter is not None:
+        classify = functools.partial(classify_prefiltered, classify=classify, prefilter=prefilter)
+    return split_border_boxes(bounds, classify, min_width, max_depth)
+
+
+BORDER_TILE_COST = 10  # Estimated cost of a cell of border tile relative to a cell of inside or outside tile
+_shared_labels = None  # Label array shared between worker processes, set by _init_worker
+
+
+def _init_worker(raw_labels, shape):
+    global _shared_labels
+    _shared_labels = np.frombuffer(raw_labels, dtype=np.uint8).reshape(shape)
+
+
+def _classify_tile(rows, cols, x, y, classify):
+    """
+    Check cells of one tile and write their labels into the shared label array
+    """
+    u1, u2 = tile_cells(x, y)
+    _shared_labels[rows[0]:rows[1], cols[0]:cols[1]] = classify(u1, u2).reshape(rows[1] - rows[0], cols[1] - cols[0])
+
+
+def plan_tiles(x, y, n, classify, workers, tile=None):
+    """
+    Split cells of uniform grid into tiles and order them by estimated cost. Every tile is checked as one big box
+    first: border tiles are split into 4 smaller tiles and go first, so that slow border-heavy parts of the grid
+    don't leave the other workers idle at the end
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param classify: function (u1, u2) returning array of labels of cells
+    :param workers: number of worker processes
+    :param tile: side of tile in cells, by default about 4 tiles per worker along each side
+    :return: list of tiles ((first row, last row + 1), (first col, last col + 1)), the most expensive first
+    """
+    cells = n - 1
+    if tile is None:
+        tile = max(8, -(-cells // (4 * workers)))
+    tiles = [((r, min(r + tile, cells)), (c, min(c + tile, cells)))
+             for r in range(0, cells, tile) for c in range(0, cells, tile)]
+    u1 = iarr.IntervalArray([x[r[0], c[0]] for r, c in tiles], [x[r[0], c[1]] for r, c in tiles])
+    u2 = iarr.IntervalArray([y[r[0], c[0]] for r, c in tiles], [y[r[1], c[0]] for r, c in tiles])
+    labels = classify(u1, u2)
+    planned = []
+    for (rows, cols), label in zip(tiles, labels):
+        size = (rows[1] - rows[0]) * (cols[1] - cols[0])
+        if label != BORDER:
+            planned.append((size, rows, cols))
+            continue
+        r_mid = (rows[0] + rows[1] + 1) // 2
+        c_mid = (cols[0] + cols[1] + 1) // 2
+        for sub_rows in ((rows[0], r_mid), (r_mid, rows[1])):
+            for sub_cols in ((cols[0], c_mid), (c_mid, cols[1])):
+                size = (sub_rows[1] - sub_rows[0]) * (sub_cols[1] - sub_cols[0])
+                if size > 0:
+                    planned.append((size * BORDER_TILE_COST, sub_rows, sub_cols))
+    planned.sort(key=lambda t: (-t[0], t[1], t[2]))
+    return [(rows, cols) for cost, rows, cols in planned]
+
+
+def classify_grid_parallel(x, y, n, classify, workers=None, tile=None):
+    """
+    Check all cells of uniform grid by tiles on a pool of processes, which write labels into shared memory.
+    Labels don't depend on tiling and number of workers
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param classify: picklable function (u1, u2) returning array of labels of cells
+    :param workers: number of worker processes, by default the number of CPUs
+    :param tile: side of tile in cells (see plan_tiles)
+    :return: array of labels of shape (n - 1, n - 1)
+    """
+    global _shared_labels
+    workers = workers or os.cpu_count() or 1
+    shape = (n - 1, n - 1)
+    tiles = plan_tiles(x, y, n, classify, workers, tile)
+    raw_labels = multiprocessing.RawArray('B', shape[0] * shape[1])
+    args = [(rows, cols, x[rows[0]:rows[1] + 1, cols[0]:cols[1] + 1], y[rows[0]:rows[1] + 1, cols[0]:cols[1] + 1],
+             classify) for rows, cols in tiles]
+    if workers == 1:
+        _init_worker(raw_labels, shape)
+        for arg in args:
+            _classify_tile(*arg)
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(raw_labels, shape)) as executor:
+            for future in [executor.submit(_classify_tile, *arg) for arg in args]:
+                future.result()  # Raise errors of workers
+    _shared_labels = None
+    return np.frombuffer(raw_labels, dtype=np.uint8).reshape(shape).copy()
+
+
+def check_box_parallel(x, y, n, l1, l2, d, checker, coef, p=10, workers=None, tile=None):
+    """
+    Multi-process version of check_box_batch (see classify_grid_parallel)
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param checker: batched checker, takes IntervalArrays u1, u2 and returns array of labels
+    :param p: the max number of iterations
+    :param workers: number of worker processes, by default the number of CPUs
+    :param tile: side of tile in cells
+    :return: BoxPoints of workspace area and BoxPoints of border of workspace area
+    """
+    classify = functools.partial(classify_classical, checker=checker, l1=l1, l2=l2, d=d, coef=coef, p=p)
+    return LabelGrid.from_meshgrid(x, y, n, classify_grid_parallel(x, y, n, classify, workers, tile)).to_box_points()
+
+
+def check_box_uni_parallel(x, y, n, V, param, checker, coef, p=10, workers=None, tile=None):
+    """
+    Multi-process version of check_box_uni_batch (see classify_grid_parallel)
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param V: list of intervals of unknowns
+    :param param: list of const parameters
+    :param checker: batched checker, takes list of IntervalArrays U and returns array of labels
+    :param p: the max number of iterations
+    :param workers: number of worker processes, by default the number of CPUs
+    :param tile: side of tile in cells
+    :return: BoxPoints of workspace area and BoxPoints of border of workspace area
+    """
+    classify = functools.partial(classify_uni, checker=checker, V=V, param=param, p=p)
+    return LabelGrid.from_meshgrid(x, y, n, classify_grid_parallel(x, y, n, classify, workers, tile)).to_box_points()
+
+
+def _classify_rows(x, y, classify):
+    u1, u2 = tile_cells(x, y)
+    return classify(u1, u2).reshape(x.shape[0] - 1, x.shape[1] - 1)
+
+
+def iter_classify_grid(x, y, n, classify, rows=16, workers=1):
+    """
+    Generator, which checks uniform grid by bands of rows of cells and yields them as soon as they are ready, so that
+    memory doesn't depend on the size of the grid. x and y can be views of np.meshgrid(X1, Y1, copy=False)
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param classify: function (u1, u2) returning array of labels of cells, picklable if workers > 1
+    :param rows: number of rows of cells in one band
+    :param workers: number of worker processes, bands are yielded in order of completion if it is more than 1
+    :return: iterator of ((first row, last row + 1), labels of these rows)
+    """
+    bands = [(r, min(r + rows, n - 1)) for r in range(0, n - 1, rows)]
+    if workers == 1:
+        for band in bands:
+            yield band, _classify_rows(x[band[0]:band[1] + 1, :n], y[band[0]:band[1] + 1, :n], classify)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending = {}
+        bands = iter(bands)
+        while True:
+            for band in bands:  # Keep at most 2 bands per worker in flight
+                future = executor.submit(_classify_rows, np.array(x[band[0]:band[1] + 1, :n]),
+                                         np.array(y[band[0]:band[1] + 1, :n]), classify)
+                pending[future] = band
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+
+def iter_check_box(x, y, n, l1, l2, d, checker, coef, p=10, rows=16, workers=1):
+    """
+    Streaming version of check_box_batch (see iter_classify_grid)
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param checker: batched checker, takes IntervalArrays u1, u2 and returns array of labels
+    :param p: the max number of iterations
+    :param rows: number of rows of cells in one band
+    :param workers: number of worker processes
+    :return: iterator of ((first row, last row + 1), labels of these rows)
+    """
+    classify = functools.partial(classify_classical, checker=checker, l1=l1, l2=l2, d=d, coef=coef, p=p)
+    return iter_classify_grid(x, y, n, classify, rows, workers)
+
+
+def iter_check_box_uni(x, y, n, V, param, checker, coef, p=10, rows=16, workers=1):
+    """
+    Streaming version of check_box_uni_batch (see iter_classify_grid)
+    :param x: X-coordinates of elements of uniform grid
+    :param y: Y-coordinates of elements of uniform grid
+    :param n: number of nodes of uniform grid
+    :param V: list of intervals of unknowns
+    :param param: list of const parameters
+    :param checker: batched checker, takes list of IntervalArrays U and returns array of labels
+    :param p: the max number of iterations
+    :param rows: number of rows of cells in one band
+    :param workers: number of worker processes
+    :return: iterator of ((first row, last row + 1), labels of these rows)
+    """
+    classify = functools.partial(classify_uni, checker=checker, V=V, param=param, p=p)
+    return iter_classify_grid(x, y, n, classify, rows, workers)
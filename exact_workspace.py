@@ -0,0 +1,18 @@
+import shapely.geometry as sg
+
+
+def rpr_workspace(l1, l2, d):
+    """
+    Exact workspace area of 2-RPR robot as shapely geometry
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d:  the distance between rods
+    :return: shapely polygon
+    """
+    a = sg.Point(0,0).buffer(l1)  # Init circles with shapely
+    b = sg.Point(0,0).buffer(l2)
+    c = sg.Point(d,0).buffer(l1)
+    e = sg.Point(d,0).buffer(l2)
+    ab = b.difference(a)  # Calculate rings as a difference of bigger circle and smaller circle for each rod
+    cd = e.difference(c)
+    return ab.intersection(cd)  # Calculates final area of robot workspace as intersection of two rings
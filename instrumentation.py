@@ -0,0 +1,161 @@
+import contextlib
+import csv
+import functools
+import json
+import time
+import numpy as np
+from box_class import LABEL_NAMES
+
+recorder = None  # Active Recorder, None turns instrumentation off (checkers only test this global then)
+_off = contextlib.nullcontext()
+
+
+class Recorder(object):
+    """
+    Collects records of checked cells (iterations used, final width of V, exit reason) and per-phase timers.
+    Exit reason 'border' means that the cell reached the max number of iterations p
+    """
+    def __init__(self, sink):
+        """
+        :param sink: function, which takes report dict (see report) when recording is finished, e.g. json_sink
+        """
+        self.sink = sink
+        self.timers = {}
+        self.counts = {}
+        self._cells = []
+        self._running = set()
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        if phase in self._running:  # nested timer of the same phase (e.g. kernel built by another kernel)
+            yield
+            return
+        self._running.add(phase)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._running.discard(phase)
+            self.timers[phase] = self.timers.get(phase, 0.0) + time.perf_counter() - start
+            self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def cells(self, U, iterations, width, labels):
+        """
+        Add records of many cells
+        :param U: list of IntervalArrays (or intervals) of coordinates of cells, may be empty
+        :param iterations: array of numbers of iterations
+        :param width: array of max widths of V at exit
+        :param labels: array of labels (see box_class)
+        """
+        size = np.size(iterations)
+        lo = np.empty((size, len(U)))
+        hi = np.empty((size, len(U)))
+        for i, u in enumerate(U):
+            lo[:, i] = np.asarray(u[0], dtype=np.float64).ravel()
+            hi[:, i] = np.asarray(u[1], dtype=np.float64).ravel()
+        self._cells.append((lo, hi, np.asarray(iterations).reshape(size), np.asarray(width).reshape(size),
+                            np.asarray(labels).reshape(size)))
+
+    def report(self):
+        """
+        :return: dict with 'timers' (phase -> {'seconds', 'calls'}) and 'cells' (list of dicts with 'u_lo', 'u_hi',
+                 'iterations', 'width', 'reason')
+        """
+        cells = []
+        for lo, hi, iterations, width, labels in self._cells:
+            for i in range(iterations.size):
+                cells.append({'u_lo': lo[i].tolist(), 'u_hi': hi[i].tolist(), 'iterations': int(iterations[i]),
+                              'width': float(width[i]), 'reason': LABEL_NAMES[labels[i]]})
+        return {'timers': {phase: {'seconds': self.timers[phase], 'calls': self.counts[phase]}
+                           for phase in self.timers},
+                'cells': cells}
+
+    def close(self):
+        self.sink(self.report())
+
+
+@contextlib.contextmanager
+def record(sink):
+    """
+    Turn instrumentation on inside the with block, the report is passed to sink at the end
+    :param sink: function taking report dict, e.g. json_sink(path), csv_sink(path) or any callback
+    :return: Recorder
+    """
+    global recorder
+    previous = recorder
+    recorder = Recorder(sink)
+    try:
+        yield recorder
+    finally:
+        active, recorder = recorder, previous
+        active.close()
+
+
+def timer(phase):
+    """
+    Context manager adding the time of with block to the phase timer, does nothing if instrumentation is off
+    """
+    if recorder is None:
+        return _off
+    return recorder.timer(phase)
+
+
+def timed(phase):
+    """
+    Decorator adding the time of every call of function to the phase timer
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if recorder is None:
+                return func(*args, **kwargs)
+            with recorder.timer(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def exit_cell(label, U, iterations, V):
+    """
+    Record the exit of cell-by-cell checker and return its label unchanged
+    :param label: 'inside', 'outside' or 'border'
+    :param U: list of intervals of the cell
+    :param iterations: number of used iterations
+    :param V: list of intervals of unknowns at exit
+    :return: label
+    """
+    if recorder is not None:
+        width = max(v[1] - v[0] for v in V)
+        recorder.cells(U, [iterations], [width], [LABEL_NAMES.index(label)])
+    return label
+
+
+def json_sink(path):
+    """
+    Sink writing the report to JSON file
+    """
+    def sink(report):
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=1)
+    return sink
+
+
+def csv_sink(path):
+    """
+    Sink writing records of cells to CSV file (one row per cell) and timers to path + '.timers.csv'
+    """
+    def sink(report):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            dims = len(report['cells'][0]['u_lo']) if report['cells'] else 0
+            writer.writerow(sum([['u%d_lo' % (i + 1), 'u%d_hi' % (i + 1)] for i in range(dims)], []) +
+                            ['iterations', 'width', 'reason'])
+            for cell in report['cells']:
+                writer.writerow(sum([[lo, hi] for lo, hi in zip(cell['u_lo'], cell['u_hi'])], []) +
+                                [cell['iterations'], cell['width'], cell['reason']])
+        with open(path + '.timers.csv', 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['phase', 'seconds', 'calls'])
+            for phase, value in report['timers'].items():
+                writer.writerow([phase, value['seconds'], value['calls']])
+    return sink
@@ -2,128 +2,191 @@ import math
 
 
 class Interval:
+    """
+    Interval [lo, hi] stored in two float slots. Operators don't allocate anything but the result and have fast paths
+    for number operands, so the per-cell checkers don't spend time on temporary lists and intervals
+    """
+    __slots__ = ('lo', 'hi')
 
     def __init__(self, x):
-        self.x = x.copy()
+        self.lo = float(x[0])  # numpy scalars (e.g. nodes of the grid) are much slower in arithmetic than floats
+        self.hi = float(x[1])
+
+    @property
+    def x(self):
+        return (self.lo, self.hi)  # a copy, so iv.x[0] = v raises instead of being lost, use iv[0] = v
+
+    @x.setter
+    def x(self, value):
+        self.lo = value[0]
+        self.hi = value[1]
 
     def __repr__(self):
-        return "[" + str(self.x[0]) + ", " + str(self.x[1]) + "]"
+        return "[" + str(self.lo) + ", " + str(self.hi) + "]"
 
     def mid(self):
-        return 0.5 * (self.x[0] + self.x[1])
+        return 0.5 * (self.lo + self.hi)
 
 
     def scale(self, factor):
-        m = 0.5 * (self.x[0] + self.x[1])
-        r = 0.5 * (self.x[1] - self.x[0])
-        self.x[0] = m - factor * r
-        self.x[1] = m + factor * r
+        m = 0.5 * (self.lo + self.hi)
+        r = 0.5 * (self.hi - self.lo)
+        self.lo = m - factor * r
+        self.hi = m + factor * r
 
 
     def isIn(self, other):
-        return (self.x[0] >= other.x[0]) and (self.x[1] <= other.x[1])
+        return (self.lo >= other[0]) and (self.hi <= other[1])
 
 
     def isNoIntersec(self, other):
-        return (self.x[0] > other.x[1]) or (self.x[1] < other.x[0])
+        return (self.lo > other[1]) or (self.hi < other[0])
 
 
     def intersec(self, other):
-        self[0] = max(self.x[0], other.x[0])
-        self[1] = min(self.x[1], other.x[1])
-        if self.x[0] > self.x[1]:
-            raise ValueError(other.x[0], other.x[1], "results in wrong bounds:", self.x[0], self.x[1])
+        lo = other[0]
+        hi = other[1]
+        if lo > self.lo:
+            self.lo = lo
+        if hi < self.hi:
+            self.hi = hi
+        if self.lo > self.hi:
+            raise ValueError(lo, hi, "results in wrong bounds:", self.lo, self.hi)
         #return Interval([max(self.x[0], other.x[0]), min(self.x[1], other.x[1])])
 
     def __getitem__(self, item):
-        return self.x[item]
+        if item == 0:
+            return self.lo
+        if item == 1:
+            return self.hi
+        return [self.lo, self.hi][item]
 
     def __setitem__(self, key, value):
-        self.x.__setitem__(key, value)
+        if key == 0:
+            self.lo = value
+        elif key == 1:
+            self.hi = value
+        else:
+            x = [self.lo, self.hi]
+            x[key] = value
+            self.lo, self.hi = x
 
     def __neg__(self):
-        ninterval = Interval(self.x)
-        ninterval.x[0] = - self.x[1]
-        ninterval.x[1] = - self.x[0]
-        return ninterval
+        return _make(-self.hi, -self.lo)
 
     def __add__(self, other):
-        ointerval = valueToInterval(other)
-        ninterval = Interval(self.x)
-        ninterval.x[0] = self.x[0] + ointerval.x[0]
-        ninterval.x[1] = self.x[1] + ointerval.x[1]
-        return ninterval
+        if type(other) is float or isinstance(other, (int, float)):
+            return _make(self.lo + other, self.hi + other)
+        if isinstance(other, Interval):
+            return _make(self.lo + other.lo, self.hi + other.hi)
+        return NotImplemented
 
-    def __radd__(self, other):
-        return self.__add__(other)
+    __radd__ = __add__
 
     def __sub__(self, other):
-        ointerval = valueToInterval(other)
-        ninterval = Interval(self.x)
-        ninterval.x[0] = self.x[0] - ointerval.x[1]
-        ninterval.x[1] = self.x[1] - ointerval.x[0]
-        return ninterval
+        if type(other) is float or isinstance(other, (int, float)):
+            return _make(self.lo - other, self.hi - other)
+        if isinstance(other, Interval):
+            return _make(self.lo - other.hi, self.hi - other.lo)
+        return NotImplemented
 
     def __rsub__(self, other):
-        ointerval = valueToInterval(other)
-        return ointerval.__sub__(self)
+        if type(other) is float or isinstance(other, (int, float)):
+            return _make(other - self.hi, other - self.lo)
+        return NotImplemented
 
 
     def __pow__(self, other):
-        ninterval = Interval(self.x)
-        u = self.x[0] ** other
-        v = self.x[1] ** other
+        if other < 0 and other == int(other):  # x ** -k is 1 / x ** k with the convention of __truediv__
+            return _make(1.0, 1.0).__truediv__(self ** -other)
+        lo = self.lo
+        hi = self.hi
+        u = lo ** other
+        v = hi ** other
         if other == 0:
-            ninterval.x[0] = 1
-            ninterval.x[1] = 1
-        elif other % 2 == 0:
-            ninterval.x[1] = max(u, v)
-            if self.x[0] <= 0 and self.x[1] >= 0:
-                ninterval.x[0] = 0
-            else:
-                ninterval.x[0] = min(u, v)
-        else:
-            ninterval.x[0] = u
-            ninterval.x[1] = v
-        return ninterval
+            return _make(1, 1)
+        if other % 2 == 0:
+            if u > v:
+                u, v = v, u
+            if lo <= 0 <= hi:
+                u = 0
+        return _make(u, v)
 
     def __mul__(self, other):
-        ointerval = valueToInterval(other)
-        v = [self.x[0] * ointerval.x[0], self.x[0] * ointerval.x[1], self.x[1] * ointerval.x[0], self.x[1] * ointerval.x[1]]
-        b = [min(v), max(v)]
-        return Interval(b)
+        if type(other) is float or isinstance(other, (int, float)):
+            a = self.lo * other
+            b = self.hi * other
+        elif isinstance(other, Interval):
+            if other.lo == other.hi:  # point interval is the same as number
+                a = self.lo * other.lo
+                b = self.hi * other.lo
+            else:
+                v1 = self.lo * other.lo
+                v2 = self.lo * other.hi
+                v3 = self.hi * other.lo
+                v4 = self.hi * other.hi
+                return _make(min(v1, v2, v3, v4), max(v1, v2, v3, v4))
+        else:
+            return NotImplemented
+        if a <= b:
+            return _make(a, b)
+        return _make(b, a)
 
 
     def __truediv__(self, other):
-        ointerval = valueToInterval(other)
-        if ointerval[0] != 0 and ointerval[1] != 0:
-            v = [self.x[0] / ointerval.x[0], self.x[0] / ointerval.x[1], self.x[1] / ointerval.x[0], self.x[1] / ointerval.x[1]]
-            b = [min(v), max(v)]
-        else:
-            b = [0.2, 0.2]
-        return Interval(b)
+        if type(other) is float or isinstance(other, (int, float)):
+            if other == 0:
+                return _make(0.2, 0.2)
+            a = self.lo / other
+            b = self.hi / other
+            if a <= b:
+                return _make(a, b)
+            return _make(b, a)
+        if not isinstance(other, Interval):
+            return NotImplemented
+        if other.lo != 0 and other.hi != 0:
+            v1 = self.lo / other.lo
+            v2 = self.lo / other.hi
+            v3 = self.hi / other.lo
+            v4 = self.hi / other.hi
+            return _make(min(v1, v2, v3, v4), max(v1, v2, v3, v4))
+        return _make(0.2, 0.2)
 
     def __floordiv__(self, other):
         ointerval = valueToInterval(other)
         if ointerval[0] != 0 and ointerval[1] != 0:
-            v = [self.x[0] // ointerval.x[0], self.x[0] // ointerval.x[1], self.x[1] // ointerval.x[0],
-                 self.x[1] // ointerval.x[1]]
+            v = [self.lo // ointerval.lo, self.lo // ointerval.hi, self.hi // ointerval.lo,
+                 self.hi // ointerval.hi]
             print(v)
             b = [min(v), max(v)]
         else:
             ointerval = Interval([0.001, 0.001])
-            v = [self.x[0] // ointerval.x[0], self.x[0] // ointerval.x[1], self.x[1] // ointerval.x[0],
-                 self.x[1] // ointerval.x[1]]
+            v = [self.lo // ointerval.lo, self.lo // ointerval.hi, self.hi // ointerval.lo,
+                 self.hi // ointerval.hi]
             print(v)
             b = [min(v), max(v)]
         return Interval(b)
 
-    def __rmul__(self, other):
-        return self.__mul__(other)
+    __rmul__ = __mul__
 
 
     def __rtruediv__(self, other):
-        return self.__truediv__(other)
+        if type(other) is float or isinstance(other, (int, float)):
+            return _make(other, other).__truediv__(self)
+        return NotImplemented
+
+
+def _make(lo, hi):
+    """
+    Create Interval from bounds without going through __init__
+    """
+    ninterval = _new_interval(Interval)
+    ninterval.lo = lo
+    ninterval.hi = hi
+    return ninterval
+
+
+_new_interval = object.__new__
 
 
 def valueToInterval(expr):
@@ -155,7 +218,7 @@ def sin(x):
             a = -1
         else:
             a = min(y)
-        return Interval([a,b])
+        return _make(a, b)
 
 
 def cos(x):
@@ -175,11 +238,11 @@ def cos(x):
             a = -1
         else:
             a = min(y)
-        return Interval([a,b])
+        return _make(a, b)
 
 
 def exp(x):
-    return Interval([math.exp(x[0]), math.exp(x[1])])
+    return _make(math.exp(x[0]), math.exp(x[1]))
 
 
 def log(x, base):
@@ -0,0 +1,266 @@
+import numpy as np
+import interval as ival
+
+
+class IntervalArray:
+    """
+    Vector of intervals stored as two contiguous float64 arrays of lower and upper bounds.
+    Supports the same operations as interval.Interval, but elementwise, so the lambdified Krawczyk
+    functions can evaluate a whole grid of cells in one call.
+    Indexing with 0 and 1 returns the arrays of lower and upper bounds (like Interval), any other index
+    (mask, slice, array of indices) returns a new IntervalArray with the selected cells
+    """
+    __array_ufunc__ = None  # numpy scalars and arrays defer to our reflected operators
+
+    def __init__(self, lo, hi=None):
+        if hi is None:
+            hi = lo
+        lo, hi = np.broadcast_arrays(np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64))
+        self.lo = np.array(lo, dtype=np.float64)  # always copy to own contiguous bounds
+        self.hi = np.array(hi, dtype=np.float64)
+
+    @classmethod
+    def _wrap(cls, lo, hi):
+        """
+        Build IntervalArray from freshly computed bound arrays without copying them
+        """
+        obj = cls.__new__(cls)
+        obj.lo = lo
+        obj.hi = hi
+        return obj
+
+    @classmethod
+    def from_intervals(cls, intervals):
+        """
+        Build IntervalArray from the list of interval.Interval
+        :param intervals: list of intervals
+        :return: IntervalArray with the same bounds
+        """
+        return cls([x[0] for x in intervals], [x[1] for x in intervals])
+
+    @classmethod
+    def full(cls, shape, x):
+        """
+        IntervalArray of given shape with all elements equal to interval x
+        :param shape: shape of the array
+        :param x: interval (or [lo, hi] list)
+        :return: IntervalArray
+        """
+        return cls(np.full(shape, float(x[0])), np.full(shape, float(x[1])))
+
+    def to_intervals(self):
+        """
+        :return: flat list of interval.Interval
+        """
+        return [ival.Interval([a, b]) for a, b in zip(self.lo.ravel().tolist(), self.hi.ravel().tolist())]
+
+    @property
+    def shape(self):
+        return self.lo.shape
+
+    @property
+    def size(self):
+        return self.lo.size
+
+    def copy(self):
+        return IntervalArray._wrap(self.lo.copy(), self.hi.copy())
+
+    def __repr__(self):
+        return "IntervalArray(lo=" + repr(self.lo) + ", hi=" + repr(self.hi) + ")"
+
+    def mid(self):
+        return 0.5 * (self.lo + self.hi)
+
+    def width(self):
+        return self.hi - self.lo
+
+    def scale(self, factor):
+        m = 0.5 * (self.lo + self.hi)
+        r = 0.5 * (self.hi - self.lo)
+        self.lo = m - factor * r
+        self.hi = m + factor * r
+
+    def isIn(self, other):
+        other = valueToIntervalArray(other)
+        return (self.lo >= other.lo) & (self.hi <= other.hi)
+
+    def isNoIntersec(self, other):
+        other = valueToIntervalArray(other)
+        return (self.lo > other.hi) | (self.hi < other.lo)
+
+    def intersec(self, other, mask=None):
+        """
+        Intersect in place with other, only for the elements selected by mask if it is given
+        """
+        other = valueToIntervalArray(other)
+        lo = np.maximum(self.lo, other.lo)
+        hi = np.minimum(self.hi, other.hi)
+        if mask is None:
+            mask = np.ones(self.shape, dtype=bool)
+        if np.any((lo > hi) & mask):
+            bad = np.argwhere((lo > hi) & mask)[0]
+            raise ValueError(tuple(bad), "results in wrong bounds:", lo[tuple(bad)], hi[tuple(bad)])
+        self.lo = np.where(mask, lo, self.lo)
+        self.hi = np.where(mask, hi, self.hi)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return (self.lo, self.hi)[item]
+        return IntervalArray._wrap(self.lo[item], self.hi[item])
+
+    def __setitem__(self, key, value):
+        if isinstance(key, (int, np.integer)):
+            (self.lo, self.hi)[key][...] = value
+        else:
+            value = valueToIntervalArray(value)
+            self.lo[key] = value.lo
+            self.hi[key] = value.hi
+
+    def __neg__(self):
+        return IntervalArray._wrap(-self.hi, -self.lo)
+
+    def __add__(self, other):
+        if isinstance(other, (int, float, np.number)):
+            return IntervalArray._wrap(self.lo + other, self.hi + other)
+        other = valueToIntervalArray(other)
+        return IntervalArray._wrap(self.lo + other.lo, self.hi + other.hi)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, (int, float, np.number)):
+            return IntervalArray._wrap(self.lo - other, self.hi - other)
+        other = valueToIntervalArray(other)
+        return IntervalArray._wrap(self.lo - other.hi, self.hi - other.lo)
+
+    def __rsub__(self, other):
+        if isinstance(other, (int, float, np.number)):
+            return IntervalArray._wrap(other - self.hi, other - self.lo)
+        return valueToIntervalArray(other).__sub__(self)
+
+    def __pow__(self, other):
+        if other < 0 and other == int(other):  # x ** -k is 1 / x ** k with the convention of __truediv__
+            return IntervalArray(1.0).__truediv__(self ** -other)
+        u = self.lo ** other
+        v = self.hi ** other
+        if other == 0:
+            return IntervalArray._wrap(np.ones_like(u), np.ones_like(v))
+        elif other % 2 == 0:
+            zero_in = (self.lo <= 0) & (self.hi >= 0)
+            return IntervalArray._wrap(np.where(zero_in, 0.0, np.minimum(u, v)), np.maximum(u, v))
+        else:
+            return IntervalArray._wrap(u, v)
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float, np.number)):
+            a = self.lo * other
+            b = self.hi * other
+            return IntervalArray._wrap(np.minimum(a, b), np.maximum(a, b))
+        other = valueToIntervalArray(other)
+        v = (self.lo * other.lo, self.lo * other.hi, self.hi * other.lo, self.hi * other.hi)
+        return IntervalArray._wrap(np.minimum.reduce(v), np.maximum.reduce(v))
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        # Same convention as interval.Interval: a divisor with a zero bound gives [0.2, 0.2]
+        other = valueToIntervalArray(other)
+        nonzero = (other.lo != 0) & (other.hi != 0)
+        olo = np.where(nonzero, other.lo, 1.0)
+        ohi = np.where(nonzero, other.hi, 1.0)
+        v = (self.lo / olo, self.lo / ohi, self.hi / olo, self.hi / ohi)
+        return IntervalArray._wrap(np.where(nonzero, np.minimum.reduce(v), 0.2),
+                                   np.where(nonzero, np.maximum.reduce(v), 0.2))
+
+    def __rtruediv__(self, other):
+        return valueToIntervalArray(other).__truediv__(self)
+
+
+def valueToIntervalArray(expr):
+    """
+    Convert number, interval.Interval or IntervalArray to IntervalArray, which can be broadcast against others
+    """
+    if isinstance(expr, IntervalArray):
+        return expr
+    elif isinstance(expr, ival.Interval):
+        return IntervalArray(expr[0], expr[1])
+    else:
+        return IntervalArray(expr)
+
+
+def stack(intervals, size=None, out=None):
+    """
+    Stack intervals of components into one IntervalArray of shape (dim, cells), every component stays contiguous
+    :param intervals: list of IntervalArrays of shape (cells,), intervals or numbers (they are broadcast to cells)
+    :param size: number of cells, by default the size of the first component
+    :param out: IntervalArray of shape (dim, n), n >= cells, its first cells columns are used instead of new arrays
+    :return: IntervalArray
+    """
+    intervals = [valueToIntervalArray(x) for x in intervals]
+    size = intervals[0].size if size is None else size
+    if out is None:
+        lo = np.empty((len(intervals), size))
+        hi = np.empty((len(intervals), size))
+    else:
+        lo = out.lo[:, :size]
+        hi = out.hi[:, :size]
+    for i, x in enumerate(intervals):
+        lo[i] = x.lo
+        hi[i] = x.hi
+    return IntervalArray._wrap(lo, hi)
+
+
+def unstack(x):
+    """
+    :param x: IntervalArray of shape (dim, cells)
+    :return: list of IntervalArrays of components (views, not copies)
+    """
+    return [IntervalArray._wrap(x.lo[i], x.hi[i]) for i in range(x.shape[0])]
+
+
+def sin(x):
+    """
+    Interval sin, elementwise
+    :param x: IntervalArray
+    :return: IntervalArray sin(x)
+    """
+    x = valueToIntervalArray(x)
+    y0 = np.sin(x.lo)
+    y1 = np.sin(x.hi)
+    pi2 = 2 * np.pi
+    pi05 = np.pi / 2
+    b = np.where(np.ceil((x.lo - pi05) / pi2) <= np.floor((x.hi - pi05) / pi2), 1.0, np.maximum(y0, y1))
+    a = np.where(np.ceil((x.lo + pi05) / pi2) <= np.floor((x.hi + pi05) / pi2), -1.0, np.minimum(y0, y1))
+    return IntervalArray._wrap(a, b)
+
+
+def cos(x):
+    """
+    Interval cos, elementwise
+    :param x: IntervalArray
+    :return: IntervalArray cos(x)
+    """
+    x = valueToIntervalArray(x)
+    y0 = np.cos(x.lo)
+    y1 = np.cos(x.hi)
+    pi2 = 2 * np.pi
+    b = np.where(np.ceil(x.lo / pi2) <= np.floor(x.hi / pi2), 1.0, np.maximum(y0, y1))
+    a = np.where(np.ceil((x.lo - np.pi) / pi2) <= np.floor((x.hi - np.pi) / pi2), -1.0, np.minimum(y0, y1))
+    return IntervalArray._wrap(a, b)
+
+
+def exp(x):
+    x = valueToIntervalArray(x)
+    return IntervalArray._wrap(np.exp(x.lo), np.exp(x.hi))
+
+
+def log(x, base):
+    x = valueToIntervalArray(x)
+    lo = np.log(x.lo) / np.log(base)
+    hi = np.log(x.hi) / np.log(base)
+    if base > 1:
+        return IntervalArray._wrap(lo, hi)
+    else:
+        return IntervalArray._wrap(hi, lo)
@@ -0,0 +1,230 @@
+import numpy as np
+import interval_array as iarr
+
+
+class _Emitter(object):
+    """
+    Translates sympy expressions into lines of straight-line code over bounds arrays. Every interval value is
+    a pair of variables (lo, hi), every point value (numbers, mids, parameters) is one variable
+    """
+    def __init__(self, names):
+        self.names = names  # symbol -> ('i', lo, hi) or ('p', name)
+        self.lines = []
+        self.counter = 0
+
+    def tmp(self):
+        self.counter += 1
+        return '_t%d' % self.counter
+
+    def assign_interval(self, lo_code, hi_code):
+        name = self.tmp()
+        self.lines.append('%s_lo = %s' % (name, lo_code))
+        self.lines.append('%s_hi = %s' % (name, hi_code))
+        return ('i', name + '_lo', name + '_hi')
+
+    def assign_point(self, code):
+        name = self.tmp()
+        self.lines.append('%s = %s' % (name, code))
+        return ('p', name)
+
+    def emit(self, expr):
+        import sympy as sym
+        if expr in self.names:
+            return self.names[expr]
+        if expr.is_Number or expr is sym.pi or expr is sym.E:
+            return ('p', repr(float(expr)))
+        if expr.is_Add:
+            return self.fold(expr.args, self.add)
+        if expr.is_Mul:
+            # interval denominators are divided by, as in the code of lambdify, e.g. 2*y/(x*z**2)
+            num, den = [], []
+            for arg in expr.args:
+                if arg.is_Pow and arg.exp.is_Integer and arg.exp < 0 and self.is_interval(arg.base):
+                    den.append(arg.base ** -arg.exp)
+                else:
+                    num.append(arg)
+            if den:
+                return self.div(self.fold(num, self.mul) if num else ('p', '1.0'), self.fold(den, self.mul))
+            return self.fold(expr.args, self.mul)
+        if expr.is_Pow:
+            return self.pow(self.emit(expr.base), expr.exp)
+        if expr.func in (sym.sin, sym.cos, sym.exp):
+            return self.function(expr.func.__name__, self.emit(expr.args[0]))
+        raise NotImplementedError('No interval code for ' + str(expr.func))
+
+    def is_interval(self, expr):
+        return any(self.names.get(s, ('p',))[0] == 'i' for s in expr.free_symbols)
+
+    def fold(self, args, op):
+        """
+        Point arguments are combined first, so that intervals are touched as few times as possible
+        """
+        refs = [self.emit(arg) for arg in args]
+        points = [r for r in refs if r[0] == 'p']
+        intervals = [r for r in refs if r[0] == 'i']
+        result = None
+        if points:
+            result = ('p', '(' + (' + ' if op == self.add else ' * ').join(r[1] for r in points) + ')')
+            if intervals:
+                result = self.assign_point(result[1])
+        for ref in intervals:
+            result = ref if result is None else op(result, ref)
+        return result
+
+    def add(self, a, b):
+        if a[0] == 'p':
+            a, b = b, a
+        if b[0] == 'p':
+            return self.assign_interval('%s + %s' % (a[1], b[1]), '%s + %s' % (a[2], b[1]))
+        return self.assign_interval('%s + %s' % (a[1], b[1]), '%s + %s' % (a[2], b[2]))
+
+    def mul(self, a, b):
+        if a[0] == 'p':
+            a, b = b, a
+        if b[0] == 'p' and b[1] in ('-1.0', '(-1.0)'):
+            return self.assign_interval('-%s' % a[2], '-%s' % a[1])
+        if b[0] == 'p':
+            p = self.tmp()
+            self.lines.append('%s_a = %s * %s' % (p, a[1], b[1]))
+            self.lines.append('%s_b = %s * %s' % (p, a[2], b[1]))
+            return self.assign_interval('minimum(%s_a, %s_b)' % (p, p), 'maximum(%s_a, %s_b)' % (p, p))
+        p = self.tmp()
+        products = []
+        for i, (x, y) in enumerate(((a[1], b[1]), (a[1], b[2]), (a[2], b[1]), (a[2], b[2]))):
+            self.lines.append('%s_%d = %s * %s' % (p, i, x, y))
+            products.append('%s_%d' % (p, i))
+        return self.assign_interval('minimum(minimum(%s, %s), minimum(%s, %s))' % tuple(products),
+                                    'maximum(maximum(%s, %s), maximum(%s, %s))' % tuple(products))
+
+    def div(self, a, b):
+        """
+        The same division as IntervalArray.__truediv__: a divisor with a zero bound gives [0.2, 0.2]. b is interval
+        """
+        nonzero = self.assign_point('(%s != 0) & (%s != 0)' % (b[1], b[2]))[1]
+        blo = self.assign_point('where(%s, %s, 1.0)' % (nonzero, b[1]))[1]
+        bhi = self.assign_point('where(%s, %s, 1.0)' % (nonzero, b[2]))[1]
+        p = self.tmp()
+        pairs = ((a[1], blo), (a[1], bhi)) if a[0] == 'p' else ((a[1], blo), (a[1], bhi), (a[2], blo), (a[2], bhi))
+        quotients = []
+        for i, (x, y) in enumerate(pairs):
+            self.lines.append('%s_%d = %s / %s' % (p, i, x, y))
+            quotients.append('%s_%d' % (p, i))
+        lo = hi = quotients[0]
+        for q in quotients[1:]:
+            lo, hi = 'minimum(%s, %s)' % (lo, q), 'maximum(%s, %s)' % (hi, q)
+        return self.assign_interval('where(%s, %s, 0.2)' % (nonzero, lo), 'where(%s, %s, 0.2)' % (nonzero, hi))
+
+    def pow(self, base, exp):
+        if not exp.is_Number:
+            raise NotImplementedError('No interval code for power ' + str(exp))
+        if base[0] == 'p':
+            return ('p', '(%s ** %s)' % (base[1], repr(float(exp)) if not exp.is_Integer else int(exp)))
+        if exp.is_Integer and exp < 0:
+            return self.div(('p', '1.0'), self.pow(base, -exp))
+        if exp.is_Integer:
+            e = int(exp)
+            if e == 0:
+                return ('p', '1.0')
+            u = self.assign_point('%s ** %d' % (base[1], e))
+            v = self.assign_point('%s ** %d' % (base[2], e))
+            if e % 2 == 1:
+                return ('i', u[1], v[1])
+            return self.assign_interval(
+                'where((%s <= 0) & (%s >= 0), 0.0, minimum(%s, %s))' % (base[1], base[2], u[1], v[1]),
+                'maximum(%s, %s)' % (u[1], v[1]))
+        e = repr(float(exp))  # non-integer power is monotone on non-negative base
+        if float(exp) > 0:
+            return self.assign_interval('%s ** %s' % (base[1], e), '%s ** %s' % (base[2], e))
+        return self.assign_interval('%s ** %s' % (base[2], e), '%s ** %s' % (base[1], e))
+
+    def function(self, name, arg):
+        if arg[0] == 'p':
+            return ('p', '%s(%s)' % (name, arg[1]))
+        lo, hi = arg[1], arg[2]
+        if name == 'exp':
+            return self.assign_interval('exp(%s)' % lo, 'exp(%s)' % hi)
+        y0 = self.assign_point('%s(%s)' % (name, lo))[1]
+        y1 = self.assign_point('%s(%s)' % (name, hi))[1]
+        if name == 'sin':  # the same enclosure as interval_array.sin
+            return self.assign_interval(
+                'where(ceil((%s + pi / 2) / (2 * pi)) <= floor((%s + pi / 2) / (2 * pi)), -1.0, minimum(%s, %s))'
+                % (lo, hi, y0, y1),
+                'where(ceil((%s - pi / 2) / (2 * pi)) <= floor((%s - pi / 2) / (2 * pi)), 1.0, maximum(%s, %s))'
+                % (lo, hi, y0, y1))
+        return self.assign_interval(  # the same enclosure as interval_array.cos
+            'where(ceil((%s - pi) / (2 * pi)) <= floor((%s - pi) / (2 * pi)), -1.0, minimum(%s, %s))'
+            % (lo, hi, y0, y1),
+            'where(ceil(%s / (2 * pi)) <= floor(%s / (2 * pi)), 1.0, maximum(%s, %s))' % (lo, hi, y0, y1))
+
+
+def interval_kernel_source(exprs, arg_groups, name='_interval_kernel'):
+    """
+    Generate straight-line interval code for a list of sympy expressions. Common subexpressions are hoisted with
+    sym.cse and interval sin, cos and powers are inlined, so the kernel doesn't call back into Python for every
+    operation
+    :param exprs: list of sympy expressions
+    :param arg_groups: list of (list of symbols, True if they are intervals) for every argument of the kernel
+    :param name: name of the generated function
+    :return: source code of function, which takes one list per argument group (intervals may be IntervalArrays,
+             interval.Interval or [lo, hi]) and returns [[IntervalArray] for every expression], like
+             lambdified Krawczyk functions
+    """
+    import sympy as sym  # only generation needs sympy, generated kernels are loaded without it
+    names = {}
+    lines = []
+    for k, (symbols, is_interval) in enumerate(arg_groups):
+        for i, s in enumerate(symbols):
+            var = '_a%d_%d' % (k, i)  # symbol names may clash with numpy functions of namespace
+            lines.append('# %s = %s' % (var, s.name))
+            if is_interval:
+                names[s] = ('i', var + '_lo', var + '_hi')
+                lines.append('%s_lo = asarray(_arg%d[%d][0], dtype=float64)' % (var, k, i))
+                lines.append('%s_hi = asarray(_arg%d[%d][1], dtype=float64)' % (var, k, i))
+            else:
+                names[s] = ('p', var)
+                lines.append('%s = _arg%d[%d]' % (var, k, i))
+    replacements, reduced = sym.cse(exprs, symbols=sym.numbered_symbols('_cse'))
+    emitter = _Emitter(names)
+    for s, sub in replacements:
+        ref = emitter.emit(sub)
+        if ref[0] == 'p':
+            emitter.lines.append('%s = %s' % (s.name, ref[1]))
+            names[s] = ('p', s.name)
+        else:
+            emitter.lines.append('%s_lo = %s' % (s.name, ref[1]))
+            emitter.lines.append('%s_hi = %s' % (s.name, ref[2]))
+            names[s] = ('i', s.name + '_lo', s.name + '_hi')
+    results = []
+    for expr in reduced:
+        ref = emitter.emit(expr)
+        results.append('[_wrap(%s, %s)]' % ((ref[1], ref[1]) if ref[0] == 'p' else (ref[1], ref[2])))
+    args = ', '.join('_arg%d' % k for k in range(len(arg_groups)))
+    body = lines + emitter.lines + ['return [' + ', '.join(results) + ']']
+    return 'def %s(%s):\n' % (name, args) + ''.join('    ' + line + '\n' for line in body)
+
+
+def kernel_namespace():
+    """
+    Namespace, in which generated interval kernels are executed
+    """
+    namespace = {name: getattr(np, name) for name in ('asarray', 'float64', 'minimum', 'maximum', 'where', 'ceil',
+                                                      'floor', 'sin', 'cos', 'exp', 'pi', 'inf')}
+    namespace['_wrap'] = _wrap
+    return namespace
+
+
+def _wrap(lo, hi):
+    if isinstance(lo, np.ndarray) and isinstance(hi, np.ndarray) and lo.shape == hi.shape:
+        return iarr.IntervalArray._wrap(lo, hi)
+    return iarr.IntervalArray(lo, hi)
+
+
+def compile_interval_kernel(source, name='_interval_kernel'):
+    """
+    :param source: source code from interval_kernel_source
+    :param name: name of the generated function
+    :return: function
+    """
+    namespace = kernel_namespace()
+    exec(compile(source, '<interval kernel>', 'exec'), namespace)
+    return namespace[name]
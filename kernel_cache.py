@@ -0,0 +1,190 @@
+import hashlib
+import importlib.metadata
+import inspect
+import os
+import tempfile
+import instrumentation
+
+KERNEL_CACHE_VERSION = 2  # Bump it when the way kernels are generated changes, old cache files are ignored then
+cache_dir = os.environ.get('KRAV_KERNEL_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'krav_kernels'))
+
+
+def set_cache_dir(path):
+    """
+    Change the directory of kernel cache
+    :param path: new directory, None turns the cache off
+    """
+    global cache_dir
+    cache_dir = path
+
+
+def kernel_key(*parts):
+    """
+    Key of generated kernel: hash of sympy representation of everything it was built from (system of equations,
+    lists of symbols, preconditioning choice...) together with versions of sympy and of this cache
+    :param parts: sympy expressions, lists of symbols or strings
+    :return: hex string
+    """
+    import sympy as sym
+    h = hashlib.sha256()
+    h.update(('%d|%s' % (KERNEL_CACHE_VERSION, sym.__version__)).encode())
+    for part in parts:
+        h.update(b'|')
+        h.update(sym.srepr(part).encode())
+    return h.hexdigest()
+
+
+def _base_namespace():
+    """
+    Namespace, in which sympy.lambdify with numpy module executes the generated code
+    """
+    namespace = {}
+    exec("import numpy; from numpy import *; from numpy.linalg import *", namespace)
+    return namespace
+
+
+def load_kernel(key, namespace=None, name='_lambdifygenerated'):
+    """
+    Load kernel from the cache
+    :param key: key of kernel (see kernel_key)
+    :param namespace: dict of functions the kernel calls besides numpy ones (implemented functions)
+    :param name: name of the function in the cached source
+    :return: function or None if there is no such kernel in the cache
+    """
+    if cache_dir is None:
+        return None
+    path = os.path.join(cache_dir, key + '.py')
+    try:
+        with open(path) as file:
+            source = file.read()
+    except OSError:
+        return None
+    with instrumentation.timer('kernel_load'):
+        scope = _base_namespace()
+        scope.update(namespace or {})
+        try:
+            exec(compile(source, path, 'exec'), scope)
+            return scope[name]
+        except Exception:
+            return None  # broken cache file, kernel will be rebuilt and rewritten
+
+
+def store_kernel(key, func):
+    """
+    Save source of the lambdified function to the cache. File is written atomically, so processes, which build
+    the same kernel at the same time, don't break each other
+    :param key: key of kernel (see kernel_key)
+    :param func: function made by sympy.lambdify
+    """
+    store_source(key, inspect.getsource(func))
+
+
+def store_source(key, source):
+    """
+    Save source of generated kernel to the cache atomically
+    :param key: key of kernel (see kernel_key)
+    :param source: python source of the kernel
+    """
+    _store(key + '.py', source)
+
+
+def alias_stamp(source=''):
+    """
+    Stamp of alias: hash of the versions of this cache and of sympy (read from package metadata, sympy is not
+    imported) and of source the kernel is built from, e.g. the source of the problem definition. The key of kernel
+    depends on the same things, so an alias with another stamp may point to a stale kernel
+    :param source: string
+    :return: hex string
+    """
+    try:
+        sympy_version = importlib.metadata.version('sympy')
+    except importlib.metadata.PackageNotFoundError:
+        sympy_version = ''
+    h = hashlib.sha256(('%d|%s|' % (KERNEL_CACHE_VERSION, sympy_version)).encode())
+    h.update(source.encode())
+    return h.hexdigest()
+
+
+def store_alias(name, key, source=''):
+    """
+    Remember key of kernel under a short name, so the kernel can be loaded by load_alias and load_kernel without
+    sympy, which kernel_key needs. The alias is rewritten every time the kernel is built or loaded by its key
+    :param name: name of alias, e.g. 'func_dextar.krawczyk'
+    :param key: key of kernel (see kernel_key)
+    :param source: source the kernel is built from (see alias_stamp)
+    """
+    _store(name + '.alias', '%s\n%s\n' % (key, alias_stamp(source)))
+
+
+def load_alias(name, source=''):
+    """
+    :param name: name of alias (see store_alias)
+    :param source: source the kernel is built from, the same as in store_alias
+    :return: key of kernel or None if there is no such alias or it was stored by other versions of this cache or
+             sympy or with other source
+    """
+    if cache_dir is None:
+        return None
+    try:
+        with open(os.path.join(cache_dir, name + '.alias')) as file:
+            lines = file.read().split()
+    except OSError:
+        return None
+    if len(lines) != 2 or lines[1] != alias_stamp(source):
+        return None
+    return lines[0]
+
+
+def _store(filename, text):
+    """
+    Write file of the cache atomically
+    """
+    if cache_dir is None:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    except OSError:
+        return  # cache is only an optimization, read-only or full disk is not an error
+    try:
+        with os.fdopen(fd, 'w') as file:
+            file.write(text)
+        os.replace(tmp_path, os.path.join(cache_dir, filename))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_alias_kernel(alias, source='', namespace=None, name='_lambdifygenerated'):
+    """
+    Load kernel by its alias without sympy
+    :param alias: name of alias (see store_alias)
+    :param source: source the kernel is built from, the same as in store_alias
+    :param namespace: dict of functions the kernel calls besides numpy ones (implemented functions)
+    :param name: name of the function in the cached source
+    :return: function or None if there is no such alias or kernel
+    """
+    key = load_alias(alias, source)
+    if key is None:
+        return None
+    return load_kernel(key, namespace, name)
+
+
+def cached_lambdify(key, build, namespace=None, alias=None, alias_source=''):
+    """
+    Load kernel from the cache or build it and save it
+    :param key: key of kernel (see kernel_key)
+    :param build: function without arguments, which returns lambdified kernel, called only if there is no cache
+    :param namespace: dict of functions the kernel calls besides numpy ones (implemented functions)
+    :param alias: None or name, under which the kernel is remembered, so it can be loaded by load_alias_kernel
+    :param alias_source: source the kernel is built from (see alias_stamp)
+    :return: kernel
+    """
+    if alias is not None:
+        store_alias(alias, key, alias_source)
+    kernel = load_kernel(key, namespace)
+    if kernel is None:
+        with instrumentation.timer('kernel_build'):
+            kernel = build()
+        store_kernel(key, kernel)
+    return kernel
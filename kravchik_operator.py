@@ -1,7 +1,19 @@
-import sympy as sym
-from sympy.utilities.lambdify import implemented_function
+import inspect
+import numpy as np
 import interval as ival
-v1, v2, u1, u2, d = sym.symbols('v1, v2, u1, u2, d')
+import interval_array as iarr
+import kernel_cache
+import instrumentation
+import interval_codegen
+
+
+def _rpr_symbols():
+    """
+    sympy is imported only when kernels are built, kernels found in the cache are loaded without it
+    :return: sympy module and symbols v1, v2, u1, u2, d of 2-RPR
+    """
+    import sympy as sym
+    return (sym,) + sym.symbols('v1, v2, u1, u2, d')
 
 
 def derive_matrix(g, v):
@@ -10,6 +22,7 @@ def derive_matrix(g, v):
     :param g : array to be derived
     :return gv: derived matrix
     """
+    import sympy as sym
     g_v_all = []
     for i in range(g.shape[0]):
         g_v_all.append(sym.diff(g, v[i]))  # Calculate derivative of G with respect to v1
@@ -20,24 +33,35 @@ def derive_matrix(g, v):
     return gv
 
 
+@instrumentation.timed('kernel_setup')
 def get_krav_func():
     """
     Function for calculating classical Krawczyk evaluation in symbol format for parallel robot 2-RPR
     :return: function of  classical Krawczyk evaluation in numerical format
     """
+    source = inspect.getsource(get_krav_func)
+    kernel = kernel_cache.load_alias_kernel('2rpr.classical', source)
+    if kernel is not None:
+        return kernel
+    sym, v1, v2, u1, u2, d = _rpr_symbols()
     v1mid, v2mid = sym.symbols('v1mid, v2mid')
-    f = sym.Matrix([[v1**2 - u1**2 - u2**2], [v2**2 - (u1 - d)**2 - u2**2]])  # System of kinematic equations
-    v = sym.Matrix([[v1], [v2]])# Vector v
-    f_v = derive_matrix(f, v)  # Calculate matrix of partial derivatives of kinematic matrix
-    lam = f_v**(-1)
-    lam = lam.subs([(v1, v1mid), (v2, v2mid)])  # Calculate lambda function for recurrent transformation
-    g = v - lam * f  # Equivalent recurrent transformation
-    g_v = derive_matrix(g, v)  # Calculate matrix of partial derivatives of matrix g
     c1, c2 = sym.symbols('c1, c2')
-    c = sym.Matrix([[c1], [c2]]) # Vector of v-middles
-    v_c = v - c
-    g_eval = g.subs([(v1, c1), (v2, c2)]) + g_v * v_c  # Calculates classical Krawczyk evaluation
-    return sym.lambdify([u1, u2, v1, v2, v1mid, v2mid, c1, c2, d], g_eval)
+    f = sym.Matrix([[v1**2 - u1**2 - u2**2], [v2**2 - (u1 - d)**2 - u2**2]])  # System of kinematic equations
+    args = [u1, u2, v1, v2, v1mid, v2mid, c1, c2, d]
+
+    def build():
+        v = sym.Matrix([[v1], [v2]])# Vector v
+        f_v = derive_matrix(f, v)  # Calculate matrix of partial derivatives of kinematic matrix
+        lam = f_v**(-1)
+        lam = lam.subs([(v1, v1mid), (v2, v2mid)])  # Calculate lambda function for recurrent transformation
+        g = v - lam * f  # Equivalent recurrent transformation
+        g_v = derive_matrix(g, v)  # Calculate matrix of partial derivatives of matrix g
+        c = sym.Matrix([[c1], [c2]]) # Vector of v-middles
+        v_c = v - c
+        g_eval = g.subs([(v1, c1), (v2, c2)]) + g_v * v_c  # Calculates classical Krawczyk evaluation
+        return sym.lambdify(args, g_eval)
+    return kernel_cache.cached_lambdify(kernel_cache.kernel_key('classical', f, args, 'inverse_jacobian_mid'), build,
+                                        alias='2rpr.classical', alias_source=source)
 
 
 def zzf(x, m):
@@ -50,6 +74,10 @@ def zzf(x, m):
     :return: Exact interval enclosure for function zf
     """
     zf = lambda x, m : x * (1 - x / (2 * m))
+    if isinstance(x, iarr.IntervalArray):
+        lo = np.where(m <= x[0], zf(x[1], m), np.where(m >= x[1], zf(x[0], m), np.minimum(zf(x[0], m), zf(x[1], m))))
+        hi = np.where(m <= x[0], zf(x[0], m), np.where(m >= x[1], zf(x[1], m), zf(m, m)))
+        return iarr.IntervalArray(lo, hi)
     if m <= x[0]:
         iv = ival.Interval([zf(x[1],m), zf(x[0],m)])
     elif m >= x[1]:
@@ -59,16 +87,25 @@ def zzf(x, m):
     return iv
 
 
+@instrumentation.timed('kernel_setup')
 def get_rec_func_optim():
     """
     Symbolic recursion function, which was calculated analytically
     :return: function of interval recursion evaluation in numerical format
     """
+    source = inspect.getsource(get_rec_func_optim)
+    kernel = kernel_cache.load_alias_kernel('2rpr.exact', source, {'hump': zzf})
+    if kernel is not None:
+        return kernel
+    from sympy.utilities.lambdify import implemented_function
+    sym, v1, v2, u1, u2, d = _rpr_symbols()
     v1mid, v2mid = sym.symbols('v1mid, v2mid')
     hump = implemented_function(sym.Function('hump'), lambda x, m: zzf(x,m))
     f = sym.Matrix([[hump(v1, v1mid) - (-u1**2 - u2**2)/(2*v1mid)],
                     [hump(v2, v2mid) - (-u2**2 - (u1 - d)**2)/(2*v2mid)]])  # System of kinematic equations
-    return sym.lambdify([u1, u2, v1, v2, v1mid, v2mid, d], f)
+    args = [u1, u2, v1, v2, v1mid, v2mid, d]
+    return kernel_cache.cached_lambdify(kernel_cache.kernel_key('exact', f, args), lambda: sym.lambdify(args, f),
+                                        {'hump': zzf}, alias='2rpr.exact', alias_source=source)
 
 
 def krav_interval(u1n, u2n, v1n, v2n, v1midn, v2midn, dn, cn):
@@ -85,6 +122,7 @@ def krav_interval(u1n, u2n, v1n, v2n, v1midn, v2midn, dn, cn):
     :param cn: vector of mids
     :return: function of  classical Krawczyk evaluation in numerical format
     """
+    sym, v1, v2, u1, u2, d = _rpr_symbols()
     v1mid, v2mid = sym.symbols('v1mid, v2mid')
     f = sym.Matrix([[v1 ** 2 - u1 ** 2 - u2 ** 2],
                     [v2 ** 2 - (u1 - d) ** 2 - u2 ** 2]])  # System of kinematic equations
@@ -114,6 +152,7 @@ def krav_rec_func_number(u1n, u2n, v1n, v2n, v1midn, v2midn, dn):
     :param dn: distance between the points of bases
     :return: Interval vector of recurrent function
     """
+    sym, v1, v2, u1, u2, d = _rpr_symbols()
     v1mid, v2mid = sym.symbols('v1mid, v2mid')
     f = sym.Matrix(
         [[v1 ** 2 - u1 ** 2 - u2 ** 2], [v2 ** 2 - (u1 - d) ** 2 - u2 ** 2]])  # System of kinematic equations
@@ -144,23 +183,40 @@ def calcul_new_c(u1n, u2n, v1n, v2n, v1midn, v2midn, dn):
     :return: vectors cmin and cmax for bicnetered Krawczyk
     """
     new_v = krav_rec_func_number(u1n, u2n, v1n, v2n, v1midn, v2midn, dn)
-    vn = [v1n, v2n]
+    return select_c([new_v[0][0], new_v[1][0]], [v1n, v2n])
+
+
+def select_c(g_v_diag, vn):
+    """
+    Choose cmin and cmax for bicentered Krawczyk from the diagonal of derivatives of recurrent function,
+    works for intervals and for IntervalArrays
+    :param g_v_diag: list of intervals of diagonal elements of g_v
+    :param vn: list of intervals v
+    :return: vectors cmin and cmax for bicentered Krawczyk
+    """
     c_min = [0, 0]
     c_max = [0, 0]
     for i in range(len(c_min)):
-        if new_v[i][0][1]<=0:
+        lo, hi = g_v_diag[i][0], g_v_diag[i][1]
+        if isinstance(vn[i], iarr.IntervalArray):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                c_min[i] = np.where(hi <= 0, vn[i][1], np.where(lo >= 0, vn[i][0],
+                                    (hi * vn[i][0] - lo * vn[i][1]) / (hi - lo)))
+                c_max[i] = np.where(hi <= 0, vn[i][0], np.where(lo >= 0, vn[i][1],
+                                    (lo * vn[i][0] - hi * vn[i][1]) / (lo - hi)))
+            continue
+        if hi <= 0:
             c_min[i] = vn[i][1]
-        elif new_v[i][0][0]>=0:
+        elif lo >= 0:
             c_min[i] = vn[i][0]
         else:
-            c_min[i] = (new_v[i][0][1]*vn[i][0] - new_v[i][0][0]*vn[i][1])/(new_v[i][0][1] - new_v[i][0][0])
-    for i in range(len(c_max)):
-        if new_v[i][0][1]<=0:
+            c_min[i] = (hi * vn[i][0] - lo * vn[i][1]) / (hi - lo)
+        if hi <= 0:
             c_max[i] = vn[i][0]
-        elif new_v[i][0][0]>=0:
+        elif lo >= 0:
             c_max[i] = vn[i][1]
         else:
-            c_max[i] = (new_v[i][0][0]*vn[i][0] - new_v[i][0][1]*vn[i][1])/(new_v[i][0][0] - new_v[i][0][1])
+            c_max[i] = (lo * vn[i][0] - hi * vn[i][1]) / (lo - hi)
     return c_min, c_max
 
 
@@ -176,18 +232,68 @@ def get_krav_func_bicentered(u1n, u2n, v1n, v2n, v1midn, v2midn, dn):
     :param dn: distance between the points of bases
     :return: Interval vectors for Krawczyk evaluation with cmin and cmax
     """
-    cmin, cmax = calcul_new_c(u1n, u2n, v1n, v2n, v1midn, v2midn, dn)  # Calculate new c
-    v_min = krav_interval(u1n, u2n, v1n, v2n, v1midn, v2midn, dn, cmin)  #Calculate new v1 and v2 with defualt Krav for cmin
-    v_max = krav_interval(u1n, u2n, v1n, v2n, v1midn, v2midn, dn, cmax)  #Calculate new v1 and v2 with defualt Krav for cmax
+    global _bicentered_krav
+    if _bicentered_krav is None:
+        _bicentered_krav = get_bicentered_krav_func()  # Kernels are compiled on the first call only
+    cmin, cmax, v_min, v_max = _bicentered_krav(u1n, u2n, v1n, v2n, v1midn, v2midn, dn)
     return (v_min, v_max)
 
 
+_bicentered_krav = None
+
+
+@instrumentation.timed('kernel_setup')
+def get_bicentered_krav_func():
+    """
+    Function for calculating bicentered Krawczyk evaluation for parallel robot 2-RPR. Unlike get_krav_func_bicentered
+    all kernels are lambdified once and c is a runtime argument
+    :return: function (u1, u2, v1, v2, v1mid, v2mid, d) returning c_min, c_max and Krawczyk evaluations for them
+    """
+    krav = get_krav_func()  # The same Krawczyk evaluation with c as argument
+    source = inspect.getsource(get_bicentered_krav_func)
+    g_v_diag = kernel_cache.load_alias_kernel('2rpr.g_v_diag', source)
+    if g_v_diag is None:
+        g_v_diag = _build_g_v_diag(source)
+
+    def bicentered(u1n, u2n, v1n, v2n, v1midn, v2midn, dn):
+        c_min, c_max = select_c(g_v_diag(u1n, u2n, v1n, v2n, v1midn, v2midn, dn), [v1n, v2n])
+        v_min = krav(u1n, u2n, v1n, v2n, v1midn, v2midn, c_min[0], c_min[1], dn)  # Krawczyk evaluation for cmin
+        v_max = krav(u1n, u2n, v1n, v2n, v1midn, v2midn, c_max[0], c_max[1], dn)  # Krawczyk evaluation for cmax
+        return c_min, c_max, v_min, v_max
+    return bicentered
+
+
+def _build_g_v_diag(source):
+    """
+    :param source: source of get_bicentered_krav_func, the stamp of its alias
+    :return: kernel of the diagonal of derivatives of recurrent function of 2-RPR (see get_bicentered_krav_func)
+    """
+    sym, v1, v2, u1, u2, d = _rpr_symbols()
+    v1mid, v2mid = sym.symbols('v1mid, v2mid')
+    f = sym.Matrix([[v1 ** 2 - u1 ** 2 - u2 ** 2],
+                    [v2 ** 2 - (u1 - d) ** 2 - u2 ** 2]])  # System of kinematic equations
+    args = [u1, u2, v1, v2, v1mid, v2mid, d]
+
+    def build_g_v_diag():
+        v = sym.Matrix([[v1], [v2]])  # Vector v
+        f_v = derive_matrix(f, v)  # Calculate matrix of partial derivatives of kinematic matrix
+        lam = f_v ** (-1)
+        lam = lam.subs([(v1, v1mid), (v2, v2mid)])  # Calculate lambda function for recurrent transformation
+        g = v - lam * f  # Equivalent recurrent transformation
+        g_v = derive_matrix(g, v)  # Calculate matrix of partial derivatives of matrix g
+        return sym.lambdify(args, [g_v[0, 0], g_v[1, 1]])
+    return kernel_cache.cached_lambdify(kernel_cache.kernel_key('g_v_diag', f, args, 'inverse_jacobian_mid'),
+                                        build_g_v_diag, alias='2rpr.g_v_diag', alias_source=source)
+
+
 def mysin(x):
     """
     Interval sin
     :param x: interval
     :return: interval sin(x)
     """
+    if isinstance(x, iarr.IntervalArray):
+        return iarr.sin(x)
     return ival.sin(x)
 
 
@@ -197,9 +303,12 @@ def mycos(x):
     :param x: interval
     :return: interval cos(x)
     """
+    if isinstance(x, iarr.IntervalArray):
+        return iarr.cos(x)
     return ival.cos(x)
 
 
+@instrumentation.timed('kernel_setup')
 def get_unified_krav_eval(f, U, V, Vmid, C, param = []):
     """
     :param f: system of equations
@@ -210,6 +319,12 @@ def get_unified_krav_eval(f, U, V, Vmid, C, param = []):
     :param param: list of const parameters
     :return: function for calculating Krawczyk evaluation
     """
+    import sympy as sym
+    from sympy.utilities.lambdify import implemented_function
+    key = kernel_cache.kernel_key('unified', f, U, V, Vmid, C, param, 'identity')
+    kernel = kernel_cache.load_kernel(key, {'mysin1': mysin, 'mycos1': mycos})
+    if kernel is not None:
+        return kernel
     mysin1 = implemented_function(sym.Function('mysin1'), lambda x: mysin(x))
     mycos1 = implemented_function(sym.Function('mycos1'), lambda x: mycos(x))
     v = sym.Matrix()
@@ -239,4 +354,90 @@ def get_unified_krav_eval(f, U, V, Vmid, C, param = []):
     """
     g = g.replace(sym.sin, mysin1)
     g = g.replace(sym.cos, mycos1)
-    return sym.lambdify([U, V, Vmid, C, param], g)
+    kernel = sym.lambdify([U, V, Vmid, C, param], g)
+    kernel_cache.store_kernel(key, kernel)
+    return kernel
+
+
+def unified_recurrence(f, V, C, krawczyk=False):
+    """
+    Symbolic recurrent transformation of get_unified_krav_eval (lambda is identity) or its Krawczyk form
+    :param f: system of equations
+    :param V: input parameters
+    :param C: new mids of V
+    :param krawczyk: build Krawczyk evaluation g(c) + g_v * (v - c) instead of g
+    :return: matrix g
+    """
+    import sympy as sym
+    v = sym.Matrix([[V[i]] for i in range(len(V))])
+    g = v - sym.eye(f.shape[0]) * f  # Equivalent recurrent transformation
+    if not krawczyk:
+        return g
+    g_v = derive_matrix(g, v)  # Calculate matrix of partial derivatives of matrix g
+    c = sym.Matrix([[C[i]] for i in range(len(C))])
+    return g.subs(list(zip(V, C))) + g_v * (v - c)  # Calculates classical Krawczyk evaluation
+
+
+@instrumentation.timed('kernel_setup')
+def get_unified_krav_codegen(f, U, V, Vmid, C, param = [], krawczyk=False, alias=None, alias_source=''):
+    """
+    The same function as get_unified_krav_eval, but generated as straight-line interval code over IntervalArrays
+    (see interval_codegen), so sin, cos and powers don't go through Python wrappers
+    :param f: system of equations
+    :param U: output parameters
+    :param V: input parameters
+    :param Vmid: mids of V
+    :param C: new mids of C
+    :param param: list of const parameters
+    :param krawczyk: use Krawczyk form of recurrent transformation
+    :param alias: None or name, under which the kernel is remembered in the cache (see kernel_cache.store_alias)
+    :param alias_source: source of the definition of f stored with the alias (see kernel_cache.alias_stamp)
+    :return: function for calculating Krawczyk evaluation
+    """
+    key = kernel_cache.kernel_key('unified_codegen', f, U, V, Vmid, C, param, 'identity', krawczyk)
+    if alias is not None:
+        kernel_cache.store_alias(alias, key, alias_source)
+    namespace = interval_codegen.kernel_namespace()
+    kernel = kernel_cache.load_kernel(key, namespace, name='_interval_kernel')
+    if kernel is not None:
+        return kernel
+    g = unified_recurrence(f, V, C, krawczyk)
+    source = interval_codegen.interval_kernel_source(list(g), [(U, True), (V, True), (Vmid, False), (C, False),
+                                                               (param, False)])
+    kernel_cache.store_source(key, source)
+    return interval_codegen.compile_interval_kernel(source)
+
+
+@instrumentation.timed('kernel_setup')
+def get_unified_newton_codegen(f, U, V, Vmid, C, param = [], alias=None, alias_source=''):
+    """
+    Kernel of interval Newton checkers (see unified_interval.hansen_sengupta): the values of f in the mids of V,
+    the interval Jacobian of f with respect to V and the values of f on the whole V, generated as straight-line
+    interval code (see interval_codegen)
+    :param f: system of equations
+    :param U: output parameters
+    :param V: input parameters
+    :param Vmid: mids of V (not used, the kernel takes the same arguments as Krawczyk ones)
+    :param C: mids of V, in which f is evaluated
+    :param param: list of const parameters
+    :param alias: None or name, under which the kernel is remembered in the cache (see kernel_cache.store_alias)
+    :param alias_source: source of the definition of f stored with the alias (see kernel_cache.alias_stamp)
+    :return: function (U, V, Vmid, C, param) returning the list of [IntervalArray]: len(V) values of f in C, then
+             the Jacobian row by row, then len(V) values of f on V
+    """
+    key = kernel_cache.kernel_key('newton_codegen', f, U, V, Vmid, C, param)
+    if alias is not None:
+        kernel_cache.store_alias(alias, key, alias_source)
+    namespace = interval_codegen.kernel_namespace()
+    kernel = kernel_cache.load_kernel(key, namespace, name='_interval_kernel')
+    if kernel is not None:
+        return kernel
+    import sympy as sym
+    v = sym.Matrix([[V[i]] for i in range(len(V))])
+    f_c = f.subs(list(zip(V, C)))
+    f_v = derive_matrix(f, v)
+    source = interval_codegen.interval_kernel_source(list(f_c) + list(f_v) + list(f), [(U, True), (V, True),
+                                                                                      (Vmid, False), (C, False),
+                                                                                      (param, False)])
+    kernel_cache.store_source(key, source)
+    return interval_codegen.compile_interval_kernel(source)
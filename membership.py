@@ -0,0 +1,159 @@
+import numpy as np
+import interval_array as iarr
+from box_class import BoxList, LabelGrid, BORDER, UNKNOWN
+
+
+def _as_points(points):
+    """
+    :param points: array of shape (m, 2) or pair (x, y) of arrays
+    :return: float64 arrays x, y
+    """
+    if isinstance(points, tuple):
+        x, y = points
+    else:
+        points = np.asarray(points, dtype=np.float64)
+        x, y = points[..., 0], points[..., 1]
+    return np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+
+
+def refine_border(x, y, labels, classify):
+    """
+    Exact test of points labelled BORDER: every such point is checked as the degenerate box [x, x] x [y, y].
+    Points, which the checker can't decide either, stay BORDER
+    :param x: X coordinates of points
+    :param y: Y coordinates of points
+    :param labels: labels of points, changed in place
+    :param classify: function (u1, u2) returning array of labels of cells, e.g. check_box.classify_uni with bound
+                     checker, V, param and p (functools.partial)
+    :return: labels
+    """
+    border = np.nonzero(labels == BORDER)[0]
+    if border.size:
+        labels[border] = classify(iarr.IntervalArray(x[border]), iarr.IntervalArray(y[border]))
+    return labels
+
+
+class GridIndex(object):
+    """
+    Point membership in LabelGrid: the cell of a point is computed directly for uniform grids and found by
+    binary search of nodes otherwise. Cells are closed, so a point on the common side of cells gets the label of
+    one of them, which is correct for any of them
+    """
+    def __init__(self, grid):
+        """Constructor"""
+        self.grid = grid
+        self.uniform = []  # (first node, 1 / step) of uniform axes, None for the others
+        for nodes in (grid.x_nodes, grid.y_nodes):
+            step = np.diff(nodes)
+            if np.allclose(step, step[0], rtol=1e-9, atol=0):
+                self.uniform.append((nodes[0], (nodes.size - 1) / (nodes[-1] - nodes[0])))
+            else:
+                self.uniform.append(None)
+
+    def _cells(self, u, nodes, uniform):
+        """
+        :return: index of the cell along the axis for every coordinate u, -1 if u is out of the nodes
+        """
+        if uniform is None:
+            i = np.searchsorted(nodes, u, side='right') - 1
+        else:
+            f = (u - uniform[0]) * uniform[1]
+            f[~np.isfinite(f)] = 0  # NaN and infinities are marked below, they can't be cast to int
+            i = np.clip(np.floor(f), 0, nodes.size - 2).astype(np.intp)
+        i[u == nodes[-1]] = nodes.size - 2
+        i[(u < nodes[0]) | (u > nodes[-1]) | np.isnan(u)] = -1
+        return i
+
+    def query(self, points, refine=None):
+        """
+        :param points: array of shape (m, 2) or pair (x, y) of arrays
+        :param refine: None or function (u1, u2) returning labels of cells, checks points of border cells exactly
+                       (see refine_border)
+        :return: array of labels: INSIDE, BORDER or OUTSIDE, UNKNOWN for points outside the grid
+        """
+        x, y = _as_points(points)
+        shape = x.shape
+        x, y = x.ravel(), y.ravel()
+        j = self._cells(x, self.grid.x_nodes, self.uniform[0])
+        i = self._cells(y, self.grid.y_nodes, self.uniform[1])
+        found = (i >= 0) & (j >= 0)
+        labels = np.full(x.size, UNKNOWN, dtype=np.uint8)
+        labels[found] = self.grid.labels[i[found], j[found]]
+        if refine is not None:
+            refine_border(x, y, labels, refine)
+        return labels.reshape(shape)
+
+
+def _interleave(ix, iy, depth):
+    """
+    :return: Morton codes (bits of iy and ix interleaved) of cells (ix, iy) of level depth of quadtree
+    """
+    code = np.zeros(ix.size, dtype=np.uint64)
+    ix = ix.astype(np.uint64)
+    iy = iy.astype(np.uint64)
+    for bit in range(depth):
+        code |= ((ix >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit)
+        code |= ((iy >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit + 1)
+    return code
+
+
+class QuadtreeIndex(object):
+    """
+    Point membership in BoxList of adaptive subdivision (see check_box.split_border_boxes) stored as linear
+    quadtree: a leaf of depth d covers the range of Morton codes of the cells of the deepest level, which it
+    contains, and the leaf of a point is found by binary search of these ranges
+    """
+    def __init__(self, boxes):
+        """Constructor"""
+        self.bounds = (boxes.xleft.min(), boxes.xright.max(), boxes.yleft.min(), boxes.yright.max())
+        self.depth = int(boxes.depth.max())
+        if self.depth > 31:
+            raise ValueError('Quadtree is deeper than 31 levels')
+        width = self.bounds[1] - self.bounds[0]
+        height = self.bounds[3] - self.bounds[2]
+        scale = 2.0 ** boxes.depth
+        ix = np.rint((boxes.xleft - self.bounds[0]) / width * scale).astype(np.int64)
+        iy = np.rint((boxes.yleft - self.bounds[2]) / height * scale).astype(np.int64)
+        shift = (2 * (self.depth - boxes.depth)).astype(np.uint64)
+        code = _interleave(ix, iy, self.depth)
+        order = np.argsort(code << shift, kind='stable')
+        self.starts = (code << shift)[order]
+        self.ends = ((code + np.uint64(1)) << shift)[order]
+        self.labels = boxes.labels[order]
+
+    def query(self, points, refine=None):
+        """
+        :param points: array of shape (m, 2) or pair (x, y) of arrays
+        :param refine: None or function (u1, u2) returning labels of cells, checks points of border boxes exactly
+                       (see refine_border)
+        :return: array of labels: INSIDE, BORDER or OUTSIDE, UNKNOWN for points not covered by boxes
+        """
+        x, y = _as_points(points)
+        shape = x.shape
+        x, y = x.ravel(), y.ravel()
+        cells = 2 ** self.depth
+        fx = (x - self.bounds[0]) / (self.bounds[1] - self.bounds[0]) * cells
+        fy = (y - self.bounds[2]) / (self.bounds[3] - self.bounds[2]) * cells
+        covered = (fx >= 0) & (fx <= cells) & (fy >= 0) & (fy <= cells)
+        ix = np.clip(np.floor(np.where(covered, fx, 0)), 0, cells - 1)
+        iy = np.clip(np.floor(np.where(covered, fy, 0)), 0, cells - 1)
+        code = _interleave(ix.astype(np.int64), iy.astype(np.int64), self.depth)
+        k = np.searchsorted(self.starts, code, side='right') - 1
+        covered &= (k >= 0) & (code < self.ends[np.maximum(k, 0)])
+        labels = np.full(x.size, UNKNOWN, dtype=np.uint8)
+        labels[covered] = self.labels[k[covered]]
+        if refine is not None:
+            refine_border(x, y, labels, refine)
+        return labels.reshape(shape)
+
+
+def build_index(result):
+    """
+    :param result: LabelGrid of uniform grid or BoxList of adaptive subdivision
+    :return: GridIndex or QuadtreeIndex with method query(points, refine=None)
+    """
+    if isinstance(result, LabelGrid):
+        return GridIndex(result)
+    if isinstance(result, BoxList):
+        return QuadtreeIndex(result)
+    raise TypeError('Expected LabelGrid or BoxList, got %s' % type(result).__name__)
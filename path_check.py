@@ -0,0 +1,232 @@
+import collections
+import functools
+import numpy as np
+import interval_array as iarr
+from box_class import OUTSIDE, INSIDE, BORDER
+from check_box import classify_classical, classify_uni, classify_prefiltered
+
+
+class PathResult(object):
+    """
+    Result of checking path: feasible is True if the whole path is certified to be inside the workspace, False if
+    a part of it is certified to be outside and None if it's not decided at the max depth of bisection
+    """
+    def __init__(self, feasible, failure, label, segment, pieces):
+        """
+        :param feasible: True, False or None
+        :param failure: None or (t0, t1): the first piece of path certified to be outside if feasible is False, the
+                        first piece not certified to be inside if feasible is None
+        :param label: OUTSIDE if feasible is False, BORDER if it's None, None if path is feasible
+        :param segment: index of the segment of polyline containing failure, None for parametric paths
+        :param pieces: number of checked pieces of path
+        """
+        self.feasible = feasible
+        self.failure = failure
+        self.label = label
+        self.segment = segment
+        self.pieces = pieces
+
+    def __repr__(self):
+        return 'PathResult(feasible=%r, failure=%r, label=%r, segment=%r)' % (self.feasible, self.failure,
+                                                                              self.label, self.segment)
+
+
+def polyline_enclosure(vertices):
+    """
+    Parametrization of polyline: t in [k, k + 1] runs the segment from vertices[k] to vertices[k + 1]
+    :param vertices: array of shape (m, 2)
+    :return: function of IntervalArray t (every interval within one segment) returning IntervalArrays x, y, which
+             contain the points of the pieces of path
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+
+    def enclose(t):
+        k = np.clip(np.floor(t.lo), 0, vertices.shape[0] - 2).astype(np.intp)
+        a = vertices[k]
+        b = vertices[k + 1]
+        start = a + (t.lo - k)[:, None] * (b - a)
+        end = np.where((t.hi - k == 1)[:, None], b, a + (t.hi - k)[:, None] * (b - a))
+        pad = 4 * np.finfo(np.float64).eps * (np.abs(a) + np.abs(b))  # rounding of start and end
+        lo = np.minimum(start, end) - pad
+        hi = np.maximum(start, end) + pad
+        return iarr.IntervalArray(lo[:, 0], hi[:, 0]), iarr.IntervalArray(lo[:, 1], hi[:, 1])
+    return enclose
+
+
+class PathChecker(object):
+    """
+    Certified check that paths stay inside the workspace of one robot. Path is covered by boxes of its pieces and
+    only pieces with border boxes are bisected. Boxes are checked as cells of dyadic grid over bounds (a piece gets
+    at most 2 x 2 cells of the level as wide as the piece), and labels of max_cells recently used cells are
+    remembered, so the paths checked by the same PathChecker share the calls of the checker
+    """
+    def __init__(self, classify, bounds, max_depth=16, max_level=30, max_cells=1 << 20):
+        """
+        :param classify: function (u1, u2) returning array of labels of cells (see check_box.classify_uni)
+        :param bounds: (xleft, xright, yleft, yright), the level 0 cell of dyadic grid
+        :param max_depth: the max number of bisections of a piece of path
+        :param max_level: the finest level of dyadic grid
+        :param max_cells: the max number of remembered labels of cells, least recently used are dropped
+        """
+        self.classify = classify
+        self.origin = np.array([bounds[0], bounds[2]], dtype=np.float64)
+        self.size = np.array([bounds[1] - bounds[0], bounds[3] - bounds[2]], dtype=np.float64)
+        self.max_depth = max_depth
+        self.max_level = max_level
+        self.max_cells = max_cells
+        self.cells = collections.OrderedDict()  # (level, ix, iy) -> label of the cell of dyadic grid, LRU order
+
+    def _node(self, axis, level, i):
+        """
+        :return: coordinates of nodes i of level of dyadic grid along axis
+        """
+        return self.origin[axis] + self.size[axis] * np.ldexp(np.asarray(i, dtype=np.float64), -level)
+
+    def _cover(self, axis, level, lo, hi):
+        """
+        :return: the first and the last indices of cells of level covering [lo, hi] along axis
+        """
+        scale = np.ldexp(1.0, level)
+        first = np.floor((lo - self.origin[axis]) / self.size[axis] * scale)
+        last = np.maximum(np.ceil((hi - self.origin[axis]) / self.size[axis] * scale) - 1, first)
+        first -= self._node(axis, level, first) > lo  # nodes are rounded, cells must contain the box
+        last += self._node(axis, level, last + 1) < hi
+        return first.astype(np.int64), last.astype(np.int64)
+
+    def label_boxes(self, x, y):
+        """
+        :param x: IntervalArray of the X coordinates of boxes
+        :param y: IntervalArray of the Y coordinates of boxes
+        :return: array of labels: INSIDE if all cells covering the box are inside, OUTSIDE if all are outside,
+                 BORDER otherwise
+        """
+        width = np.maximum((x.hi - x.lo) / self.size[0], (y.hi - y.lo) / self.size[1])
+        level = np.full(width.size, self.max_level, dtype=np.int64)
+        wide = width > 0
+        level[wide] = np.minimum(np.floor(-np.log2(width[wide])), self.max_level)
+        covers = []
+        found = {}  # labels of the cells of this call, they stay here even if dropped from self.cells
+        missing = set()
+        for k in range(width.size):
+            ix = self._cover(0, level[k], x.lo[k], x.hi[k])
+            iy = self._cover(1, level[k], y.lo[k], y.hi[k])
+            keys = [(int(level[k]), i, j) for i in range(ix[0], ix[1] + 1) for j in range(iy[0], iy[1] + 1)]
+            for key in keys:
+                if key in self.cells:
+                    found[key] = self.cells[key]
+                    self.cells.move_to_end(key)
+                else:
+                    missing.add(key)
+            covers.append(keys)
+        if missing:
+            missing = list(missing)
+            level, i, j = (np.array(values, dtype=np.int64) for values in zip(*missing))
+            u1 = iarr.IntervalArray(self._node(0, level, i), self._node(0, level, i + 1))
+            u2 = iarr.IntervalArray(self._node(1, level, j), self._node(1, level, j + 1))
+            found.update(zip(missing, self.classify(u1, u2).tolist()))
+            self.cells.update((key, found[key]) for key in missing)
+            while len(self.cells) > self.max_cells:
+                self.cells.popitem(last=False)
+        labels = np.empty(width.size, dtype=np.uint8)
+        for k, keys in enumerate(covers):
+            cell_labels = {found[key] for key in keys}
+            labels[k] = cell_labels.pop() if len(cell_labels) == 1 and BORDER not in cell_labels else BORDER
+        return labels
+
+    def check(self, path):
+        """
+        :param path: polyline (array of vertices of shape (m, 2)) or parametric curve (enclose, t0, t1), where
+                     enclose is function of IntervalArray t returning IntervalArrays x, y containing the points of
+                     curve (e.g. written with interval_array.sin and cos). Polyline of one vertex is the point
+                     checked as the degenerate box [x, x] x [y, y], its failure is (0, 0)
+        :return: PathResult
+        """
+        max_depth = self.max_depth
+        if isinstance(path, tuple) and callable(path[0]):
+            enclose, t0, t1 = path
+            lo, hi = np.array([t0], dtype=np.float64), np.array([t1], dtype=np.float64)
+            polyline = False
+        else:
+            path = np.asarray(path, dtype=np.float64)
+            if path.ndim != 2 or path.shape[1] != 2:
+                raise ValueError("Polyline must be array of vertices of shape (m, 2), got shape %s" % (path.shape,))
+            if path.shape[0] < 1:
+                raise ValueError("Polyline must have at least one vertex")
+            if path.shape[0] == 1:
+                path = np.repeat(path, 2, axis=0)  # the segment [0, 0] of the point, bisection can't shrink it
+                lo, hi = np.zeros(1), np.zeros(1)
+                max_depth = 0
+            else:
+                lo = np.arange(len(path) - 1, dtype=np.float64)
+                hi = lo + 1
+            enclose = polyline_enclosure(path)
+            polyline = True
+        failure = None  # (t0, t1, label) of the first piece certified to be outside, or at the max depth of the first
+        infeasible = False  # piece not certified to be inside if there are no pieces outside
+        pieces = 0
+        for depth in range(max_depth + 1):
+            if failure is not None:
+                keep = lo < failure[0]  # later pieces can't be the first failure
+                lo, hi = lo[keep], hi[keep]
+            if not lo.size:
+                break
+            labels = self.label_boxes(*enclose(iarr.IntervalArray(lo, hi)))
+            pieces += lo.size
+            outside = np.nonzero(labels == OUTSIDE)[0]
+            if outside.size:
+                infeasible = True
+                k = outside[np.argmin(lo[outside])]
+                failure = (lo[k], hi[k], OUTSIDE)
+            border = np.nonzero(labels == BORDER)[0]
+            if depth == max_depth:
+                if border.size and not infeasible:  # undecided pieces don't matter if a piece is outside
+                    k = border[np.argmin(lo[border])]
+                    failure = (lo[k], hi[k], BORDER)
+                break
+            lo, hi = lo[border], hi[border]
+            mid = 0.5 * (lo + hi)
+            lo, hi = np.concatenate([lo, mid]), np.concatenate([mid, hi])
+        if failure is None:
+            return PathResult(True, None, None, None, pieces)
+        segment = int(min(np.floor(failure[0]), len(path) - 2)) if polyline else None
+        return PathResult(False if infeasible else None, (float(failure[0]), float(failure[1])), failure[2],
+                          segment, pieces)
+
+
+def path_checker(bounds, l1, l2, d, checker, coef, p=10, max_depth=16, prefilter=None, max_cells=1 << 20):
+    """
+    PathChecker of 2-RPR
+    :param bounds: (xleft, xright, yleft, yright), the level 0 cell of dyadic grid
+    :param l1: the lowest range of 2-RPR rod
+    :param l2: the highest range of 2-RPR rod
+    :param d: the distance between rods
+    :param checker: batched checker, takes IntervalArrays u1, u2 and returns array of labels
+    :param p: the max number of iterations
+    :param max_depth: the max number of bisections of a piece of path
+    :param prefilter: None or analytic test of cells (see check_box_grid)
+    :param max_cells: the max number of remembered labels of cells
+    :return: PathChecker
+    """
+    classify = functools.partial(classify_classical, checker=checker, l1=l1, l2=l2, d=d, coef=coef, p=p)
+    if prefilter is not None:
+        classify = functools.partial(classify_prefiltered, classify=classify, prefilter=prefilter)
+    return PathChecker(classify, bounds, max_depth, max_cells=max_cells)
+
+
+def path_checker_uni(bounds, V, param, checker, p=10, max_depth=16, prefilter=None, max_cells=1 << 20):
+    """
+    PathChecker of unified problem
+    :param bounds: (xleft, xright, yleft, yright), the level 0 cell of dyadic grid
+    :param V: list of intervals of unknowns
+    :param param: list of const parameters
+    :param checker: batched checker, takes list of IntervalArrays U and returns array of labels
+    :param p: the max number of iterations
+    :param max_depth: the max number of bisections of a piece of path
+    :param prefilter: None or analytic test of cells (see check_box_grid)
+    :param max_cells: the max number of remembered labels of cells
+    :return: PathChecker
+    """
+    classify = functools.partial(classify_uni, checker=checker, V=V, param=param, p=p)
+    if prefilter is not None:
+        classify = functools.partial(classify_prefiltered, classify=classify, prefilter=prefilter)
+    return PathChecker(classify, bounds, max_depth, max_cells=max_cells)
@@ -1,7 +1,10 @@
-import shapely.geometry as sg
 import matplotlib.pyplot as plt
 import descartes
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
 from matplotlib.patches import Circle, Rectangle
+from box_class import LabelGrid, BoxList, INSIDE, BORDER
+from exact_workspace import rpr_workspace
 
 
 import numpy as np
@@ -79,33 +82,26 @@ def uniform_grid(a, b, d, p, seed=1234):
         check_D_1(X, Y, a, b, d) & check_D_2(X, Y, a, b, d)], X, Y
 
 
-def plot_workspace(l1, l2, d, area_points, border_points):
+def plot_workspace(l1, l2, d, area_points, border_points=None, path=None):
     """
     Function for plotting workspace area of 2-RPR robot with approximation on uniform grid
     :param l1: the lowest range of 2-RPR rod
     :param l2: the highest range of 2-RPR rod
     :param d:  the distance between rods
-    :param points_area_x:  the array of X-coordinates of area points
-    :param points_area_y:  the array of Y-coordinates of area points
-    :param points_border_x:  the array of X-coordinates of border points
-    :param points_border_y:  the array of Y-coordinates of border points
+    :param area_points:  BoxPoints of workspace area, or LabelGrid / BoxList with all cells
+    :param border_points:  BoxPoints of border of workspace area, not needed for LabelGrid / BoxList
+    :param path: file (.png, .svg...) to save the figure to without showing it
     :return:
     """
     left_border = -l2  # Left border of rectangle which we use to build uniform grid
     right_border = l2  # Right border of rectangle which we use to build uniform grid
     if l1 < l2:
         l1 += 1e-10
-        fig, ax = plt.subplots(figsize=(8, 8))
+        fig, ax = _figure(path)
         x_min, y_min, x_max, y_max = left_border - 1, left_border - 1, right_border + 1, right_border + 1
         ax.set_xlim([x_min, x_max])
         ax.set_ylim([y_min, y_max])
-        a = sg.Point(0,0).buffer(l1)  # Init circles with shapely
-        b = sg.Point(0,0).buffer(l2)
-        c = sg.Point(d,0).buffer(l1)
-        e = sg.Point(d,0).buffer(l2)
-        ab = b.difference(a)  # Calculate rings as a difference of bigger circle and smaller circle for each rod
-        cd = e.difference(c)
-        middle = ab.intersection(cd)  # Calculates final area of robot workspace as intersection of two rings
+        middle = rpr_workspace(l1, l2, d)
         circle1 = Circle((0, 0), radius=l1, fill=False, color='r')  # Init circles with matplotlib for plot
         circle2 = Circle((0, 0), radius=l2, fill=False, color='r')
         circle3 = Circle((d, 0), radius=l1, fill=False, color='b')
@@ -120,27 +116,23 @@ def plot_workspace(l1, l2, d, area_points, border_points):
         ax.add_patch(circle4)
         ax.add_patch(rect1)
         ax.axes.set_aspect('equal')
-        for i in range(len(area_points.get_points('xleft'))):  # Plot rectangles, which compose workspace area
-            rect1 = Rectangle([area_points.get_points('xleft')[i], area_points.get_points('yleft')[i]],
-                              area_points.get_points('xright')[i] - area_points.get_points('xleft')[i],
-                              area_points.get_points('yright')[i] - area_points.get_points('yleft')[i],
-                              fill=True, fc='red', color='g', linewidth=1.0, alpha=0.5)
-            ax.add_patch(rect1)
-        for i in range(len(border_points.get_points('xleft'))):  # Plot rectangles, which compose the border of workspace area
-            rect2 = Rectangle([border_points.get_points('xleft')[i], border_points.get_points('yleft')[i]],
-                              border_points.get_points('xright')[i] - border_points.get_points('xleft')[i],
-                              border_points.get_points('yright')[i] - border_points.get_points('yleft')[i],
-                              fill=True, fc='black', color='yellow', linewidth=1.0, alpha=0.5)
-            ax.add_patch(rect2)
-        plt.show()
+        draw_cells(ax, area_points, border_points)  # Plot rectangles of workspace area and its border
+        _finish(fig, path)
     else:
         print('Wrong data')
 
 
-def uni_plotter(area_points, border_points, L2, a = 0, b = 0, d = 0):
+def uni_plotter(area_points, border_points, L2, a = 0, b = 0, d = 0, path=None):
+    """
+    Function for plotting workspace area approximation of unified checkers
+    :param area_points: BoxPoints of workspace area, or LabelGrid / BoxList with all cells
+    :param border_points: BoxPoints of border of workspace area, None for LabelGrid / BoxList
+    :param L2: half of the side of rectangle of uniform grid
+    :param path: file (.png, .svg...) to save the figure to without showing it
+    """
     left_border = -L2  # Left border of rectangle which we use to build uniform grid
     right_border = L2
-    fig, ax = plt.subplots(figsize=(8, 8))
+    fig, ax = _figure(path)
     x_min, y_min, x_max, y_max = left_border - 1, left_border - 1, right_border + 1, right_border + 1
     ax.set_xlim([x_min, x_max])
     ax.set_ylim([y_min, y_max])
@@ -151,17 +143,55 @@ def uni_plotter(area_points, border_points, L2, a = 0, b = 0, d = 0):
         ax.scatter(X_uni, Y_uni)
     ax.add_patch(rect1)
     ax.axes.set_aspect('equal')
-    for i in range(len(area_points.get_points('xleft'))):  # Plot rectangles, which compose workspace area
-        rect1 = Rectangle([area_points.get_points('xleft')[i], area_points.get_points('yleft')[i]],
-                          area_points.get_points('xright')[i] - area_points.get_points('xleft')[i],
-                          area_points.get_points('yright')[i] - area_points.get_points('yleft')[i],
-                          fill=True, fc='red', color='g', linewidth=1.0, alpha=0.5)
-        ax.add_patch(rect1)
-    for i in range(
-            len(border_points.get_points('xleft'))):  # Plot rectangles, which compose the border of workspace area
-        rect2 = Rectangle([border_points.get_points('xleft')[i], border_points.get_points('yleft')[i]],
-                          border_points.get_points('xright')[i] - border_points.get_points('xleft')[i],
-                          border_points.get_points('yright')[i] - border_points.get_points('yleft')[i],
-                          fill=True, fc='black', color='yellow', linewidth=1.0, alpha=0.5)
-        ax.add_patch(rect2)
-    plt.show()
+    draw_cells(ax, area_points, border_points)  # Plot rectangles of workspace area and its border
+    _finish(fig, path)
+
+
+INSIDE_STYLE = {'facecolor': 'red', 'edgecolor': 'g', 'linewidth': 1.0, 'alpha': 0.5}
+BORDER_STYLE = {'facecolor': 'black', 'edgecolor': 'yellow', 'linewidth': 1.0, 'alpha': 0.5}
+
+
+def draw_cells(ax, area_points, border_points=None):
+    """
+    Draw workspace area and its border on axes. LabelGrid is drawn as one raster image, boxes (BoxPoints, BoxList)
+    as one collection of polygons per label, so even 10^6 cells are drawn in seconds
+    :param ax: matplotlib axes
+    :param area_points: BoxPoints of workspace area, or LabelGrid / BoxList with all cells
+    :param border_points: BoxPoints of border of workspace area, not needed for LabelGrid / BoxList
+    """
+    if isinstance(area_points, LabelGrid):
+        colors = np.zeros((256, 4))  # RGBA of every label, outside and unknown cells are transparent
+        colors[INSIDE] = (1.0, 0.0, 0.0, INSIDE_STYLE['alpha'])
+        colors[BORDER] = (0.0, 0.0, 0.0, BORDER_STYLE['alpha'])
+        grid = area_points
+        ax.imshow(colors[grid.labels], origin='lower', interpolation='nearest', aspect='equal',
+                  extent=(grid.x_nodes[0], grid.x_nodes[-1], grid.y_nodes[0], grid.y_nodes[-1]))
+        return
+    if isinstance(area_points, BoxList):
+        boxes = [area_points.boxes(INSIDE), area_points.boxes(BORDER)]
+    else:
+        boxes = [[points.get_points(arg) for arg in ('xleft', 'xright', 'yleft', 'yright')]
+                 for points in (area_points, border_points)]
+    for box, style in zip(boxes, (INSIDE_STYLE, BORDER_STYLE)):
+        xleft, xright, yleft, yright = [np.asarray(values, dtype=np.float64) for values in box]
+        if xleft.size:
+            verts = np.stack([np.stack([xleft, yleft], axis=1), np.stack([xright, yleft], axis=1),
+                              np.stack([xright, yright], axis=1), np.stack([xleft, yright], axis=1)], axis=1)
+            ax.add_collection(PolyCollection(verts, **style))
+
+
+def _figure(path):
+    """
+    Figure for plotting: pyplot figure to show, or standalone figure (no GUI backend is needed) to save to path
+    """
+    if path is None:
+        return plt.subplots(figsize=(8, 8))
+    fig = Figure(figsize=(8, 8))
+    return fig, fig.subplots()
+
+
+def _finish(fig, path):
+    if path is None:
+        plt.show()
+    else:
+        fig.savefig(path)
@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import collections
+import http.client
+import json
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor
+import batch
+import workspace
+from box_class import LABEL_NAMES, INSIDE, BORDER
+
+MAX_BODY = 1 << 20  # The largest accepted request body in bytes
+MAX_NODES = 501  # The largest accepted number of nodes of the grid along each side
+MAX_ITERATIONS = 100  # The largest accepted p
+MAX_RESPONSE = 32 << 20  # The largest response body in bytes
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error'}
+
+
+def _preload(kernels):
+    for problem, kind in kernels:
+        workspace.load_checker(problem, kind)
+
+
+def result_body(grid, stats, result_format):
+    """
+    :param grid: LabelGrid
+    :param stats: dict of stats of batch.run_job
+    :param result_format: 'grid' (nodes and rows of labels) or 'boxes' (xleft, xright, yleft, yright of inside and
+                          border cells)
+    :return: dict ready for json.dumps
+    """
+    body = {'stats': stats}
+    if result_format == 'grid':
+        body.update({'x_nodes': grid.x_nodes.tolist(), 'y_nodes': grid.y_nodes.tolist(),
+                     'labels': grid.labels.tolist()})
+    elif result_format == 'boxes':
+        body['boxes'] = {LABEL_NAMES[label]: [values.tolist() for values in grid.boxes(label)]
+                         for label in (INSIDE, BORDER)}
+    else:
+        raise ValueError("format must be 'grid' or 'boxes', not %r" % (result_format,))
+    return body
+
+
+class WorkspaceServer(object):
+    """
+    Local HTTP service checking workspaces: asyncio accepts requests, a pool of processes with warm kernels checks
+    them. Results of recent jobs are kept in memory, and equal jobs requested at the same time are checked once.
+    POST /check takes a job of batch.py (name is optional) with optional 'format' ('grid' or 'boxes'),
+    GET /health returns the state of the service
+    """
+    def __init__(self, workers=None, cache_size=32, preload=(), max_nodes=MAX_NODES):
+        """
+        :param workers: number of worker processes, by default the number of CPUs
+        :param cache_size: number of recent results kept in memory
+        :param preload: list of (problem, kind), whose kernels are loaded by workers at start
+        :param max_nodes: the largest accepted number of nodes of the grid along each side
+        """
+        self.max_nodes = max_nodes
+        _preload(preload)  # builds missing kernels once, workers load them from the kernel cache
+        self.executor = ProcessPoolExecutor(workers or os.cpu_count() or 1, initializer=_preload,
+                                            initargs=(list(preload),))
+        self.cache_size = cache_size
+        self.results = collections.OrderedDict()  # key of job -> asyncio.Future of (LabelGrid, stats)
+        self.requests = 0
+
+    async def check(self, job):
+        """
+        :param job: job dict (see batch.load_jobs), name is not part of the key of cache
+        :return: (LabelGrid, stats)
+        """
+        full = dict(batch.JOB_DEFAULTS)
+        full.update(job)
+        full.setdefault('name', 'request')
+        missing = [key for key in batch.JOB_KEYS if key not in full]
+        if missing:
+            raise ValueError('Job has no ' + ', '.join(missing))
+        batch.check_job(full)
+        for name, largest in (('n', self.max_nodes), ('p', MAX_ITERATIONS)):
+            if not isinstance(full[name], int) or isinstance(full[name], bool) or not 2 <= full[name] <= largest:
+                raise ValueError('%s must be an integer from 2 to %d' % (name, largest))
+        key = json.dumps({k: v for k, v in full.items() if k not in ('name', 'format')}, sort_keys=True)
+        future = self.results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = asyncio.ensure_future(loop.run_in_executor(self.executor, batch.run_job, full))
+            self.results[key] = future
+            while len(self.results) > self.cache_size:
+                self.results.popitem(last=False)
+        else:
+            self.results.move_to_end(key)
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            if self.results.get(key) is future:
+                del self.results[key]  # failed jobs are not cached
+            raise
+
+    async def handle(self, reader, writer):
+        """
+        Serve one HTTP request of connection
+        """
+        try:
+            status, body = await self.respond(reader)
+        except Exception as error:
+            status, body = 500, {'error': str(error)}
+        data = json.dumps(body).encode()
+        if len(data) > MAX_RESPONSE:
+            status, data = 413, json.dumps({'error': 'result is too large, use a smaller n'}).encode()
+        writer.write(('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n'
+                      'Connection: close\r\n\r\n' % (status, REASONS[status], len(data))).encode() + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def respond(self, reader):
+        """
+        :return: HTTP status and dict of response
+        """
+        request_line = (await reader.readline()).decode('latin-1').split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if len(request_line) < 2:
+            return 400, {'error': 'bad request line'}
+        method, path = request_line[0], request_line[1]
+        self.requests += 1
+        if path == '/health':
+            return 200, {'status': 'ok', 'requests': self.requests, 'cached': len(self.results)}
+        if path != '/check':
+            return 404, {'error': 'unknown path ' + path}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        try:
+            length = int(headers.get('content-length', 0))
+            if length > MAX_BODY:
+                return 413, {'error': 'request is too large'}
+            if length < 0:
+                raise ValueError('negative Content-Length')
+            job = json.loads((await reader.readexactly(length)).decode())
+            if not isinstance(job, dict):
+                raise ValueError('job must be a JSON object')
+            result_format = job.get('format', 'grid')
+            if result_format not in ('grid', 'boxes'):
+                return 400, {'error': "format must be 'grid' or 'boxes'"}
+            grid, stats = await self.check(job)
+            return 200, result_body(grid, stats, result_format)
+        except (ValueError, KeyError, TypeError, asyncio.IncompleteReadError) as error:
+            return 400, {'error': str(error)}
+
+    async def serve(self, host='127.0.0.1', port=8765, unix=None):
+        """
+        Serve forever on TCP host:port or on Unix socket unix
+        """
+        if unix is not None:
+            server = await asyncio.start_unix_server(self.handle, path=unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        http.client.HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def request(job, host='127.0.0.1', port=8765, unix=None, timeout=None):
+    """
+    Client of WorkspaceServer
+    :param job: job dict (see WorkspaceServer) or None for GET /health
+    :return: (HTTP status, dict of response)
+    """
+    if unix is not None:
+        connection = _UnixConnection(unix, timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        if job is None:
+            connection.request('GET', '/health')
+        else:
+            connection.request('POST', '/check', json.dumps(job), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read().decode())
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local service checking workspaces with warm kernels')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port')
+    parser.add_argument('--unix', help='listen on this Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, help='number of worker processes')
+    parser.add_argument('--cache-size', type=int, default=32, help='number of recent results kept in memory')
+    parser.add_argument('--max-nodes', type=int, default=MAX_NODES, help='the largest n of accepted jobs')
+    parser.add_argument('--preload', nargs='+', default=[], metavar='PROBLEM[:KIND]',
+                        help='kernels loaded at start, e.g. func_dextar:krawczyk')
+    args = parser.parse_args(argv)
+    preload = [tuple(item.split(':', 1)) if ':' in item else (item, 'krawczyk') for item in args.preload]
+    server = WorkspaceServer(args.workers, args.cache_size, preload, args.max_nodes)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
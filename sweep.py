@@ -0,0 +1,104 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import interval as ival
+from box_class import INSIDE, BORDER
+
+
+def rpr_configuration(d, l1, l2):
+    """
+    Unified 2-RPR (func_2rpr) with rods [l1, l2] and distance d between their bases
+    :return: intervals of unknowns, const parameters, bounds of grid (xmin, xmax, ymin, ymax)
+    """
+    return [[l1, l2], [l1, l2]], [d], (-l2, l2, -l2, l2)
+
+
+def dextar_configuration(L, l, d):
+    """
+    DexTar (func_dextar) with proximal links L, distal links l and bases (-d, 0), (d, 0)
+    :return: intervals of unknowns, const parameters, bounds of grid (xmin, xmax, ymin, ymax)
+    """
+    half = d + L + l
+    return [[0, 2 * np.pi]] * 4, [L, l, d], (-half, half, -half, half)
+
+
+# function of unified_interval.py -> (names of swept parameters, function building configuration from them)
+CONFIGURATIONS = {
+    'func_2rpr': (('d', 'l1', 'l2'), rpr_configuration),
+    'func_dextar': (('L', 'l', 'd'), dextar_configuration),
+}
+
+
+def parameter_grid(**values):
+    """
+    All combinations of parameter values, e.g. parameter_grid(d=[4, 6], l1=[3], l2=[12, 15]) gives 4 dicts
+    :param values: name of parameter -> list of its values
+    :return: list of dicts name -> value
+    """
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(values[name] for name in names))]
+
+
+_checker = None  # Checker of the swept problem in this process, set by _init_sweep
+
+
+def _init_sweep(problem, kind):
+    """
+    Load the checker of problem (see workspace.load_checker). Workers load its kernel from the kernel cache by
+    the alias written by the parent process, so sympy runs only once per sweep
+    """
+    global _checker
+    import workspace
+    _checker = workspace.load_checker(problem, kind)
+
+
+def _check_configuration(V, param, bounds, n, p, prefilter):
+    """
+    Check one configuration on uniform grid
+    :return: LabelGrid and time of checking in seconds
+    """
+    from check_box import check_box_uni_grid
+    X, Y = np.meshgrid(np.linspace(bounds[0], bounds[1], n), np.linspace(bounds[2], bounds[3], n))
+    V_ival = [ival.Interval(v) for v in V]
+    start = time.perf_counter()
+    grid = check_box_uni_grid(X, Y, n, V_ival, param, _checker, 1, p,
+                              prefilter=None if prefilter is None else prefilter(V_ival, param))
+    return grid, time.perf_counter() - start
+
+
+def sweep(problem, configurations, n=100, kind='krawczyk', p=10, workers=None, prefilter=None):
+    """
+    Workspaces of one unified problem for many values of its parameters. The kernel is built once, parameters
+    are its runtime arguments, and configurations are checked in parallel on a pool of processes
+    :param problem: name of function of unified_interval.py in CONFIGURATIONS, e.g. 'func_2rpr'
+    :param configurations: list of dicts of parameters of problem (see parameter_grid)
+    :param n: number of nodes of uniform grid along each side
+    :param kind: checker of workspace.CHECKERS, 'krawczyk' or 'newton'
+    :param p: the max number of iterations
+    :param workers: number of worker processes, by default the number of CPUs, 1 checks in this process
+    :param prefilter: None or function (V, param) returning prefilter of check_box_uni_grid, e.g.
+                      unified_interval.prefilter_2rpr
+    :return: list of records (dicts) with parameters, 'inside_area', 'border_area', 'seconds' and 'labels'
+             (LabelGrid), in the order of configurations
+    """
+    names, configure = CONFIGURATIONS[problem]
+    tasks = []
+    for configuration in configurations:
+        V, param, bounds = configure(**{name: configuration[name] for name in names})
+        tasks.append((V, param, bounds, n, p, prefilter))
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    _init_sweep(problem, kind)
+    if workers == 1:
+        results = [_check_configuration(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_sweep, initargs=(problem, kind)) as executor:
+            results = list(executor.map(_check_configuration, *zip(*tasks)))
+    records = []
+    for configuration, (grid, seconds) in zip(configurations, results):
+        record = dict(configuration)
+        record.update({'inside_area': grid.area(INSIDE), 'border_area': grid.area(BORDER), 'seconds': seconds,
+                       'labels': grid})
+        records.append(record)
+    return records
@@ -0,0 +1,43 @@
+import importlib
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kernel_cache  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def kernel_cache_dir(tmp_path_factory):
+    """
+    Kernels are built once per test session into a temporary cache, so tests don't depend on the user's cache
+    """
+    path = os.environ.get('KRAV_TEST_KERNEL_CACHE') or str(tmp_path_factory.mktemp('kernels'))
+    old = kernel_cache.cache_dir, os.environ.get('KRAV_KERNEL_CACHE')
+    kernel_cache.set_cache_dir(path)
+    os.environ['KRAV_KERNEL_CACHE'] = path  # for worker processes
+    yield path
+    kernel_cache.set_cache_dir(old[0])
+    if old[1] is None:
+        del os.environ['KRAV_KERNEL_CACHE']
+    else:
+        os.environ['KRAV_KERNEL_CACHE'] = old[1]
+
+
+@pytest.fixture(scope='session')
+def rpr():
+    """
+    2rpr_interval module with loaded kernels
+    """
+    module = importlib.import_module('2rpr_interval')
+    module.load_kernels()
+    return module
+
+
+def meshgrid(bounds, n):
+    """
+    X, Y of uniform grid with n nodes along each side of bounds (xmin, xmax, ymin, ymax)
+    """
+    return np.meshgrid(np.linspace(bounds[0], bounds[1], n), np.linspace(bounds[2], bounds[3], n))
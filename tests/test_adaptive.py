@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+import interval as ival
+import workspace
+from box_class import OUTSIDE, INSIDE, BORDER
+from check_box import check_box_adaptive, check_box_grid, check_box_uni_adaptive, split_border_boxes
+from conftest import meshgrid
+
+BOUNDS = (-16, 16, -16, 16)
+L1, L2, D = 3, 15, 6
+
+
+@pytest.fixture(params=['classical', 'unified'])
+def boxes(request, rpr):
+    if request.param == 'classical':
+        return check_box_adaptive(BOUNDS, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10, max_depth=6)
+    return check_box_uni_adaptive(BOUNDS, [ival.Interval([L1, L2])] * 2, [D], workspace.load_checker('func_2rpr', 'newton'),
+                                  1, 10, max_depth=6)
+
+
+def test_leaves_tile_bounds(boxes):
+    area = (boxes.xright - boxes.xleft) * (boxes.yright - boxes.yleft)
+    assert np.all(area > 0)
+    assert np.isclose(area.sum(), (BOUNDS[1] - BOUNDS[0]) * (BOUNDS[3] - BOUNDS[2]), rtol=1e-12)
+    overlap_x = np.minimum(boxes.xright[:, None], boxes.xright) - np.maximum(boxes.xleft[:, None], boxes.xleft)
+    overlap_y = np.minimum(boxes.yright[:, None], boxes.yright) - np.maximum(boxes.yleft[:, None], boxes.yleft)
+    overlap = np.clip(overlap_x, 0, None) * np.clip(overlap_y, 0, None)
+    np.fill_diagonal(overlap, 0)
+    assert not np.any(overlap > 0)
+    assert set(np.unique(boxes.labels).tolist()) == {OUTSIDE, INSIDE, BORDER}
+    assert boxes.depth.max() == 6
+
+
+def test_labels_agree_with_fine_grid(rpr, boxes):
+    n = 257
+    grid = check_box_grid(*meshgrid(BOUNDS, n), n, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10)
+    x = 0.5 * (grid.x_nodes[:-1] + grid.x_nodes[1:])
+    y = 0.5 * (grid.y_nodes[:-1] + grid.y_nodes[1:])
+    fine = grid.labels.ravel()
+    x, y = (a.ravel() for a in np.meshgrid(x, y))
+    for xl, xr, yl, yr, label in zip(boxes.xleft, boxes.xright, boxes.yleft, boxes.yright, boxes.labels):
+        if label == BORDER:
+            continue
+        cells = fine[(xl <= x) & (x <= xr) & (yl <= y) & (y <= yr)]
+        assert not np.any(cells == (OUTSIDE if label == INSIDE else INSIDE))
+
+
+def test_min_width_and_max_depth():
+    def classify(u1, u2):
+        return np.full(u1.lo.size, BORDER, dtype=np.uint8)  # nothing is decided, every box is split
+    boxes = split_border_boxes((0, 1, 0, 1), classify, max_depth=3)
+    assert len(boxes) == 4 ** 3 and np.all(boxes.depth == 3)
+    boxes = split_border_boxes((0, 1, 0, 1), classify, min_width=0.2, max_depth=8)
+    assert np.all(boxes.depth == 2)  # boxes of width 0.25 aren't split into boxes narrower than 0.2
@@ -0,0 +1,10 @@
+import unified_interval
+import benchmark
+
+
+def test_unified_kernels_are_restored():
+    before = unified_interval.unified_krav_func, unified_interval.unified_newton_func
+    records = benchmark.bench_unified([5], 5, ['sin_cos'])
+    assert {record['checker'] for record in records} == {'unified_krav_eval', 'unified_krav_eval_batch',
+                                                         'unified_newton_eval', 'unified_newton_eval_batch'}
+    assert (unified_interval.unified_krav_func, unified_interval.unified_newton_func) == before
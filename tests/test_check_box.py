@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from box_class import INSIDE, BORDER
+from check_box import check_box, check_box_batch, check_box_grid, check_box_parallel, check_box_symmetric, \
+    iter_check_box, symmetric_meshgrid
+from conftest import meshgrid
+
+BOUNDS = (-16, 16, -16, 16)
+N = 41
+L1, L2, D = 3, 15, 6
+
+
+@pytest.fixture(scope='module')
+def grid():
+    return meshgrid(BOUNDS, N)
+
+
+@pytest.fixture(scope='module')
+def expected(rpr, grid):
+    return check_box_grid(*grid, N, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10)
+
+
+def points_array(points):
+    """
+    BoxPoints as array of shape (m, 4) with rows sorted
+    """
+    boxes = np.column_stack([points.get_points(arg) for arg in ('xleft', 'xright', 'yleft', 'yright')])
+    return boxes[np.lexsort(boxes.T[::-1])] if boxes.size else boxes.reshape(0, 4)
+
+
+def assert_same_points(result, expected):
+    for points, label in zip(result, (INSIDE, BORDER)):
+        np.testing.assert_array_equal(points_array(points), points_array(expected.to_box_points()[label - 1]))
+
+
+def test_grid_is_not_trivial(expected):
+    assert expected.count(INSIDE) and expected.count(BORDER)
+
+
+def test_scalar(rpr, grid, expected):
+    assert_same_points(check_box(*grid, N, L1, L2, D, rpr.classical_krav_eval, 1, 10), expected)
+
+
+def test_batch(rpr, grid, expected):
+    assert_same_points(check_box_batch(*grid, N, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10), expected)
+
+
+@pytest.mark.parametrize('workers, tile', [(1, 8), (2, None)])
+def test_parallel(rpr, grid, expected, workers, tile):
+    result = check_box_parallel(*grid, N, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10, workers=workers,
+                                tile=tile)
+    assert_same_points(result, expected)
+
+
+@pytest.mark.parametrize('rows', [1, 7, 64])
+def test_streaming(rpr, grid, expected, rows):
+    labels = np.full(expected.shape, 255, dtype=np.uint8)
+    for (first, last), band in iter_check_box(*grid, N, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10, rows=rows):
+        labels[first:last] = band
+    np.testing.assert_array_equal(labels, expected.labels)
+
+
+def test_warm_start(rpr, grid, expected):
+    result = check_box_grid(*grid, N, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10, warm_start=0.1)
+    changed = result.labels != expected.labels
+    # warm start may only prove cells inside, which are border from the full box
+    assert np.all((result.labels[changed] == INSIDE) & (expected.labels[changed] == BORDER))
+
+
+@pytest.mark.parametrize('n', [N, N + 1])
+def test_symmetric(rpr, n):
+    X, Y = symmetric_meshgrid(BOUNDS, n, [(0, D / 2), (1, 0.0)])
+    expected = check_box_grid(X, Y, n, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10)
+    result = check_box_symmetric(X, Y, n, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10)
+    np.testing.assert_array_equal(result.labels, expected.labels)
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+import sympy as sym
+from sympy.utilities.lambdify import implemented_function
+import interval_array as iarr
+import interval_codegen
+import kravchik_operator
+import unified_interval
+import workspace
+
+# problem -> (intervals of unknowns, const parameters, half of grid side)
+SETUPS = {
+    'func_2rpr': ([[3, 15], [3, 15]], [6.0], 15),
+    'func_robot': ([[3, 15], [0, np.pi / 2]], [], 15),
+    'func_sin_cos': ([[0, 2 * np.pi], [0, 2 * np.pi]], [], 2),
+    'func_dextar': ([[0, 2 * np.pi]] * 4, [7.2, 2.0, 3.0], 12.2),
+}
+
+
+def _function(interval_function, point_function):
+    return lambda x: interval_function(x) if isinstance(x, iarr.IntervalArray) else point_function(x)
+
+
+def lambdify_intervals(args, exprs):
+    """
+    The kernel of the same expressions lambdified over IntervalArrays, as get_unified_krav_eval does, mids and
+    parameters are arrays of points
+    """
+    mysin1 = implemented_function(sym.Function('mysin1'), _function(iarr.sin, np.sin))
+    mycos1 = implemented_function(sym.Function('mycos1'), _function(iarr.cos, np.cos))
+    return sym.lambdify(args, [e.replace(sym.sin, mysin1).replace(sym.cos, mycos1) for e in exprs])
+
+
+def random_boxes(rng, ranges, cells):
+    boxes = []
+    for lo, hi in ranges:
+        a, b = rng.uniform(lo, hi, (2, cells))
+        boxes.append(iarr.IntervalArray(np.minimum(a, b), np.maximum(a, b)))
+    return boxes
+
+
+def kernel_exprs(definition, kind):
+    f, U, V, Vmid, C = definition[:5]
+    if kind == 'newton':
+        v = sym.Matrix([[V[i]] for i in range(len(V))])
+        return list(f.subs(list(zip(V, C)))) + list(kravchik_operator.derive_matrix(f, v)) + list(f)
+    return list(kravchik_operator.unified_recurrence(f, V, C, krawczyk=kind == 'krawczyk_form'))
+
+
+@pytest.mark.parametrize('kind', ['recurrence', 'krawczyk_form', 'newton'])
+@pytest.mark.parametrize('problem', sorted(workspace.PROBLEMS))
+def test_codegen_matches_lambdify(problem, kind):
+    rng = np.random.default_rng(7)
+    V, param, L = SETUPS[problem]
+    definition = getattr(unified_interval, problem)()
+    f, U, Vs, Vmid, C = definition[:5]
+    param_sym = definition[5] if len(definition) > 5 else []
+    args = [U, Vs, Vmid, C, param_sym]
+    exprs = kernel_exprs(definition, kind)
+    source = interval_codegen.interval_kernel_source(exprs, [(U, True), (Vs, True), (Vmid, False), (C, False),
+                                                             (param_sym, False)])
+    generated = interval_codegen.compile_interval_kernel(source)
+    reference = lambdify_intervals(args, exprs)
+    u = random_boxes(rng, [[-L, L]] * 2, 200)
+    v = random_boxes(rng, V, 200)
+    mids = [x.mid() for x in v]
+    expected = reference(u, v, mids, mids, param)
+    result = generated(u, v, mids, mids, param)
+    assert len(result) == len(expected)
+    for (r,), e in zip(result, expected):
+        e = iarr.valueToIntervalArray(e)
+        np.testing.assert_allclose(r.lo, np.broadcast_to(e.lo, r.lo.shape), rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(r.hi, np.broadcast_to(e.hi, r.hi.shape), rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('build', [
+    lambda x, y, z: x ** -1,
+    lambda x, y, z: x ** -2,
+    lambda x, y, z: y / x,
+    lambda x, y, z: 2 * y / (x * z ** 2),
+    lambda x, y, z: -y / x,
+    lambda x, y, z: (x + y) ** -3,
+])
+def test_negative_powers_and_division(build):
+    """
+    A divisor with a zero bound gives [0.2, 0.2] as in IntervalArray.__truediv__
+    """
+    x, y, z = sym.symbols('x, y, z')
+    expr = build(x, y, z)
+    source = interval_codegen.interval_kernel_source([expr], [([x, y, z], True)])
+    generated = interval_codegen.compile_interval_kernel(source)
+    reference = sym.lambdify([[x, y, z]], expr)
+    lo = np.array([2.0, -1.0, 0.0, -3.0, -2.0, 1.0])
+    hi = np.array([4.0, 2.0, 1.0, -2.0, 0.0, 1.0])
+    box = [iarr.IntervalArray(lo, hi), iarr.IntervalArray(lo - 1, hi + 1), iarr.IntervalArray(hi, hi + 2)]
+    (result,), = generated(box)
+    expected = reference(box)
+    np.testing.assert_allclose(result.lo, expected.lo, rtol=1e-12)
+    np.testing.assert_allclose(result.hi, expected.hi, rtol=1e-12)
@@ -0,0 +1,62 @@
+import functools
+import numpy as np
+import pytest
+import interval as ival
+import unified_interval
+import workspace
+from check_box import check_box_grid, check_box_incremental, check_box_uni_grid, check_box_uni_incremental, \
+    rpr_prefilter
+from conftest import meshgrid
+
+BOUNDS = (-12, 32, -12, 12)
+N = 81
+
+
+def full_check(rpr, l1, l2, d, prefilter):
+    X, Y = meshgrid(BOUNDS, N)
+    return check_box_grid(X, Y, N, l1, l2, d, rpr.classical_krav_eval_batch, 1, 10,
+                          prefilter=_prefilter(l1, l2, d) if prefilter else None)
+
+
+def _prefilter(l1, l2, d):
+    return functools.partial(rpr_prefilter, l1=l1, l2=l2, d=d)
+
+
+@pytest.mark.parametrize('prefilter', [False, True])
+@pytest.mark.parametrize('old, new, monotone', [
+    ((3, 10, 20.4), (3, 10, 19.6), None),  # the old workspace is empty
+    ((3, 10, 25), (3, 10, 19.0), None),
+    ((3, 9.5, 20), (3, 10.5, 20), 'grow'),  # the workspace appears
+    ((3, 10, 18), (3, 10, 18.5), None),
+    ((3, 10, 10), (3, 10.2, 10), 'grow'),
+    ((3, 10, 10), (3.1, 9.8, 10.1), None),
+])
+def test_incremental_matches_full_check(rpr, old, new, monotone, prefilter):
+    previous = full_check(rpr, *old, prefilter)
+    expected = full_check(rpr, *new, prefilter)
+    shift = max(abs(a - b) for a, b in zip(old, new))
+    result = check_box_incremental(previous, *new, rpr.classical_krav_eval_batch, 1, 10, shift=shift,
+                                   monotone=monotone, prefilter=_prefilter(*new) if prefilter else None,
+                                   previous_params=old)
+    np.testing.assert_array_equal(result.labels, expected.labels)
+
+
+def test_incremental_from_empty_workspace_without_previous_params(rpr):
+    previous = full_check(rpr, 3, 10, 20.4, False)
+    expected = full_check(rpr, 3, 10, 19.6, False)
+    assert expected.count(1) + expected.count(2) > 0
+    result = check_box_incremental(previous, 3, 10, 19.6, rpr.classical_krav_eval_batch, 1, 10, shift=0.8)
+    np.testing.assert_array_equal(result.labels, expected.labels)
+
+
+def test_uni_incremental_with_shallow_corners():
+    checker = workspace.load_checker('func_2rpr')
+    X, Y = meshgrid(BOUNDS, N)
+    V = [ival.Interval([3, 10]), ival.Interval([3, 10])]
+    old, new = [19.0], [19.4]  # the corners move by about 0.7, more than the estimated shift 0.4
+    previous = check_box_uni_grid(X, Y, N, V, old, checker, 1)
+    expected = check_box_uni_grid(X, Y, N, V, new, checker, 1)
+    shift = unified_interval.border_shift_2rpr(V, old, V, new)
+    result = check_box_uni_incremental(previous, V, new, checker, 1, shift=shift,
+                                       candidates=unified_interval.border_cells_2rpr(V, old, V, new))
+    np.testing.assert_array_equal(result.labels, expected.labels)
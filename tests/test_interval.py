@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import interval_array as iarr
+import interval as ival
+
+
+def test_bounds_are_floats():
+    x = ival.Interval([np.float64(1.5), 2])
+    assert type(x.lo) is float and type(x.hi) is float
+    assert x.x == (1.5, 2.0)
+
+
+def test_pow():
+    assert (ival.Interval([-2.0, 3.0]) ** 2).x == (0, 9.0)
+    assert (ival.Interval([-3.0, -2.0]) ** 2).x == (4.0, 9.0)
+    assert (ival.Interval([-2.0, 3.0]) ** 3).x == (-8.0, 27.0)
+    assert (ival.Interval([-2.0, 3.0]) ** 0).x == (1, 1)
+
+
+def test_operators_with_numbers_and_intervals():
+    x = ival.Interval([-1.0, 2.0])
+    y = ival.Interval([3.0, 4.0])
+    assert (x + 1).x == (0.0, 3.0)
+    assert (1 - x).x == (-1.0, 2.0)
+    assert (x * -2).x == (-4.0, 2.0)
+    assert (x * y).x == (-4.0, 8.0)
+    assert (x * ival.Interval([2.0, 2.0])).x == (-2.0, 4.0)
+    assert (x / y).x == (-1.0 / 3.0, 2.0 / 3.0)
+    assert (x - y).x == (-5.0, -1.0)
+
+
+def test_intersec_in_place():
+    x = ival.Interval([0.0, 4.0])
+    x.intersec(ival.Interval([1.0, 5.0]))
+    assert x.x == (1.0, 4.0)
+    assert x.isIn(ival.Interval([0.0, 4.0]))
+    assert x.isNoIntersec(ival.Interval([4.5, 6.0]))
+
+
+def test_x_is_read_only():
+    x = ival.Interval([1.0, 2.0])
+    with pytest.raises(TypeError):
+        x.x[0] = 0.0
+    x[0] = 0.5
+    x.x = [0.0, 3.0]
+    assert x.x == (0.0, 3.0)
+
+
+@pytest.mark.parametrize('lo, hi', [(2.0, 4.0), (-4.0, -2.0), (0.0, 2.0), (-1.0, 1.0)])
+def test_number_divided_by_interval(lo, hi):
+    result = 3.0 / ival.Interval([lo, hi])
+    batch = 3.0 / iarr.IntervalArray(np.array([lo]), np.array([hi]))
+    assert result.x == (batch.lo[0], batch.hi[0])
@@ -0,0 +1,106 @@
+import operator
+import numpy as np
+import pytest
+import interval as ival
+import interval_array as iarr
+
+
+def random_intervals(seed, size=400, positive=False):
+    """
+    Random intervals, among them points, intervals containing zero and intervals with a zero bound
+    """
+    rng = np.random.default_rng(seed)
+    lo = rng.uniform(0.1 if positive else -5, 5, size)
+    hi = lo + rng.uniform(0, 5, size)
+    if not positive:
+        lo[::7] = -hi[::7] / 2  # zero inside
+        lo[1::11] = 0.0
+        hi[2::13] = 0.0
+        lo[2::13] = -rng.uniform(0, 5, lo[2::13].size)
+    hi[3::17] = lo[3::17]  # points
+    return iarr.IntervalArray(lo, hi)
+
+
+def assert_elementwise(result, expected):
+    """
+    :param result: IntervalArray
+    :param expected: list of interval.Interval
+    """
+    np.testing.assert_allclose(result.lo, [x[0] for x in expected], rtol=1e-12, atol=1e-300)
+    np.testing.assert_allclose(result.hi, [x[1] for x in expected], rtol=1e-12, atol=1e-300)
+
+
+@pytest.mark.parametrize('op', [operator.add, operator.sub, operator.mul, operator.truediv])
+def test_binary_operators(op):
+    x = random_intervals(0)
+    y = random_intervals(1)
+    assert_elementwise(op(x, y), [op(a, b) for a, b in zip(x.to_intervals(), y.to_intervals())])
+
+
+@pytest.mark.parametrize('op', [operator.add, operator.sub, operator.mul, operator.truediv])
+@pytest.mark.parametrize('number', [2.5, -3, 0])
+def test_operators_with_numbers(op, number):
+    x = random_intervals(2)
+    intervals = x.to_intervals()
+    assert_elementwise(op(x, number), [op(a, number) for a in intervals])
+    assert_elementwise(op(number, x), [op(number, a) for a in intervals])
+    assert_elementwise(op(np.float64(number), x), [op(float(number), a) for a in intervals])
+
+
+@pytest.mark.parametrize('exponent', [0, 1, 2, 3, 4, -1, -2, -3])
+def test_pow(exponent):
+    x = random_intervals(3)
+    assert_elementwise(x ** exponent, [a ** exponent for a in x.to_intervals()])
+
+
+def test_neg():
+    x = random_intervals(4)
+    assert_elementwise(-x, [-a for a in x.to_intervals()])
+
+
+@pytest.mark.parametrize('name', ['sin', 'cos', 'exp'])
+def test_functions(name):
+    x = random_intervals(5)
+    assert_elementwise(getattr(iarr, name)(x), [getattr(ival, name)(a) for a in x.to_intervals()])
+
+
+@pytest.mark.parametrize('base', [2, np.e, 0.5])
+def test_log(base):
+    x = random_intervals(6, positive=True)
+    assert_elementwise(iarr.log(x, base), [ival.log(a, base) for a in x.to_intervals()])
+
+
+def test_division_by_interval_with_zero_bound():
+    x = iarr.IntervalArray([1.0, 1.0, 1.0, -2.0], [2.0, 2.0, 2.0, 3.0])
+    y = iarr.IntervalArray([0.0, -1.0, 2.0, -1.0], [1.0, 0.0, 4.0, 2.0])
+    q = x / y
+    np.testing.assert_array_equal(q.lo, [0.2, 0.2, 0.25, -3.0])
+    np.testing.assert_array_equal(q.hi, [0.2, 0.2, 1.0, 2.0])
+
+
+def test_getitem_and_setitem():
+    x = iarr.IntervalArray([1.0, 2.0, 3.0], [4.0, 5.0, 6.0])
+    assert x[0] is x.lo and x[1] is x.hi
+    assert x[np.int64(1)] is x.hi
+    part = x[np.array([True, False, True])]
+    assert isinstance(part, iarr.IntervalArray)
+    np.testing.assert_array_equal(part.lo, [1.0, 3.0])
+    part = x[1:]
+    np.testing.assert_array_equal(part.hi, [5.0, 6.0])
+    x[0] = 0.0
+    np.testing.assert_array_equal(x.lo, [0.0, 0.0, 0.0])
+    x[np.array([False, True, False])] = ival.Interval([-1.0, 1.0])
+    np.testing.assert_array_equal(x.lo, [0.0, -1.0, 0.0])
+    np.testing.assert_array_equal(x.hi, [4.0, 1.0, 6.0])
+
+
+def test_intersec_and_predicates():
+    x = iarr.IntervalArray([0.0, 0.0, 5.0], [4.0, 4.0, 6.0])
+    y = ival.Interval([1.0, 5.0])
+    np.testing.assert_array_equal(x.isIn(iarr.IntervalArray(-1.0, 7.0)), [True, True, True])
+    np.testing.assert_array_equal(x.isNoIntersec(iarr.IntervalArray(4.5, 4.8)), [True, True, True])
+    x.intersec(y, mask=np.array([True, False, True]))
+    np.testing.assert_array_equal(x.lo, [1.0, 0.0, 5.0])
+    np.testing.assert_array_equal(x.hi, [4.0, 4.0, 5.0])
+    with pytest.raises(ValueError):
+        x.intersec(ival.Interval([10.0, 11.0]))
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from box_class import LabelGrid, LabelGridSink, INSIDE, BORDER, UNKNOWN
+from check_box import check_box_grid, iter_check_box
+from conftest import meshgrid
+
+BOUNDS = (-16, 16, -16, 16)
+N = 33
+
+
+@pytest.fixture(scope='module')
+def grid(rpr):
+    return check_box_grid(*meshgrid(BOUNDS, N), N, 3, 15, 6, rpr.classical_krav_eval_batch, 1, 10)
+
+
+def assert_same_grid(result, expected):
+    np.testing.assert_array_equal(result.x_nodes, expected.x_nodes)
+    np.testing.assert_array_equal(result.y_nodes, expected.y_nodes)
+    np.testing.assert_array_equal(result.labels, expected.labels)
+    assert result.labels.dtype == np.uint8
+
+
+def test_save_and_load_npz(grid, tmp_path):
+    path = str(tmp_path / 'grid.npz')
+    grid.save(path)
+    loaded = LabelGrid.load(path)
+    assert_same_grid(loaded, grid)
+    assert loaded.area(INSIDE) == grid.area(INSIDE)
+
+
+@pytest.mark.parametrize('mmap_mode', [None, 'r'])
+def test_save_and_load_directory(grid, tmp_path, mmap_mode):
+    path = str(tmp_path / 'grid')
+    grid.save(path)
+    loaded = LabelGrid.load(path, mmap_mode=mmap_mode)
+    assert_same_grid(loaded, grid)
+    assert isinstance(loaded.labels, np.memmap) == (mmap_mode is not None)
+    assert loaded.count(BORDER) == grid.count(BORDER)
+
+
+def test_sink_writes_the_same_grid(rpr, grid, tmp_path):
+    X, Y = meshgrid(BOUNDS, N)
+    with LabelGridSink(str(tmp_path / 'sink'), X[0], Y[:, 0]) as sink:
+        np.testing.assert_array_equal(sink.labels, np.full(grid.shape, UNKNOWN))
+        result = sink.consume(iter_check_box(X, Y, N, 3, 15, 6, rpr.classical_krav_eval_batch, 1, 10, rows=5))
+    assert_same_grid(result, grid)
+    assert isinstance(result.labels, np.memmap)
+    assert_same_grid(LabelGrid.load(str(tmp_path / 'sink')), grid)
+
+
+def test_sink_keeps_unwritten_rows_unknown(grid, tmp_path):
+    with LabelGridSink(str(tmp_path / 'sink'), grid.x_nodes, grid.y_nodes) as sink:
+        sink.write((0, 4), grid.labels[:4])
+    result = LabelGrid.load(str(tmp_path / 'sink'))
+    np.testing.assert_array_equal(result.labels[:4], grid.labels[:4])
+    assert np.all(result.labels[4:] == UNKNOWN)
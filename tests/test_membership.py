@@ -0,0 +1,112 @@
+import functools
+import numpy as np
+import pytest
+from box_class import LabelGrid, INSIDE, BORDER, UNKNOWN
+from check_box import check_box_adaptive, check_box_grid, classify_classical
+from conftest import meshgrid
+from membership import GridIndex, QuadtreeIndex, build_index
+
+BOUNDS = (-16, 16, -16, 16)
+N = 41
+L1, L2, D = 3, 15, 6
+
+
+@pytest.fixture(scope='module')
+def grid(rpr):
+    return check_box_grid(*meshgrid(BOUNDS, N), N, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10)
+
+
+@pytest.fixture(scope='module')
+def uneven_grid(grid):
+    x_nodes = np.concatenate([grid.x_nodes[:10], grid.x_nodes[10:] + np.linspace(0, 0.3, N - 10)])
+    return LabelGrid(x_nodes, grid.y_nodes, grid.labels)
+
+
+@pytest.fixture(scope='module')
+def boxes(rpr):
+    return check_box_adaptive(BOUNDS, L1, L2, D, rpr.classical_krav_eval_batch, 1, 10, max_depth=7)
+
+
+@pytest.fixture(scope='module')
+def classify(rpr):
+    return functools.partial(classify_classical, checker=rpr.classical_krav_eval_batch, l1=L1, l2=L2, d=D, coef=1,
+                             p=10)
+
+
+def all_boxes(result):
+    if isinstance(result, LabelGrid):
+        parts = [result.boxes(label) + (np.full(result.count(label), label),) for label in range(3)]
+        return [np.concatenate([part[i] for part in parts]) for i in range(5)]
+    return [result.xleft, result.xright, result.yleft, result.yright, result.labels]
+
+
+def scan(result, x, y):
+    """
+    Labels of all closed boxes containing every point, found by linear scan: list of sets
+    """
+    xl, xr, yl, yr, labels = all_boxes(result)
+    found = []
+    for start in range(0, x.size, 1000):
+        px, py = x[start:start + 1000, None], y[start:start + 1000, None]
+        inside = (xl <= px) & (px <= xr) & (yl <= py) & (py <= yr)
+        found.extend(set(labels[row].tolist()) or {UNKNOWN} for row in inside)
+    return found
+
+
+def assert_matches_scan(index, result, x, y):
+    labels = index.query((x, y))
+    expected = scan(result, x, y)
+    mismatches = [k for k in range(x.size) if labels[k] not in expected[k]]
+    assert not mismatches, (x[mismatches[:5]], y[mismatches[:5]], labels[mismatches[:5]])
+    return labels
+
+
+@pytest.fixture(params=['grid', 'uneven_grid', 'boxes'])
+def result(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_build_index(grid, boxes):
+    assert isinstance(build_index(grid), GridIndex)
+    assert isinstance(build_index(boxes), QuadtreeIndex)
+    with pytest.raises(TypeError):
+        build_index(np.zeros((2, 2)))
+
+
+def test_random_points_match_linear_scan(result):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-18, 18, (20000, 2))
+    labels = assert_matches_scan(build_index(result), result, points[:, 0], points[:, 1])
+    assert {INSIDE, BORDER, UNKNOWN} <= set(labels.tolist())
+    assert build_index(result).query(points.reshape(100, 200, 2)).shape == (100, 200)
+
+
+def test_points_on_nodes_and_boundary(result):
+    xl, xr, yl, yr, _ = all_boxes(result)
+    x = np.concatenate([xl, xr, xl, xr, np.full(5, xr.max()), np.linspace(xl.min(), xr.max(), 5)])
+    y = np.concatenate([yl, yl, yr, yr, np.linspace(yl.min(), yr.max(), 5), np.full(5, yr.max())])
+    labels = assert_matches_scan(build_index(result), result, x, y)
+    assert UNKNOWN not in labels
+
+
+def test_points_outside_and_nan(result):
+    xl, xr, yl, yr, _ = all_boxes(result)
+    left, right, bottom, top = xl.min() - 1e-3, xr.max() + 1e-3, yl.min() - 1e-3, yr.max() + 1e-3
+    x = np.array([left, right, 0.0, 0.0, np.nan, 0.0, np.inf, np.nan])
+    y = np.array([0.0, 0.0, bottom, top, 0.0, np.nan, 0.0, np.nan])
+    np.testing.assert_array_equal(build_index(result).query((x, y)), np.full(x.size, UNKNOWN))
+
+
+def test_refine(result, classify):
+    rng = np.random.default_rng(1)
+    points = rng.uniform(-16, 16, (2000, 2))
+    index = build_index(result)
+    labels = index.query(points)
+    refined = index.query(points, refine=classify)
+    border = labels == BORDER
+    np.testing.assert_array_equal(refined[~border], labels[~border])
+    assert np.all(refined[border] != UNKNOWN)
+    assert np.count_nonzero(refined == BORDER) < np.count_nonzero(border)
+    calls = []
+    index.query(points[~border], refine=lambda u1, u2: calls.append(u1) or np.zeros(u1.lo.size, dtype=np.uint8))
+    assert not calls
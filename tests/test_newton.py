@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import interval as ival
+import unified_interval
+import workspace
+from box_class import OUTSIDE, INSIDE
+from check_box import check_box_uni, check_box_uni_grid
+from conftest import meshgrid
+
+# problem -> (intervals of unknowns, const parameters, half of grid side)
+SETUPS = {
+    'func_2rpr': ([[3, 15], [3, 15]], [6], 15),
+    'func_robot': ([[3, 15], [0, np.pi / 2]], [], 15),
+    'func_dextar': ([[0, 2 * np.pi]] * 4, [7.2, 2.0, 3.0], 12.2),
+}
+
+
+def check_grid(problem, kind, n):
+    V, param, L = SETUPS[problem]
+    X, Y = meshgrid((-L, L, -L, L), n)
+    return check_box_uni_grid(X, Y, n, [ival.Interval(v) for v in V], param, workspace.load_checker(problem, kind),
+                              1, 10)
+
+
+@pytest.mark.parametrize('problem', sorted(SETUPS))
+def test_newton_never_contradicts_krawczyk(problem):
+    krawczyk = check_grid(problem, 'krawczyk', 41).labels
+    newton = check_grid(problem, 'newton', 41).labels
+    assert not np.any((krawczyk == INSIDE) & (newton == OUTSIDE))
+    assert not np.any((krawczyk == OUTSIDE) & (newton == INSIDE))
+
+
+def test_newton_proves_2rpr_cells_inside():
+    assert check_grid('func_2rpr', 'newton', 41).count(INSIDE) > 0
+
+
+@pytest.mark.parametrize('problem', ['func_2rpr', 'func_robot'])
+def test_scalar_newton_matches_batch(problem, monkeypatch):
+    V, param, L = SETUPS[problem]
+    checker = workspace.load_checker(problem, 'newton')
+    monkeypatch.setattr(unified_interval, 'unified_newton_func', checker.keywords['kernel'])
+    n = 15
+    X, Y = meshgrid((-L, L, -L, L), n)
+    V = [ival.Interval(v) for v in V]
+    area_points, border_points = check_box_uni(X, Y, n, V, param, unified_interval.unified_newton_eval, 1, 10)
+    expected = check_grid(problem, 'newton', n).to_box_points()
+    for points, reference in zip((area_points, border_points), expected):
+        for arg in ('xleft', 'xright', 'yleft', 'yright'):
+            np.testing.assert_array_equal(points.get_points(arg), reference.get_points(arg))
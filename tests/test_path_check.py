@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from box_class import OUTSIDE, INSIDE, BORDER
+from path_check import PathChecker, path_checker
+
+BOUNDS = (-16, 16, -16, 16)
+
+
+def band(u1, u2):
+    """
+    Cells left of x = 0 are inside, right of x = 1 outside, and the band between them is never decided
+    """
+    labels = np.full(u1.lo.size, BORDER, dtype=np.uint8)
+    labels[u1.hi <= 0] = INSIDE
+    labels[u1.lo >= 1] = OUTSIDE
+    return labels
+
+
+def test_outside_piece_is_reported_after_undecided_one():
+    result = PathChecker(band, BOUNDS, max_depth=8).check(np.array([[-5.0, 0.0], [5.0, 0.0]]))
+    assert result.feasible is False
+    assert result.label == OUTSIDE
+    assert -5 + 10 * result.failure[0] >= 1
+
+
+def test_undecided_path():
+    result = PathChecker(band, BOUNDS, max_depth=8).check(np.array([[-5.0, 0.0], [0.5, 0.0]]))
+    assert result.feasible is None
+    assert result.label == BORDER
+
+
+def test_remembered_cells_are_bounded(rpr):
+    path = np.array([[-10.0, 2.0], [0.0, 8.0], [7.0, 9.0], [12.0, -3.0], [20.0, 0.0]])
+    unbounded = path_checker(BOUNDS, 3, 15, 6, rpr.classical_krav_eval_batch, 1.0)
+    bounded = path_checker(BOUNDS, 3, 15, 6, rpr.classical_krav_eval_batch, 1.0, max_cells=16)
+    for vertices in (path, path[:3], path[1:4]):
+        expected = unbounded.check(vertices)
+        result = bounded.check(vertices)
+        assert (result.feasible, result.failure, result.label) == (expected.feasible, expected.failure,
+                                                                   expected.label)
+        assert len(bounded.cells) <= 16
+    assert len(unbounded.cells) > 16
+
+
+def test_single_vertex_is_checked(rpr):
+    checker = path_checker(BOUNDS, 3, 15, 6, rpr.classical_krav_eval_batch, 1.0)
+    result = checker.check([[100.0, 100.0]])
+    assert result.feasible is False
+    assert (result.failure, result.label, result.segment) == ((0.0, 0.0), OUTSIDE, 0)
+    assert checker.check([[3.0, 8.0]]).feasible is True
+    assert PathChecker(band, BOUNDS).check([[0.5, 0.0]]).feasible is None
+
+
+def test_empty_polyline_is_rejected():
+    with pytest.raises(ValueError):
+        PathChecker(band, BOUNDS).check(np.empty((0, 2)))
+    with pytest.raises(ValueError):
+        PathChecker(band, BOUNDS).check([])
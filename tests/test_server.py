@@ -0,0 +1,94 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+import numpy as np
+import pytest
+import batch
+import server
+
+JOB = {'problem': 'func_2rpr', 'V': [[3, 15], [3, 15]], 'param': [8], 'bounds': [-15, 15, -15, 15], 'n': 21}
+
+
+@pytest.fixture(scope='module')
+def unix_socket(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('server') / 'ws.sock')
+    service = server.WorkspaceServer(workers=1, preload=[('func_2rpr', 'krawczyk')])
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(service.serve(unix=path))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+    thread = threading.Thread(target=run)
+    thread.start()
+    for _ in range(100):
+        if os.path.exists(path):
+            break
+        time.sleep(0.05)
+    yield path
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join()
+    loop.close()
+    service.close()
+
+
+def raw_request(path, data):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(data)
+        response = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return response
+            response += chunk
+
+
+def test_check_job(unix_socket):
+    status, body = server.request(dict(JOB, format='grid'), unix=unix_socket)
+    assert status == 200
+    grid, stats = batch.run_job(dict(batch.JOB_DEFAULTS, name='local', **JOB))
+    np.testing.assert_array_equal(np.array(body['labels']), grid.labels)
+    assert body['stats']['counts'] == stats['counts']
+    status, body = server.request(dict(JOB, format='boxes'), unix=unix_socket)
+    assert status == 200
+    assert len(body['boxes']['border'][0]) == stats['counts']['border']
+    assert server.request(None, unix=unix_socket)[1]['cached'] == 1
+
+
+@pytest.mark.parametrize('job', [
+    dict(JOB, problem='__class__'),
+    dict(JOB, problem='../../etc/passwd'),
+    dict(JOB, kind='krawczyk/../x'),
+    dict(JOB, n=100000),
+    dict(JOB, n='21'),
+    {'problem': 'func_2rpr'},
+    [1, 2],
+    dict(JOB, V=[[3, 15]]),
+    dict(JOB, V=[[3, 15], [15, 3]]),
+    dict(JOB, V=[[3, 15], 3]),
+    dict(JOB, param=[]),
+    dict(JOB, param=['8']),
+    dict(JOB, bounds=[1, 2]),
+    dict(JOB, bounds=[15, -15, -15, 15]),
+    dict(JOB, bounds=[-15, 15, -15, float('inf')]),
+    dict(JOB, warm_start=-1),
+    dict(JOB, warm_start=0.1, prefilter=True),
+    dict(JOB, problem='func_robot', V=[[3, 15], [0, 1.5]], param=[], prefilter=True),
+    dict(JOB, prefilter='yes'),
+])
+def test_bad_job(unix_socket, job):
+    status, body = server.request(job, unix=unix_socket)
+    assert status == 400
+    assert 'error' in body
+
+
+def test_malformed_request(unix_socket):
+    response = raw_request(unix_socket, b'POST /check HTTP/1.1\r\nContent-Length: abc\r\n\r\n{}')
+    assert response.startswith(b'HTTP/1.1 400 ')
+    response = raw_request(unix_socket, b'POST /check HTTP/1.1\r\nContent-Length: 10\r\n\r\n{not json}')
+    assert response.startswith(b'HTTP/1.1 400 ')
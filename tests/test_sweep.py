@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+import interval as ival
+import unified_interval
+import workspace
+from box_class import INSIDE, BORDER
+from check_box import check_box_uni_grid
+from conftest import meshgrid
+from sweep import parameter_grid, rpr_configuration, sweep
+
+
+def test_parameter_grid():
+    grid = parameter_grid(d=[4, 6], l1=[3], l2=[12, 15])
+    assert grid == [{'d': 4, 'l1': 3, 'l2': 12}, {'d': 4, 'l1': 3, 'l2': 15}, {'d': 6, 'l1': 3, 'l2': 12},
+                    {'d': 6, 'l1': 3, 'l2': 15}]
+
+
+@pytest.mark.parametrize('workers, prefilter', [(1, None), (1, unified_interval.prefilter_2rpr), (2, None)])
+def test_sweep_matches_direct_check(workers, prefilter):
+    configurations = [{'d': 6, 'l1': 3, 'l2': 15}, {'d': 4, 'l1': 2, 'l2': 9}]
+    n = 11
+    records = sweep('func_2rpr', configurations, n=n, kind='newton', workers=workers, prefilter=prefilter)
+    assert [{name: record[name] for name in ('d', 'l1', 'l2')} for record in records] == configurations
+    checker = workspace.load_checker('func_2rpr', 'newton')
+    for configuration, record in zip(configurations, records):
+        V, param, bounds = rpr_configuration(**configuration)
+        V = [ival.Interval(v) for v in V]
+        expected = check_box_uni_grid(*meshgrid(bounds, n), n, V, param, checker, 1, 10,
+                                      prefilter=None if prefilter is None else prefilter(V, param))
+        np.testing.assert_array_equal(record['labels'].labels, expected.labels)
+        np.testing.assert_array_equal(record['labels'].x_nodes, expected.x_nodes)
+        assert record['inside_area'] == expected.area(INSIDE)
+        assert record['border_area'] == expected.area(BORDER)
+    assert records[0]['inside_area'] > 0
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import interval_array as iarr
+import kernel_cache
+import workspace
+
+
+def cells():
+    x = np.linspace(-14, 14, 8)
+    return [iarr.IntervalArray(x[:-1], x[1:]), iarr.IntervalArray(np.full(7, 4.0), np.full(7, 5.0))]
+
+
+def test_checkers_keep_their_own_kernels():
+    rpr = workspace.load_checker('func_2rpr')
+    before = rpr(cells(), [[3, 15], [3, 15]], [6], 10)
+    robot = workspace.load_checker('func_robot')
+    robot(cells(), [[3, 15], [0, np.pi / 2]], [], 10)
+    np.testing.assert_array_equal(rpr(cells(), [[3, 15], [3, 15]], [6], 10), before)
+
+
+def test_alias_is_ignored_after_changes(monkeypatch):
+    kernel_cache.store_alias('test.alias', 'key', 'def func(): pass')
+    assert kernel_cache.load_alias('test.alias', 'def func(): pass') == 'key'
+    assert kernel_cache.load_alias('test.alias', 'def func(): return 1') is None
+    monkeypatch.setattr(kernel_cache, 'KERNEL_CACHE_VERSION', kernel_cache.KERNEL_CACHE_VERSION + 1)
+    assert kernel_cache.load_alias('test.alias', 'def func(): pass') is None
+
+
+def test_stale_alias_is_rebuilt(monkeypatch):
+    expected = workspace.load_checker('func_2rpr')(cells(), [[3, 15], [3, 15]], [6], 10)
+    kernel_cache.store_alias('func_2rpr.krawczyk', 'stale', 'old definition')
+    monkeypatch.setattr(workspace, '_kernels', {})
+    checker = workspace.load_checker('func_2rpr')
+    np.testing.assert_array_equal(checker(cells(), [[3, 15], [3, 15]], [6], 10), expected)
+    assert kernel_cache.load_alias('func_2rpr.krawczyk', 'old definition') is None
+
+
+def test_warm_start_without_sympy(rpr, kernel_cache_dir):
+    workspace.load_checker('func_2rpr')  # kernels and their aliases are in the cache now
+    code = ("import importlib, sys\n"
+            "module = importlib.import_module('2rpr_interval')\n"
+            "module.load_kernels()\n"
+            "import workspace\n"
+            "workspace.load_checker('func_2rpr')\n"
+            "assert module.krav_transform and module.rec_func and module.bicentered_transform\n"
+            "assert 'sympy' not in sys.modules\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True,
+                   env=dict(os.environ, KRAV_KERNEL_CACHE=kernel_cache_dir))
@@ -1,10 +1,14 @@
-import sympy as sym
+import functools
 import interval as ival
-from plot_workspace_area import uni_plotter
-from box_class import BoxPoints
-from kravchik_operator import get_unified_krav_eval
+import interval_array as iarr
+import instrumentation
+from box_class import BoxPoints, LABEL_NAMES, UNKNOWN
 import numpy as np
-from check_box import check_box_uni
+from check_box import check_box_uni, check_box_uni_batch, lockstep_krav, annuli_prefilter
+
+
+unified_krav_func = None  # Krawczyk function of the checked problem, e.g. from get_unified_krav_codegen
+unified_newton_func = None  # Values and Jacobian of the checked problem, from get_unified_newton_codegen
 
 
 def unified_krav_eval(U, Vin, param, p=10):
@@ -19,7 +23,8 @@ def unified_krav_eval(U, Vin, param, p=10):
         C = []
         for i in range(len(V)):
             C.append(V[i].mid())
-        v_krav = unified_krav_func(U, V, Vmid, C, param)  # Calculate Kravchik evaluation for u1, u2
+        with instrumentation.timer('kernel_eval'):
+            v_krav = unified_krav_func(U, V, Vmid, C, param)  # Calculate Kravchik evaluation for u1, u2
         #print('old V', V)
         #print('new V', v_krav)
         check = True
@@ -27,17 +32,172 @@ def unified_krav_eval(U, Vin, param, p=10):
             if not(v_krav[i][0].isIn(V[i])):
                 check = False
         if check:
-            return 'inside'  # if it is inside previous interval, then it's inside the workspace area
+            return instrumentation.exit_cell('inside', U, k + 1, V)  # if it is inside previous interval, then it's inside the workspace area
         if k == p - 1:
-            return 'border'  # if we achieve max of the iterations, then it's border
+            return instrumentation.exit_cell('border', U, k + 1, V)  # if we achieve max of the iterations, then it's border
         for i in range(len(V)):
             if V[i].isNoIntersec(v_krav[i][0]):
-                return 'outside'
+                return instrumentation.exit_cell('outside', U, k + 1, V)
             else:
                 V[i].intersec(v_krav[i][0])  # if our evalution not fully inside, then intersect it and repeat
 
 
+def unified_krav_eval_batch(U, Vin, param, p=10, V0=None, boxes=False, kernel=None):
+    """
+    Batched unified_krav_eval: check all cells U together
+    :param U: list of IntervalArrays of the coordinates of cells
+    :param Vin: list of intervals of unknowns
+    :param param: list of const parameters
+    :param p: the max number of iterations
+    :param V0: None or list of IntervalArrays of start boxes (warm start), they are cut to Vin
+    :param boxes: return also the final boxes of inside cells (see lockstep_krav)
+    :param kernel: Krawczyk function of the problem, unified_krav_func by default
+    :return: array of labels (see box_class)
+    """
+    if kernel is None:
+        kernel = unified_krav_func
+    V = [iarr.IntervalArray.full(U[0].size, Vin[i]) for i in range(len(Vin))]
+    if V0 is not None:
+        for i in range(len(V)):
+            V[i].intersec(V0[i])
+    Vmid = [ival.Interval([Vin[i][0], Vin[i][1]]).mid() for i in range(len(Vin))]
+
+    def transform(active, V):
+        C = [V[i].mid() for i in range(len(V))]
+        v_krav = kernel([u[active] for u in U], V, Vmid, C, param)
+        return [v_krav[i][0] for i in range(len(V))]
+    return lockstep_krav(transform, V, p, boxes, U)
+
+
+def _point_dot(y, X):
+    """
+    Sum of y[k] * X[k] for arrays of numbers y and IntervalArrays X
+    """
+    lo = 0.0
+    hi = 0.0
+    for yk, x in zip(y, X):
+        a = yk * x.lo
+        b = yk * x.hi
+        lo = lo + np.minimum(a, b)
+        hi = hi + np.maximum(a, b)
+    return iarr.IntervalArray._wrap(lo, hi)
+
+
+def _newton_quotient(c, s, a, v):
+    """
+    Solution c - s / a of the preconditioned equation a * (x - c) = -s. If a contains 0, the solution is the union
+    of two half-lines (extended division), every part of it, which misses v, is dropped, and the kept parts are
+    returned unbounded, so the result is never taken for a proof of existence. Cells without solution in v get
+    the empty interval [inf, inf]
+    """
+    zero = (a.lo <= 0) & (a.hi >= 0)
+    q = s / iarr.IntervalArray._wrap(np.where(zero, 1.0, a.lo), np.where(zero, 1.0, a.hi))
+    lo = c - q.hi
+    hi = c - q.lo
+    s_pos = s.lo > 0
+    s_neg = s.hi < 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = np.where(s_pos, s.lo / a.lo, s.hi / a.hi)  # s / a = (-inf, p] U [q, inf)
+        q = np.where(s_pos, s.lo / a.hi, s.hi / a.lo)
+    upper = np.where(s_pos, a.lo < 0, a.hi > 0) & (c - p <= v.hi)  # [c - p, inf) meets v
+    lower = np.where(s_pos, a.hi > 0, a.lo < 0) & (c - q >= v.lo)  # (-inf, c - q] meets v
+    split = zero & (s_pos | s_neg)
+    lo = np.where(split, np.where(lower, -np.inf, np.where(upper, c - p, np.inf)), np.where(zero, -np.inf, lo))
+    hi = np.where(split, np.where(upper, np.inf, np.where(lower, c - q, np.inf)), np.where(zero, np.inf, hi))
+    return iarr.IntervalArray._wrap(lo, hi)
+
+
+def hansen_sengupta(U, V, Vmid, param, kernel=None):
+    """
+    Hansen-Sengupta operator: interval Newton step preconditioned by the inverse of the mid of Jacobian, solved by
+    one Gauss-Seidel sweep, so every next unknown uses the already contracted ones. If the result is inside V,
+    then V contains a solution of f(u, v) = 0 for every u of the cell, like for Krawczyk operator. Unknowns, whose
+    preconditioned diagonal element contains 0, are contracted by extended division (see _newton_quotient). Cells,
+    where f on the whole V doesn't contain 0, have no solution and get empty boxes [inf, inf]
+    :param U: list of IntervalArrays of the coordinates of cells
+    :param V: list of IntervalArrays of boxes of unknowns
+    :param Vmid: mids of the full box of unknowns
+    :param param: list of const parameters
+    :param kernel: values and Jacobian of the problem, unified_newton_func by default
+    :return: list of IntervalArrays of new boxes
+    """
+    dim = len(V)
+    size = V[0].size
+    C = [v.mid() for v in V]
+    values = (unified_newton_func if kernel is None else kernel)(U, V, Vmid, C, param)
+    values = [iarr.IntervalArray._wrap(np.broadcast_to(x[0][0], (size,)), np.broadcast_to(x[0][1], (size,)))
+              for x in values]
+    F = values[:dim]
+    J = [values[dim + i * dim:dim + (i + 1) * dim] for i in range(dim)]
+    excluded = np.logical_or.reduce([(f.lo > 0) | (f.hi < 0) for f in values[dim + dim * dim:]])
+    mid = np.empty((size, dim, dim))
+    for i in range(dim):
+        for j in range(dim):
+            mid[:, i, j] = J[i][j].mid()
+    singular = ~(np.abs(np.linalg.det(mid)) > 1e-12)  # also NaN, any preconditioner is valid, identity is used
+    mid[singular] = np.eye(dim)
+    Y = np.linalg.inv(mid)
+    new = list(V)
+    result = []
+    for i in range(dim):
+        y = [Y[:, i, k] for k in range(dim)]
+        s = _point_dot(y, F)
+        for j in range(dim):
+            if j != i:
+                s = s + _point_dot(y, [J[k][j] for k in range(dim)]) * (new[j] - C[j])
+        a = _point_dot(y, [J[k][i] for k in range(dim)])
+        n_i = _newton_quotient(C[i], s, a, V[i])
+        result.append(n_i)
+        lo = np.maximum(n_i.lo, V[i].lo)
+        hi = np.minimum(n_i.hi, V[i].hi)
+        empty = lo > hi  # the cell is outside, its other unknowns don't matter
+        new[i] = iarr.IntervalArray._wrap(np.where(empty, V[i].lo, lo), np.where(empty, V[i].hi, hi))
+    if np.any(excluded):
+        for n_i in result:
+            n_i.lo[excluded] = np.inf
+            n_i.hi[excluded] = np.inf
+    return result
+
+
+def unified_newton_eval_batch(U, Vin, param, p=10, V0=None, boxes=False, kernel=None):
+    """
+    The same as unified_krav_eval_batch, but boxes are contracted by Hansen-Sengupta operator (see hansen_sengupta)
+    with the kernel unified_newton_func
+    :param U: list of IntervalArrays of the coordinates of cells
+    :param Vin: list of intervals of unknowns
+    :param param: list of const parameters
+    :param p: the max number of iterations
+    :param V0: None or list of IntervalArrays of start boxes (warm start), they are cut to Vin
+    :param boxes: return also the final boxes of inside cells (see lockstep_krav)
+    :param kernel: values and Jacobian of the problem, unified_newton_func by default
+    :return: array of labels (see box_class)
+    """
+    V = [iarr.IntervalArray.full(U[0].size, Vin[i]) for i in range(len(Vin))]
+    if V0 is not None:
+        for i in range(len(V)):
+            V[i].intersec(V0[i])
+    Vmid = [ival.Interval([Vin[i][0], Vin[i][1]]).mid() for i in range(len(Vin))]
+
+    def transform(active, V):
+        return hansen_sengupta([u[active] for u in U], V, Vmid, param, kernel)
+    return lockstep_krav(transform, V, p, boxes, U)
+
+
+def unified_newton_eval(U, Vin, param, p=10):
+    """
+    Cell-by-cell version of unified_newton_eval_batch with the signature of unified_krav_eval
+    :param U: list of intervals of the coordinates of cell
+    :param Vin: list of intervals of unknowns
+    :param param: list of const parameters
+    :param p: the max number of iterations
+    :return: the string 'inside', 'outside' or 'border'
+    """
+    U = [iarr.IntervalArray([u[0]], [u[1]]) for u in U]
+    return LABEL_NAMES[unified_newton_eval_batch(U, Vin, param, p)[0]]
+
+
 def func_robot():
+    import sympy as sym
     Vmid = sym.symbols('v1mid, v2mid')
     V = sym.symbols('v1, v2')
     U = sym.symbols('u1, u2')
@@ -48,6 +208,7 @@ def func_robot():
 
 
 def func_sin_cos():
+    import sympy as sym
     Vmid = sym.symbols('v1mid, v2mid')
     V = sym.symbols('v1, v2')
     U = sym.symbols('u1, u2')
@@ -57,6 +218,7 @@ def func_sin_cos():
     return f, U, V, Vmid, C
 
 def func_2rpr():
+    import sympy as sym
     Vmid = sym.symbols('v1mid, v2mid')
     V = sym.symbols('v1, v2')
     U = sym.symbols('u1, u2')
@@ -68,7 +230,88 @@ def func_2rpr():
     return f, U, V, Vmid, C, param_sym
 
 
+def symmetries_2rpr(V, param):
+    """
+    Mirror lines of the workspace of 2-RPR for check_box_uni_symmetric: it is always symmetric about u2 = 0 and
+    about u1 = d / 2 if both rods have the same range
+    :param V: list of intervals of rods
+    :param param: [d]
+    :return: list of (axis, value)
+    """
+    symmetries = [(1, 0.0)]
+    if V[0][0] == V[1][0] and V[0][1] == V[1][1]:
+        symmetries.append((0, param[0] / 2))
+    return symmetries
+
+
+def prefilter_2rpr(V, param):
+    """
+    Analytic prefilter of 2-RPR for check_box_uni_grid: the rods are the distances to (0, 0) and (d, 0)
+    :param V: list of intervals of rods
+    :param param: [d]
+    :return: function (u1, u2) returning labels of cells (UNKNOWN for undecided ones)
+    """
+    centers = [(0.0, 0.0), (param[0], 0.0)]
+    ranges = [(V[0][0], V[0][1]), (V[1][0], V[1][1])]
+    return functools.partial(annuli_prefilter, centers=centers, ranges=ranges)
+
+
+def border_shift_2rpr(V, param, V_new, param_new):
+    """
+    Heuristic distance, which the border of 2-RPR workspace moves by, for check_box_uni_incremental: every circle of
+    the border moves by the change of its radius and of its center. It is not a bound: a corner, where two circles
+    cross at angle a, moves by about shift / sin(a), which is unbounded for circles close to tangent. Use it together
+    with border_cells_2rpr, then the cells of the old and the new circles, with the corners on them, are always
+    checked again and the shift only widens the band around them
+    :param V: old list of intervals of rods
+    :param param: old [d]
+    :param V_new: new list of intervals of rods
+    :param param_new: new [d]
+    :return: distance
+    """
+    radii = max(max(abs(V_new[i][0] - V[i][0]), abs(V_new[i][1] - V[i][1])) for i in range(len(V)))
+    return radii + abs(param_new[0] - param[0])
+
+
+def monotone_2rpr(V, param, V_new, param_new):
+    """
+    :return: 'grow' if the new ranges of rods contain the old ones and d is the same, 'shrink' in the opposite case,
+             None otherwise (see check_box_uni_incremental)
+    """
+    if param_new[0] != param[0]:
+        return None
+    if all(V_new[i][0] <= V[i][0] and V[i][1] <= V_new[i][1] for i in range(len(V))):
+        return 'grow'
+    if all(V[i][0] <= V_new[i][0] and V_new[i][1] <= V[i][1] for i in range(len(V))):
+        return 'shrink'
+    return None
+
+
+def border_cells_2rpr(V, param, V_new, param_new):
+    """
+    Cells, which may hold the old or the new border of 2-RPR workspace, for check_box_uni_incremental: the circles
+    of the old or of the new annuli cross them
+    :param V: old list of intervals of rods
+    :param param: old [d]
+    :param V_new: new list of intervals of rods
+    :param param_new: new [d]
+    :return: function (u1, u2) returning boolean array
+    """
+    return functools.partial(_border_cells, prefilters=[prefilter_2rpr(V, param), prefilter_2rpr(V_new, param_new)])
+
+
+def _border_cells(u1, u2, prefilters):
+    """
+    Cells, which any of prefilters leaves undecided (UNKNOWN)
+    """
+    mask = np.zeros(u1.shape, dtype=bool)
+    for prefilter in prefilters:
+        mask |= prefilter(u1, u2) == UNKNOWN
+    return mask
+
+
 def func_dextar():
+    import sympy as sym
     Vmid = sym.symbols('v1mid, v2mid, v3mid, v4mid')
     V = sym.symbols('v1, v2, v3, v4')
     U = sym.symbols('u1, u2')
@@ -90,79 +333,82 @@ def set_param(L2, N):
     X, Y = np.meshgrid(X1, Y1)  # Build X and Y of uniform grid
     return (X, Y)
 
-N = 50  # The number of nodes on uniform grid
-
-
-
-#"""
-##### 2-RPR
-f, U, V, Vmid, C, param_sym = func_2rpr()
-L1v = 3  # Lower range of row
-L2v = 15  # Upper range of row
-v1 = ival.Interval([L1v, L2v])
-v2 = ival.Interval([L1v, L2v])
-V_ival = [v1, v2]
-L2u = L2v
-d = 6
-X, Y = set_param(L2u, N)
-param = [d]
-unified_krav_func = get_unified_krav_eval(f, U, V, Vmid, C, param_sym)
-#####
-#"""
-"""
-##### sin-cos func
-f, U, V, Vmid, C = func_sin_cos()
-L1u = -2  # Lower range of box U
-L2u = 2  # Upper range of box U
-#L1v = 0  # Lower range of box V
-#L2v = np.pi/2  # Upper range of box V
-v1 = ival.Interval([0, 2*np.pi])
-v2 = ival.Interval([0, 2*np.pi])
-V_ival = [v1, v2]
-X, Y = set_param(L2u, N)
-param = []
-unified_krav_func = get_unified_krav_eval(f, U, V, Vmid, C)
-#####
-"""
-"""
-##### robot func
-f, U, V, Vmid, C = func_robot()
-L1u = -15  # Lower range of box U
-L2u = 15  # Upper range of box U
-v1 = ival.Interval([3, 15])
-v2 = ival.Interval([0, np.pi/2])
-V_ival = [v1, v2]
-X, Y = set_param(L2u, N)
-param = []
-unified_krav_func = get_unified_krav_eval(f, U, V, Vmid, C)
-#####
-"""
-"""
-#####  dextar
-f, U, V, Vmid, C, sym_param = func_dextar()
-L = 7.2
-l = 2.0
-d = 3.0
-d1 = d*2
-L1u = d-(L + l)  # Lower range of box U
-L2u = d+(L + l)  # Upper range of box U
-l1 = 0
-l2 = 2*np.pi
-v1 = ival.Interval([l1, l2])
-v2 = ival.Interval([l1, l2])
-v3 = ival.Interval([l1, l2])
-v4 = ival.Interval([l1, l2])
-V_ival = [v1, v2, v3, v4]
-X, Y = set_param(L2u, N)
-param = [L, l, d]
-unified_krav_func = get_unified_krav_eval(f, U, V, Vmid, C, sym_param)
-#####
-"""
-k = 10  # Max number of iterations
-coef = 1
-area_points = BoxPoints()
-border_points = BoxPoints()
-
-
-area_points_uni, border_points_uni = check_box_uni(X, Y, N, V_ival, param, unified_krav_eval, coef, k)
-uni_plotter(area_points_uni, border_points_uni, L2u)
+if __name__ == '__main__':
+    from plot_workspace_area import uni_plotter
+    from kravchik_operator import get_unified_krav_codegen
+    N = 50  # The number of nodes on uniform grid
+
+
+
+    #"""
+    ##### 2-RPR
+    f, U, V, Vmid, C, param_sym = func_2rpr()
+    L1v = 3  # Lower range of row
+    L2v = 15  # Upper range of row
+    v1 = ival.Interval([L1v, L2v])
+    v2 = ival.Interval([L1v, L2v])
+    V_ival = [v1, v2]
+    L2u = L2v
+    d = 6
+    X, Y = set_param(L2u, N)
+    param = [d]
+    unified_krav_func = get_unified_krav_codegen(f, U, V, Vmid, C, param_sym)
+    #####
+    #"""
+    """
+    ##### sin-cos func
+    f, U, V, Vmid, C = func_sin_cos()
+    L1u = -2  # Lower range of box U
+    L2u = 2  # Upper range of box U
+    #L1v = 0  # Lower range of box V
+    #L2v = np.pi/2  # Upper range of box V
+    v1 = ival.Interval([0, 2*np.pi])
+    v2 = ival.Interval([0, 2*np.pi])
+    V_ival = [v1, v2]
+    X, Y = set_param(L2u, N)
+    param = []
+    unified_krav_func = get_unified_krav_codegen(f, U, V, Vmid, C)
+    #####
+    """
+    """
+    ##### robot func
+    f, U, V, Vmid, C = func_robot()
+    L1u = -15  # Lower range of box U
+    L2u = 15  # Upper range of box U
+    v1 = ival.Interval([3, 15])
+    v2 = ival.Interval([0, np.pi/2])
+    V_ival = [v1, v2]
+    X, Y = set_param(L2u, N)
+    param = []
+    unified_krav_func = get_unified_krav_codegen(f, U, V, Vmid, C)
+    #####
+    """
+    """
+    #####  dextar
+    f, U, V, Vmid, C, sym_param = func_dextar()
+    L = 7.2
+    l = 2.0
+    d = 3.0
+    d1 = d*2
+    L1u = d-(L + l)  # Lower range of box U
+    L2u = d+(L + l)  # Upper range of box U
+    l1 = 0
+    l2 = 2*np.pi
+    v1 = ival.Interval([l1, l2])
+    v2 = ival.Interval([l1, l2])
+    v3 = ival.Interval([l1, l2])
+    v4 = ival.Interval([l1, l2])
+    V_ival = [v1, v2, v3, v4]
+    X, Y = set_param(L2u, N)
+    param = [L, l, d]
+    unified_krav_func = get_unified_krav_codegen(f, U, V, Vmid, C, sym_param)
+    #####
+    """
+    k = 10  # Max number of iterations
+    coef = 1
+    area_points = BoxPoints()
+    border_points = BoxPoints()
+
+
+    area_points_uni, border_points_uni = check_box_uni_batch(X, Y, N, V_ival, param, unified_krav_eval_batch, coef, k)
+    uni_plotter(area_points_uni, border_points_uni, L2u)
@@ -0,0 +1,103 @@
+import functools
+import inspect
+import numpy as np
+import interval as ival
+import kernel_cache
+import interval_codegen
+import unified_interval
+from check_box import check_box_uni_grid
+
+# kind of checker -> (batched checker of unified_interval.py, kravchik_operator function building its kernel)
+CHECKERS = {
+    'krawczyk': ('unified_krav_eval_batch', 'get_unified_krav_codegen'),
+    'newton': ('unified_newton_eval_batch', 'get_unified_newton_codegen'),
+}
+# problem (function of unified_interval.py defining it) -> its analytic prefilter in unified_interval.py or None.
+# Only these problems are loaded, their names become file names of the kernel cache
+PROBLEMS = {
+    'func_2rpr': 'prefilter_2rpr',
+    'func_robot': None,
+    'func_sin_cos': None,
+    'func_dextar': None,
+}
+# problem -> (number of unknowns V, number of const parameters param)
+SIZES = {
+    'func_2rpr': (2, 1),
+    'func_robot': (2, 0),
+    'func_sin_cos': (2, 0),
+    'func_dextar': (4, 3),
+}
+_kernels = {}  # alias -> kernel loaded in this process, so switching between problems doesn't read the cache again
+
+
+def check_problem(problem, kind='krawczyk'):
+    """
+    Raise ValueError if problem is not in PROBLEMS or kind is not in CHECKERS
+    """
+    if not isinstance(problem, str) or problem not in PROBLEMS:
+        raise ValueError('Unknown problem %r, expected one of %s' % (problem, ', '.join(sorted(PROBLEMS))))
+    if not isinstance(kind, str) or kind not in CHECKERS:
+        raise ValueError('Unknown kind %r, expected one of %s' % (kind, ', '.join(sorted(CHECKERS))))
+
+
+def load_prefilter(problem, V, param):
+    """
+    :param problem: name of problem in PROBLEMS
+    :param V: list of intervals of unknowns
+    :param param: list of const parameters
+    :return: analytic prefilter of problem (see check_box_uni_grid)
+    """
+    check_problem(problem)
+    if PROBLEMS[problem] is None:
+        raise ValueError('Problem %s has no prefilter' % problem)
+    return getattr(unified_interval, PROBLEMS[problem])(V, param)
+
+
+def load_checker(problem, kind='krawczyk', rebuild=False):
+    """
+    Batched unified checker of problem bound to its own kernel, so checkers of different problems can be used
+    together. The kernel is loaded from the kernel cache by the alias '<problem>.<kind>', so neither sympy nor the
+    equations are touched, if it was built before with the same source of the problem definition, version of
+    sympy and of the cache (see kernel_cache.alias_stamp). Otherwise it is built with sympy and remembered under
+    the alias. Loaded kernels are kept in this process
+    :param problem: name of function of unified_interval.py defining the problem, e.g. 'func_dextar' (see PROBLEMS)
+    :param kind: 'krawczyk' or 'newton' (see CHECKERS)
+    :param rebuild: build the kernel from the equations even if the alias exists
+    :return: checker (U, V, param, p) returning array of labels
+    """
+    check_problem(problem, kind)
+    checker_name, build_name = CHECKERS[kind]
+    alias = '%s.%s' % (problem, kind)
+    define = getattr(unified_interval, problem)
+    source = inspect.getsource(define)
+    kernel = None if rebuild else _kernels.get(alias)
+    key = None if rebuild or kernel is not None else kernel_cache.load_alias(alias, source)
+    if key is not None:
+        kernel = kernel_cache.load_kernel(key, interval_codegen.kernel_namespace(), name='_interval_kernel')
+    if kernel is None:
+        import kravchik_operator
+        definition = define()
+        kernel = getattr(kravchik_operator, build_name)(*definition[:5],
+                                                        param=definition[5] if len(definition) > 5 else [],
+                                                        alias=alias, alias_source=source)
+    _kernels[alias] = kernel
+    return functools.partial(getattr(unified_interval, checker_name), kernel=kernel)
+
+
+def check_workspace(problem, V, param, bounds, n, kind='krawczyk', p=10, prefilter=None):
+    """
+    Workspace of unified problem on uniform grid without plotting
+    :param problem: name of function of unified_interval.py defining the problem, e.g. 'func_2rpr'
+    :param V: list of intervals (or [lo, hi] lists) of unknowns
+    :param param: list of const parameters
+    :param bounds: (xmin, xmax, ymin, ymax) of the grid
+    :param n: number of nodes of uniform grid along each side
+    :param kind: 'krawczyk' or 'newton'
+    :param p: the max number of iterations
+    :param prefilter: None or function (u1, u2) returning labels of cells decided without checker
+                      (see check_box_uni_grid)
+    :return: LabelGrid
+    """
+    checker = load_checker(problem, kind)
+    X, Y = np.meshgrid(np.linspace(bounds[0], bounds[1], n), np.linspace(bounds[2], bounds[3], n))
+    return check_box_uni_grid(X, Y, n, [ival.Interval(v) for v in V], param, checker, 1, p, prefilter=prefilter)